@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Processus web : limite de durée des requêtes SQL (DB_STATEMENT_TIMEOUT_MS), voir settings.py
+os.environ.setdefault('DJANGO_WEB_PROCESS', 'true')
 
 application = get_asgi_application()
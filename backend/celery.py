@@ -0,0 +1,22 @@
+"""
+Celery application of the project.
+
+Heavy media work runs on dedicated queues so it can be scaled apart from the
+web tier (see CELERY_TASK_ROUTES / MEDIA_WORKER_PROFILES in settings):
+
+    ingest       remote fetches and uploads (I/O bound)
+    transcode    ffmpeg work (CPU bound, long)
+    analysis     audio / AI analysis
+    maintenance  outbox deletes, archival, ledger reconciliation
+
+Start one worker per queue with scripts/run_celery_worker.py <queue>.
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+app = Celery('backend')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -2,7 +2,7 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from .models import HiringManager, Evaluation, Candidate, VideoCampaign, Question, VideoResponse, InterviewSession, SessionLog, AIAnalysis, VideoSettings, DashboardMetrics # etc.
+from .models import HiringManager, Evaluation, Candidate, VideoCampaign, Question, VideoResponse, InterviewSession, SessionLog, AIAnalysis, VideoSettings, DashboardMetrics, MediaBlob, PendingDelete, StorageUsage, MediaJob, MediaRestoreJob, CampaignDailyStats # etc.
 
 admin.site.register(HiringManager)
 admin.site.register(Evaluation)
@@ -14,4 +14,10 @@ admin.site.register(VideoResponse)
 admin.site.register(InterviewSession)
 admin.site.register(SessionLog)
 admin.site.register(AIAnalysis)
-admin.site.register(VideoSettings)
\ No newline at end of file
+admin.site.register(VideoSettings)
+admin.site.register(MediaBlob)
+admin.site.register(PendingDelete)
+admin.site.register(StorageUsage)
+admin.site.register(MediaJob)
+admin.site.register(MediaRestoreJob)
+admin.site.register(CampaignDailyStats)
@@ -0,0 +1,306 @@
+# AI analysis of video responses: pluggable analyzers run in batches, in a process pool
+import math
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import AIAnalysis, VideoResponse
+
+# tiers whose bytes can be read without a restore request
+READABLE_TIERS = ("hot", "restored")
+
+_analyzers = None  # per process: loaded once, kept warm across batches / celery tasks
+
+
+class Analyzer(ABC):
+    """
+    Base class of the analyzers listed in settings.AI_ANALYZERS (dotted paths).
+    `load()` runs once per worker process (models stay in memory), `analyze()`
+    once per stored file and returns {AIAnalysis field: value} for `fields`.
+    """
+    name = ""
+    fields = ()
+
+    def load(self):
+        pass
+
+    @abstractmethod
+    def analyze(self, path, item):
+        """{AIAnalysis field: value} for the file at `path`."""
+
+
+class SpeechTranscriptAnalyzer(Analyzer):
+    """
+    Speech rate (words per minute), filler words and recognition confidence from a
+    faster-whisper transcript (optional dependency: pip install faster-whisper).
+    """
+    name = "speech_transcript"
+    fields = ("speech_rate", "filler_words_count", "speech_confidence")
+
+    def load(self):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImproperlyConfigured("SpeechTranscriptAnalyzer requires faster-whisper") from e
+        self.model = WhisperModel(
+            getattr(settings, "AI_WHISPER_MODEL", "base"),
+            device=getattr(settings, "AI_WHISPER_DEVICE", "cpu"),
+            compute_type=getattr(settings, "AI_WHISPER_COMPUTE_TYPE", "int8"),
+            cpu_threads=1,  # one process per core already
+        )
+        fillers = getattr(settings, "AI_FILLER_WORDS", ["euh", "heu", "ben", "bah", "um", "uh", "erm"])
+        self.filler_re = re.compile(r"\b(?:%s)\b" % "|".join(map(re.escape, fillers)), re.IGNORECASE)
+
+    def analyze(self, path, item):
+        segments, info = self.model.transcribe(path, vad_filter=True)
+        words = fillers = 0
+        spoken = weighted_prob = 0.0
+        for segment in segments:
+            length = max(segment.end - segment.start, 0.0)
+            words += len(segment.text.split())
+            fillers += len(self.filler_re.findall(segment.text))
+            spoken += length
+            weighted_prob += math.exp(segment.avg_logprob) * length
+        duration = item["duration"] or info.duration
+        return {
+            "speech_rate": words * 60.0 / duration if duration else None,
+            "filler_words_count": fillers,
+            "speech_confidence": weighted_prob / spoken if spoken else None,
+        }
+
+
+def analysis_version():
+    return getattr(settings, "AI_ANALYSIS_VERSION", "1.0")
+
+
+def analyzer_paths():
+    return list(getattr(settings, "AI_ANALYZERS", []))
+
+
+def get_analyzers(paths=None):
+    """Instantiate and load the configured analyzers once per process."""
+    global _analyzers
+    if _analyzers is None:
+        analyzers = [import_string(path)() for path in (paths or analyzer_paths())]
+        for analyzer in analyzers:
+            analyzer.load()
+        _analyzers = analyzers
+    return _analyzers
+
+
+def _init_worker(paths):
+    # spawn start method (macOS / Windows): the child starts from a fresh interpreter
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    get_analyzers(paths)
+
+
+def max_attempts():
+    return getattr(settings, "AI_ANALYSIS_MAX_ATTEMPTS", 5)
+
+
+def retry_delay(attempts):
+    """Wait after the `attempts`-th failure: AI_ANALYSIS_RETRY_BACKOFF seconds, doubled each time."""
+    return timedelta(seconds=getattr(settings, "AI_ANALYSIS_RETRY_BACKOFF", 3600) * 2 ** (attempts - 1))
+
+
+def outdated_responses(version=None, campaign=None):
+    """
+    Readable responses without an analysis of the current version, except those
+    whose analysis of this version failed recently (retry_after) or too often.
+    """
+    version = version or analysis_version()
+    qs = (
+        VideoResponse.objects.filter(upload_status="completed", storage_tier__in=READABLE_TIERS)
+        .exclude(video_file="")
+        .exclude(ai_analysis__analysis_version=version)
+        .exclude(
+            Q(ai_analysis__failed_version=version)
+            & (Q(ai_analysis__failed_attempts__gte=max_attempts()) | Q(ai_analysis__retry_after__gt=timezone.now()))
+        )
+    )
+    if campaign is not None:
+        qs = qs.filter(session__campaign=campaign)
+    return qs
+
+
+def _local_copy(name):
+    """(path, is_temporary): a filesystem path the analyzers can open."""
+    bucket = getattr(default_storage, "bucket_name", None)
+    if not bucket:
+        return default_storage.path(name), False
+    from .media import _s3_key
+    from .s3 import get_s3_client, get_transfer_config
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(name)[1])
+    os.close(fd)
+    get_s3_client().download_file(bucket, _s3_key(name), path, Config=get_transfer_config())
+    return path, True
+
+
+def analyze_file(item):
+    """
+    Run every analyzer on one stored file (in a worker process, no DB access).
+    Returns (name, fields, error).
+    """
+    path = temporary = None
+    try:
+        path, temporary = _local_copy(item["name"])
+        fields = {}
+        for analyzer in get_analyzers():
+            fields.update(analyzer.analyze(path, item))
+        return item["name"], fields, None
+    except Exception as e:
+        return item["name"], None, f"{type(e).__name__}: {e}"
+    finally:
+        if temporary:
+            os.remove(path)
+
+
+# AIAnalysis fields describing the failed attempts, reset by a successful analysis
+FAILURE_FIELDS = ["failed_version", "failed_attempts", "retry_after", "last_error"]
+
+
+def save_results(results, version=None):
+    """Write {response_id: fields} with one bulk_update and one bulk_create."""
+    if not results:
+        return 0
+    version = version or analysis_version()
+    now = timezone.now()
+    field_names = sorted({name for fields in results.values() for name in fields})
+    with transaction.atomic():
+        existing = {
+            a.video_response_id: a
+            for a in AIAnalysis.objects.select_for_update().filter(video_response_id__in=list(results))
+        }
+        created = []
+        for response_id, fields in results.items():
+            analysis = existing.get(response_id) or AIAnalysis(video_response_id=response_id)
+            for name, value in fields.items():
+                setattr(analysis, name, value)
+            analysis.analysis_version = version
+            analysis.analyzed_at = now
+            analysis.failed_version, analysis.failed_attempts = "", 0
+            analysis.retry_after, analysis.last_error = None, ""
+            if response_id not in existing:
+                created.append(analysis)
+        AIAnalysis.objects.bulk_update(
+            list(existing.values()),
+            field_names + ["analysis_version", "analyzed_at"] + FAILURE_FIELDS,
+            batch_size=500,
+        )
+        AIAnalysis.objects.bulk_create(created, batch_size=500)
+    return len(results)
+
+
+def save_failures(failures, version=None):
+    """
+    Record {response_id: error}: one more failed attempt of this version and the
+    retry_after that keeps the response out of outdated_responses() meanwhile.
+    A response never analyzed gets an AIAnalysis with an empty analysis_version.
+    """
+    if not failures:
+        return 0
+    version = version or analysis_version()
+    now = timezone.now()
+    with transaction.atomic():
+        existing = {
+            a.video_response_id: a
+            for a in AIAnalysis.objects.select_for_update().filter(video_response_id__in=list(failures))
+        }
+        created = []
+        for response_id, error in failures.items():
+            analysis = existing.get(response_id)
+            if analysis is None:
+                analysis = AIAnalysis(video_response_id=response_id, analysis_version="")
+                created.append(analysis)
+            if analysis.failed_version != version:
+                analysis.failed_version, analysis.failed_attempts = version, 0
+            analysis.failed_attempts += 1
+            analysis.retry_after = now + retry_delay(analysis.failed_attempts)
+            analysis.last_error = error
+        AIAnalysis.objects.bulk_update(list(existing.values()), FAILURE_FIELDS, batch_size=500)
+        AIAnalysis.objects.bulk_create(created, batch_size=500)
+    return len(failures)
+
+
+def _batch_items(batch):
+    """Group responses by stored file: content-addressed duplicates are analyzed once."""
+    items, owners = {}, {}
+    for pk, name, duration, fmt, size in batch:
+        items.setdefault(name, {"name": name, "duration": duration, "format": fmt, "size": size})
+        owners.setdefault(name, []).append(pk)
+    return list(items.values()), owners
+
+
+def run_analysis(campaign=None, batch_size=100, workers=None, max_batches=None, dry_run=False,
+                 progress=None, log=None):
+    """
+    Analyze outdated responses batch by batch. With workers > 0 the files are
+    analyzed in a process pool whose processes keep their models loaded for
+    the whole run; workers=0 runs in the calling process (celery prefork child).
+    Returns (analyzed, failed).
+    """
+    paths = analyzer_paths()
+    if not paths:
+        raise ImproperlyConfigured("AI_ANALYZERS is empty")
+    version = analysis_version()
+    qs = outdated_responses(version, campaign).order_by("id").values_list(
+        "id", "video_file", "duration", "format", "file_size"
+    )
+    if workers is None:
+        workers = getattr(settings, "AI_ANALYSIS_WORKERS", None) or os.cpu_count() or 1
+
+    executor = None
+    if workers > 0 and not dry_run:
+        # forked children must not share the parent's DB sockets
+        connections.close_all()
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(paths,))
+    analyzed = failed = batches = 0
+    last_id = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            batch = list(qs.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            batches += 1
+            last_id = batch[-1][0]
+            if dry_run:
+                analyzed += len(batch)
+                continue
+            items, owners = _batch_items(batch)
+            if executor is not None:
+                outcomes = executor.map(analyze_file, items, chunksize=max(1, len(items) // (workers * 4)))
+            else:
+                get_analyzers(paths)
+                outcomes = map(analyze_file, items)
+            results, failures = {}, {}
+            sizes = {item["name"]: item["size"] for item in items}
+            for name, fields, error in outcomes:
+                if error is None:
+                    results.update((pk, fields) for pk in owners[name])
+                else:
+                    # retried by a later run once retry_after has passed (see outdated_responses)
+                    failures.update((pk, error) for pk in owners[name])
+                    if log:
+                        log(f"{name}: {error}")
+                if progress:
+                    progress(sizes[name])
+            analyzed += save_results(results, version)
+            failed += save_failures(failures, version)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return analyzed, failed
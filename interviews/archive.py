@@ -0,0 +1,267 @@
+# cold-storage tier for the videos of closed campaigns, with on-demand restore
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import MediaRestoreJob, VideoResponse
+
+TIER_HOT = "hot"
+TIER_ARCHIVED = "archived"
+TIER_RESTORING = "restoring"
+TIER_RESTORED = "restored"
+COLD_TIERS = (TIER_ARCHIVED, TIER_RESTORING, TIER_RESTORED)
+
+# storage classes readable without a restore request
+INSTANT_CLASSES = {"GLACIER_IR", "STANDARD_IA", "ONEZONE_IA", "INTELLIGENT_TIERING"}
+
+
+def archive_cutoff(retention_days=None):
+    if retention_days is None:
+        retention_days = getattr(settings, "MEDIA_ARCHIVE_RETENTION_DAYS", 90)
+    return timezone.now() - timedelta(days=retention_days)
+
+
+def _bucket():
+    return getattr(default_storage, "bucket_name", None)
+
+
+def _storage_class():
+    return getattr(settings, "MEDIA_ARCHIVE_STORAGE_CLASS", "GLACIER")
+
+
+def archived_path(name):
+    """Local filesystem only: location of an archived file outside MEDIA_ROOT."""
+    root = getattr(settings, "MEDIA_ARCHIVE_ROOT", None) or os.path.join(settings.BASE_DIR, "media_archive")
+    return os.path.join(root, *name.split("/"))
+
+
+def _move(src, dst):
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    os.replace(src, dst)
+
+
+def archive_object(name):
+    """
+    Move one stored object to the cold tier: in-place storage-class change on S3
+    (the key, hence every reference, stays the same), MEDIA_ARCHIVE_ROOT locally.
+    """
+    bucket = _bucket()
+    if bucket:
+        from .media import _s3_key
+        from .s3 import get_s3_client, get_transfer_config
+        key = _s3_key(name)
+        get_s3_client().copy(
+            {"Bucket": bucket, "Key": key}, bucket, key,
+            ExtraArgs={"StorageClass": _storage_class(), "MetadataDirective": "COPY"},
+            Config=get_transfer_config(),
+        )
+        return
+    _move(default_storage.path(name), archived_path(name))
+
+
+def request_restore(name, days=None):
+    """Start restoring an archived object; returns True once it is readable."""
+    bucket = _bucket()
+    if not bucket:
+        _move(archived_path(name), default_storage.path(name))
+        return True
+    if _storage_class() in INSTANT_CLASSES:
+        return True
+    from botocore.exceptions import ClientError
+    from .media import _s3_key
+    from .s3 import get_s3_client
+    try:
+        get_s3_client().restore_object(
+            Bucket=bucket,
+            Key=_s3_key(name),
+            RestoreRequest={
+                "Days": days or getattr(settings, "MEDIA_RESTORE_DAYS", 7),
+                "GlacierJobParameters": {"Tier": getattr(settings, "MEDIA_RESTORE_TIER", "Standard")},
+            },
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "RestoreAlreadyInProgress":
+            raise
+    return False
+
+
+def restore_finished(name):
+    """True when the temporary restored copy of `name` can be read."""
+    bucket = _bucket()
+    if not bucket:
+        return default_storage.exists(name)
+    from .media import _s3_key
+    from .s3 import get_s3_client
+    head = get_s3_client().head_object(Bucket=bucket, Key=_s3_key(name))
+    if head.get("StorageClass", "STANDARD") not in ("GLACIER", "DEEP_ARCHIVE"):
+        return True
+    return 'ongoing-request="false"' in (head.get("Restore") or "")
+
+
+def rearchive_local(name):
+    """Local filesystem: put an expired restored copy back in the archive."""
+    if not _bucket() and default_storage.exists(name):
+        _move(default_storage.path(name), archived_path(name))
+
+
+def rehydrate(name, content):
+    """Store fresh bytes for an archived object in the standard tier (same name)."""
+    if hasattr(content, "seek"):
+        content.seek(0)
+    bucket = _bucket()
+    if bucket:
+        from .media import _s3_key
+        from .s3 import get_s3_client, get_transfer_config
+        get_s3_client().upload_fileobj(content, bucket, _s3_key(name), Config=get_transfer_config())
+    elif not default_storage.exists(name):
+        default_storage.save(name, content)
+    mark_hot(name)
+
+
+def is_archived(name):
+    return VideoResponse.objects.filter(video_file=name, storage_tier__in=COLD_TIERS).exists()
+
+
+def mark_hot(name):
+    """The object was stored again in the standard tier (e.g. re-uploaded identical bytes)."""
+    bucket = _bucket()
+    if not bucket:
+        path = archived_path(name)
+        if os.path.exists(path):
+            os.remove(path)
+    VideoResponse.objects.filter(video_file=name).update(storage_tier=TIER_HOT, archived_at=None)
+    MediaRestoreJob.objects.filter(storage_name=name, status__in=["pending", "in_progress", "completed"]).update(
+        status="expired", expires_at=timezone.now()
+    )
+
+
+def archivable(cutoff):
+    """(name, size) of hot files whose every referencing campaign ended before `cutoff`."""
+    still_open = VideoResponse.objects.filter(session__campaign__end_date__gte=cutoff).values("video_file")
+    return (
+        VideoResponse.objects.filter(session__campaign__end_date__lt=cutoff, storage_tier=TIER_HOT)
+        .exclude(video_file="")
+        .exclude(video_file__in=still_open)
+        .values("video_file")
+        .annotate(size=Max("file_size"))
+        .order_by("video_file")
+        .values_list("video_file", "size")
+    )
+
+
+def archive_closed_campaigns(retention_days=None, batch_size=200, workers=8, dry_run=False, log=None):
+    """
+    Archive the files of campaigns closed for longer than the retention window.
+    Returns (archived, bytes, failures).
+    """
+    qs = archivable(archive_cutoff(retention_days))
+    archived = archived_bytes = failures = 0
+    last_name = ""
+
+    def _archive(item):
+        try:
+            archive_object(item[0])
+            return item, None
+        except Exception as e:
+            return item, e
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            # keyset pagination: archived rows leave the queryset as we go
+            batch = list(qs.filter(video_file__gt=last_name)[:batch_size])
+            if not batch:
+                break
+            last_name = batch[-1][0]
+            if dry_run:
+                archived += len(batch)
+                archived_bytes += sum(size for _, size in batch)
+                continue
+            done = []
+            for (name, size), error in executor.map(_archive, batch):
+                if error is None:
+                    done.append(name)
+                    archived_bytes += size
+                else:
+                    failures += 1
+                    if log:
+                        log(f"{name}: {error}")
+            VideoResponse.objects.filter(video_file__in=done).update(
+                storage_tier=TIER_ARCHIVED, archived_at=timezone.now()
+            )
+            archived += len(done)
+    return archived, archived_bytes, failures
+
+
+def request_campaign_restore(campaign, user=None):
+    """Create restore jobs for the archived files of a campaign (one per stored object)."""
+    names = set(
+        VideoResponse.objects.filter(session__campaign=campaign, storage_tier=TIER_ARCHIVED)
+        .exclude(video_file="").values_list("video_file", flat=True)
+    )
+    active = set(
+        MediaRestoreJob.objects.filter(storage_name__in=names, status__in=["pending", "in_progress"])
+        .values_list("storage_name", flat=True)
+    )
+    jobs = [
+        MediaRestoreJob(campaign=campaign, storage_name=name, requested_by=user)
+        for name in sorted(names - active)
+    ]
+    MediaRestoreJob.objects.bulk_create(jobs)
+    VideoResponse.objects.filter(video_file__in=names).update(storage_tier=TIER_RESTORING)
+    return len(jobs)
+
+
+def process_restore_jobs(log=None):
+    """
+    Advance restore jobs: submit pending ones, detect finished restores and
+    expire restored copies. Returns a {status: count} summary of the changes.
+    """
+    now = timezone.now()
+    summary = {"submitted": 0, "completed": 0, "expired": 0, "failed": 0}
+    restore_days = getattr(settings, "MEDIA_RESTORE_DAYS", 7)
+
+    def _complete(job):
+        job.status = "completed"
+        job.completed_at = now
+        job.expires_at = now + timedelta(days=restore_days)
+        job.save(update_fields=["status", "completed_at", "expires_at"])
+        VideoResponse.objects.filter(video_file=job.storage_name).update(storage_tier=TIER_RESTORED)
+        summary["completed"] += 1
+
+    for job in MediaRestoreJob.objects.filter(status__in=["pending", "in_progress"]).order_by("requested_at"):
+        try:
+            if job.status == "pending":
+                ready = request_restore(job.storage_name)
+                summary["submitted"] += 1
+                if not ready:
+                    job.status = "in_progress"
+                    job.save(update_fields=["status"])
+                    continue
+            elif not restore_finished(job.storage_name):
+                continue
+            _complete(job)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            job.save(update_fields=["status", "error"])
+            VideoResponse.objects.filter(video_file=job.storage_name, storage_tier=TIER_RESTORING).update(
+                storage_tier=TIER_ARCHIVED
+            )
+            summary["failed"] += 1
+            if log:
+                log(f"{job.storage_name}: {e}")
+
+    for job in MediaRestoreJob.objects.filter(status="completed", expires_at__lt=now):
+        rearchive_local(job.storage_name)
+        job.status = "expired"
+        job.save(update_fields=["status"])
+        VideoResponse.objects.filter(video_file=job.storage_name, storage_tier=TIER_RESTORED).update(
+            storage_tier=TIER_ARCHIVED
+        )
+        summary["expired"] += 1
+    return summary
@@ -0,0 +1,136 @@
+# async versions of the I/O-bound upload endpoints, routed when ASYNC_VIEWS is on (ASGI profile, see Dockerfile)
+import orjson
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .auth import ensure_not_revoked
+from .models import VideoCampaign
+from .quotas import aremaining_quota
+from .renderers import dumps
+from .s3 import presigned_upload_post
+from .utils import acheck_remote_video, avalidate_public_url
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
+
+
+class AsyncAPIView(View):
+    """
+    Minimal async counterpart of DRF's APIView (which is sync only: under ASGI
+    each request through it holds a thread): JWT authentication through the
+    async ORM, JSON body, JSON responses and errors in DRF's format.
+    Every authenticated user is allowed, like IsAuthenticated.
+    """
+
+    jwt = JWTAuthentication()
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        # JWT in the Authorization header, no session cookie: same CSRF exemption as APIView
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def authenticate(self, request):
+        header = self.jwt.get_header(request)
+        raw_token = self.jwt.get_raw_token(header) if header else None
+        if raw_token is None:
+            raise exceptions.NotAuthenticated()
+        token = self.jwt.get_validated_token(raw_token)
+        # logged out / deactivated: same denylist as the sync views (may refresh it from the database)
+        await sync_to_async(ensure_not_revoked)(token)
+        user = await get_user_model().objects.filter(
+            **{jwt_settings.USER_ID_FIELD: token.get(jwt_settings.USER_ID_CLAIM)}
+        ).afirst()
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed("User not found or inactive", code="user_not_found")
+        return user
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        if method == "options" and method in self.http_method_names:
+            return await self.options(request, *args, **kwargs)
+        try:
+            handler = getattr(self, method, None) if method in self.http_method_names else None
+            if handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+            request.user = await self.authenticate(request)
+            try:
+                request.data = orjson.loads(request.body) if request.body else {}
+            except orjson.JSONDecodeError as exc:
+                raise exceptions.ParseError(f"JSON parse error - {exc}")
+            return await handler(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            response = json_response(data, status=exc.status_code)
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                response["WWW-Authenticate"] = self.jwt.authenticate_header(request)
+            elif isinstance(exc, exceptions.MethodNotAllowed):
+                response["Allow"] = ", ".join(m.upper() for m in self._allowed_methods())
+            return response
+
+
+class AsyncPresignUploadView(AsyncAPIView):
+    async def post(self, request, *args, **kwargs):
+        """Same contract as PresignUploadView."""
+        body = request.data
+        filename = body.get("filename")
+        campaign_id = body.get("campaign_id")
+        session_id = body.get("session_id")
+        try:
+            max_mb = int(body.get("max_mb", 200))
+        except (TypeError, ValueError):
+            return json_response({"detail": "invalid max_mb"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not filename or not campaign_id or not session_id:
+            return json_response({"detail": "campaign_id, session_id and filename required"},
+                                 status=status.HTTP_400_BAD_REQUEST)
+
+        key = f"responses/{campaign_id}/{session_id}/{filename}"
+
+        max_bytes = max_mb * 1024 * 1024
+        # the upload size range cannot exceed what is left of the recruiter's storage quota
+        try:
+            hiring_manager_id = await (
+                VideoCampaign.objects.filter(id=campaign_id).values_list("hiring_manager_id", flat=True).afirst()
+            )
+        except DjangoValidationError:
+            return json_response({"detail": "invalid campaign_id"}, status=status.HTTP_400_BAD_REQUEST)
+        remaining = await aremaining_quota(hiring_manager_id) if hiring_manager_id else None
+        if remaining is not None:
+            if remaining <= 0:
+                return json_response({"detail": "storage_quota_exceeded"},
+                                     status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            max_bytes = min(max_bytes, remaining)
+
+        # signing is local, but botocore may refresh credentials over HTTP (instance role):
+        # run it off the event loop, outside the thread reserved for the ORM
+        try:
+            presigned = await sync_to_async(presigned_upload_post, thread_sensitive=False)(key, max_bytes)
+        except Exception as e:
+            return json_response({"detail": "presign_failed", "error": str(e)},
+                                 status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return json_response({"presign": presigned, "key": key})
+
+
+class AsyncRemoteVideoCheckView(AsyncAPIView):
+    async def post(self, request, *args, **kwargs):
+        """Same contract as RemoteVideoCheckView; the HEAD request is awaited, not blocking a worker."""
+        video_url = request.data.get("video_url") or ""
+        try:
+            await avalidate_public_url(video_url)
+        except DjangoValidationError:
+            return json_response({"detail": "invalid video_url"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            max_bytes = int(request.data.get("max_mb", 200)) * 1024 * 1024
+        except (TypeError, ValueError):
+            return json_response({"detail": "invalid max_mb"}, status=status.HTTP_400_BAD_REQUEST)
+        return json_response(await acheck_remote_video(video_url, max_bytes))
@@ -0,0 +1,163 @@
+# CPU-only audio features (speech rate, pauses, loudness) computed with NumPy over streamed PCM
+import os
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+from .analysis import Analyzer
+
+SAMPLE_RATE = 16000
+FRAME_MS = 10
+BLOCK_SECONDS = 5  # PCM decoded and processed per step
+EPS = 1e-10
+
+MIN_PAUSE_MS = 250  # shorter silences are articulation, not pauses
+SYLLABLE_GAP_MS = 100  # at most ~10 syllables per second
+SMOOTH_MS = 50
+
+
+class AudioFeatures:
+    """
+    Streaming accumulator: feed() int16 mono PCM in any chunk size, result() at
+    the end. Only one dB value per 10 ms frame is kept (~240 KB for a 10-minute
+    answer instead of ~19 MB of PCM); frames are computed block-wise, vectorized.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.frame = sample_rate * FRAME_MS // 1000
+        self._pending = np.empty(0, dtype=np.int16)
+        self._levels = []
+        self._peak = 0
+        self.samples = 0
+
+    def feed(self, pcm):
+        samples = np.frombuffer(pcm, dtype=np.int16) if isinstance(pcm, (bytes, bytearray, memoryview)) else pcm
+        if not len(samples):
+            return
+        self.samples += len(samples)
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        usable = len(samples) - len(samples) % self.frame
+        self._pending = samples[usable:].copy()
+        if not usable:
+            return
+        frames = samples[:usable].astype(np.float32).reshape(-1, self.frame) / 32768.0
+        self._peak = max(self._peak, float(np.abs(frames).max()))
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        self._levels.append((20 * np.log10(rms + EPS)).astype(np.float32))
+
+    def result(self, syllables_per_word=None):
+        duration = self.samples / self.sample_rate
+        db = np.concatenate(self._levels) if self._levels else np.empty(0, dtype=np.float32)
+        if not len(db):
+            return {}
+        frame_s = FRAME_MS / 1000
+
+        # voice activity: adaptive threshold between the noise floor and the speech level
+        floor, level = np.percentile(db, [10, 95])
+        voiced = db > floor + max(6.0, 0.3 * (level - floor))
+        voiced_count = int(voiced.sum())
+
+        # pauses: silent runs of at least MIN_PAUSE_MS between two voiced frames
+        edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        gaps = (starts[1:] - ends[:-1]) * frame_s if len(starts) > 1 else np.empty(0)
+        pauses = gaps[gaps >= MIN_PAUSE_MS / 1000]
+        speaking_span = (ends[-1] - starts[0]) * frame_s if len(starts) else 0.0
+
+        features = {
+            "silence_ratio": 1.0 - voiced_count / len(db),
+            "pause_count": int(len(pauses)),
+            "pause_ratio": float(pauses.sum() / speaking_span) if speaking_span else None,
+            "peak_db": 20 * np.log10(self._peak + EPS),
+            "speech_rate": None,
+            "loudness_mean_db": None,
+            "loudness_range_db": None,
+        }
+        if voiced_count:
+            speech_db = db[voiced]
+            low, high = np.percentile(speech_db, [10, 95])
+            # energy average (not mean of dB values), dBFS
+            features["loudness_mean_db"] = 10 * np.log10(np.mean(10 ** (speech_db / 10)) + EPS)
+            features["loudness_range_db"] = high - low
+            syllables = _count_syllable_nuclei(db, voiced)
+            per_word = syllables_per_word or getattr(settings, "AI_SYLLABLES_PER_WORD", 1.5)
+            if duration:
+                features["speech_rate"] = syllables / per_word * 60.0 / duration
+        return {name: float(v) if isinstance(v, np.floating) else v for name, v in features.items()}
+
+
+def _count_syllable_nuclei(db, voiced):
+    """Local maxima of the smoothed energy envelope, prominent and spaced like syllables."""
+    smooth = max(1, SMOOTH_MS // FRAME_MS)
+    envelope = np.convolve(db, np.ones(smooth, dtype=np.float32) / smooth, mode="same")
+    half = SYLLABLE_GAP_MS // FRAME_MS
+    padded = np.pad(envelope, half, mode="edge")
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * half + 1)
+    # a nucleus is the maximum of its neighbourhood and rises 3 dB above the dips around it
+    is_peak = (envelope >= windows.max(axis=1)) & (envelope - windows.min(axis=1) >= 3.0) & voiced
+    # plateaus: count the first frame only
+    is_peak[1:] &= ~is_peak[:-1]
+    return int(is_peak.sum())
+
+
+@contextmanager
+def decoded_pcm(path, max_seconds=None, sample_rate=SAMPLE_RATE):
+    """ffmpeg stdout as a stream of mono int16 PCM (the track is never fully in memory)."""
+    max_seconds = max_seconds or getattr(settings, "MAX_RECORDING_DURATION", 600)
+    cmd = [
+        getattr(settings, "FFMPEG_BINARY", "ffmpeg"), "-nostdin", "-v", "error",
+        "-i", path, "-t", str(max_seconds), "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-",
+    ]
+    # stderr goes to a file, not a pipe: a pipe nobody reads while stdout is consumed would
+    # fill up on a corrupt upload (one error line per bad packet) and block ffmpeg
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+        try:
+            yield process.stdout
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            process.stdout.close()
+        if process.wait() != 0:
+            stderr.seek(max(stderr.seek(0, os.SEEK_END) - 500, 0))
+            raise RuntimeError(f"ffmpeg failed ({process.returncode}): {stderr.read().decode(errors='replace')}")
+
+
+def extract_features(stream, sample_rate=SAMPLE_RATE, block_seconds=BLOCK_SECONDS):
+    """Compute AudioFeatures from a binary PCM stream, one fixed-size block at a time."""
+    features = AudioFeatures(sample_rate)
+    buffer = bytearray(sample_rate * 2 * block_seconds)
+    view = memoryview(buffer)
+    carry = 0  # odd byte of a short pipe read, completed by the next one
+    while True:
+        n = stream.readinto(view[carry:])
+        if not n:
+            break
+        n += carry
+        even = n - n % 2
+        features.feed(view[:even])
+        carry = n - even
+        if carry:
+            buffer[0] = buffer[even]
+    return features
+
+
+class AudioFeaturesAnalyzer(Analyzer):
+    """Speech rate, silences, pauses and loudness from the audio track (ffmpeg + NumPy, no model)."""
+    name = "audio_features"
+    fields = (
+        "speech_rate", "silence_ratio", "pause_ratio", "pause_count",
+        "loudness_mean_db", "loudness_range_db", "peak_db",
+    )
+
+    def analyze(self, path, item):
+        with decoded_pcm(path) as stream:
+            features = extract_features(stream)
+        return features.result()
@@ -0,0 +1,388 @@
+# authenticated user + profile + role object in one query, role claims in the JWT,
+# stateless mode trusting those claims, in-memory token denylist, single-query login
+import copy
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import Candidate, ClaimsUser, HiringManager, RevokedToken
+
+ROLES = ("hiring_manager", "candidate")
+ROLE_CLAIMS = ("role", "hiring_manager_id", "candidate_id")
+
+_users = {}  # (user id, version) -> (expires at, user)
+_users_lock = threading.Lock()
+
+
+def user_queryset():
+    """Users with their profile and both role objects joined: the relations below cost no query."""
+    return get_user_model().objects.select_related("profile__hiring_manager", "profile__candidate")
+
+
+def _related(obj, name):
+    # select_related caches a missing reverse one-to-one as None: no query either way
+    try:
+        return getattr(obj, name)
+    except (AttributeError, ObjectDoesNotExist):
+        return None
+
+
+def _token_claims(user):
+    """Role claims of a ClaimsUser not loaded yet; None once loaded (or for a regular user)."""
+    claims = getattr(user, "claims", None)
+    if claims is None or "profile" in user._state.fields_cache:
+        return None
+    return claims
+
+
+def user_profile(user):
+    if _token_claims(user) is not None:
+        # nothing of the profile is in the token: load user, profile and role objects in one query
+        user.refresh_from_db(fields=list(user.get_deferred_fields()))
+    return _related(user, "profile")
+
+
+def _from_claim(user, model, claim):
+    # instance with only its pk: other fields are loaded on first access
+    cached = user.__dict__.setdefault("_claim_objects", {})
+    if claim not in cached:
+        value = user.claims.get(claim)
+        cached[claim] = (
+            model.from_db(DEFAULT_DB_ALIAS, [model._meta.pk.attname], [model._meta.pk.to_python(value)])
+            if value is not None else None
+        )
+    return cached[claim]
+
+
+def user_role(user):
+    """'hiring_manager', 'candidate' or 'admin' (no profile or any other user_type)."""
+    claims = _token_claims(user)
+    if claims is not None:
+        return claims["role"]
+    user_type = getattr(user_profile(user), "user_type", "")
+    return user_type if user_type in ROLES else "admin"
+
+
+def hiring_manager_for(user):
+    """The user's HiringManager, None when they are not a recruiter."""
+    if _token_claims(user) is not None:
+        return _from_claim(user, HiringManager, "hiring_manager_id")
+    return _related(user_profile(user), "hiring_manager")
+
+
+def candidate_for(user):
+    """The user's Candidate record, None when they are not a candidate."""
+    if _token_claims(user) is not None:
+        return _from_claim(user, Candidate, "candidate_id")
+    return _related(user_profile(user), "candidate")
+
+
+def role_claims(user):
+    hiring_manager = hiring_manager_for(user)
+    candidate = candidate_for(user)
+    return {
+        "role": user_role(user),
+        "hiring_manager_id": hiring_manager.pk if hiring_manager else None,
+        "candidate_id": str(candidate.pk) if candidate else None,
+    }
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the role claims; the access tokens derived from it
+    copy them, so permission checks read the role without a query. They are
+    re-read at each refresh (DenylistTokenRefreshSerializer): a role change
+    takes effect within ACCESS_TOKEN_LIFETIME.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim, value in role_claims(user).items():
+            token[claim] = value
+        return token
+
+
+def token_role(request):
+    """Role claim of the request's token, None for tokens issued without it."""
+    token = getattr(request, "auth", None)
+    return token.get("role") if token is not None and hasattr(token, "get") else None
+
+
+class LoginBusy(Exception):
+    """No password check slot freed within LOGIN_HASH_WAIT_SECONDS."""
+
+
+_login_slots = None
+_login_slots_lock = threading.Lock()
+
+
+def _login_semaphore():
+    global _login_slots
+    if _login_slots is None:
+        with _login_slots_lock:
+            if _login_slots is None:
+                _login_slots = threading.BoundedSemaphore(max(getattr(settings, "LOGIN_HASH_CONCURRENCY", 1), 1))
+    return _login_slots
+
+
+def find_login_user(identifier):
+    """
+    The user whose email or username is `identifier`, with profile and role
+    objects, in one query; an email match wins over a username match.
+    """
+    return (
+        user_queryset()
+        .filter(Q(email=identifier) | Q(username=identifier))
+        .order_by(Case(When(email=identifier, then=Value(0)), default=Value(1)), "pk")
+        .first()
+    )
+
+
+def check_login_password(user, password):
+    """
+    ModelBackend's checks without its extra query: the password matches and
+    the account is active. At most LOGIN_HASH_CONCURRENCY hashes run at once
+    per process (LoginBusy after LOGIN_HASH_WAIT_SECONDS); a hash made with
+    another hasher or work factor is rehashed on success (one UPDATE).
+    """
+    slots = _login_semaphore()
+    if not slots.acquire(timeout=getattr(settings, "LOGIN_HASH_WAIT_SECONDS", 10)):
+        raise LoginBusy
+    try:
+        is_correct = user.check_password(password)
+    finally:
+        slots.release()
+    return is_correct and user.is_active
+
+
+def _version_key(user_id):
+    return f"auth_user_version:{user_id}"
+
+
+def user_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # time based: never reuses a version whose entries may still be cached
+        cache.add(_version_key(user_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def invalidate_user(user_id):
+    """Called on writes to the user, their profile or role object (see signals.py)."""
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def load_user(user_id):
+    """
+    The user with profile and role objects (one query), None if unknown. With
+    AUTH_USER_CACHE_TIMEOUT > 0, kept in the process for that many seconds per
+    (user id, version): a write bumps the version in the shared cache. Each call
+    returns its own copy, views may modify it.
+    """
+    lookup = {jwt_settings.USER_ID_FIELD: user_id}
+    timeout = getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 0)
+    if not timeout:
+        return user_queryset().filter(**lookup).first()
+
+    key = (user_id, user_version(user_id))
+    now = time.monotonic()
+    entry = _users.get(key)
+    if entry is None or entry[0] < now:
+        user = user_queryset().filter(**lookup).first()
+        if user is None:
+            return None
+        entry = (now + timeout, user)
+        with _users_lock:
+            if len(_users) >= getattr(settings, "AUTH_USER_CACHE_SIZE", 1024):
+                # stale versions and expired entries go first, then the oldest ones
+                for stale in [k for k, (expires, _) in _users.items() if k[0] == user_id or expires < now]:
+                    del _users[stale]
+                while len(_users) >= getattr(settings, "AUTH_USER_CACHE_SIZE", 1024):
+                    del _users[next(iter(_users))]
+            _users[key] = entry
+    return copy.deepcopy(entry[1])
+
+
+_denylist_lock = threading.Lock()
+_denylist = {
+    "jtis": {},  # jti -> expiry
+    "users": {},  # user id -> tokens issued before this instant are revoked
+    "loaded_until": None,
+    "checked_at": float("-inf"),
+}
+
+
+def _token_expiry(token):
+    return datetime.fromtimestamp(token["exp"], tz=dt_timezone.utc)
+
+
+def _remember(jti, user_id, revoked_at, expires_at):
+    if jti:
+        _denylist["jtis"][jti] = expires_at
+    elif user_id is not None:
+        users = _denylist["users"]
+        users[str(user_id)] = max(revoked_at, users.get(str(user_id), revoked_at))
+
+
+def refresh_denylist(force=False):
+    """
+    Read the revocations recorded since the previous refresh, at most every
+    JWT_DENYLIST_REFRESH_SECONDS per process (a revocation made by another
+    process is seen within that delay); expired entries are dropped.
+    """
+    interval = getattr(settings, "JWT_DENYLIST_REFRESH_SECONDS", 30)
+    if not force and time.monotonic() - _denylist["checked_at"] < interval:
+        return
+    with _denylist_lock:
+        if not force and time.monotonic() - _denylist["checked_at"] < interval:
+            return
+        now = timezone.now()
+        rows = RevokedToken.objects.filter(expires_at__gt=now)
+        if _denylist["loaded_until"] is not None:
+            # overlap: rows committed after the previous read with an earlier revoked_at
+            rows = rows.filter(revoked_at__gte=_denylist["loaded_until"] - timedelta(seconds=interval))
+        for row in rows.values_list("jti", "user_id", "revoked_at", "expires_at"):
+            _remember(*row)
+        _denylist["jtis"] = {jti: expires for jti, expires in _denylist["jtis"].items() if expires > now}
+        oldest = now - jwt_settings.REFRESH_TOKEN_LIFETIME
+        _denylist["users"] = {user: at for user, at in _denylist["users"].items() if at > oldest}
+        _denylist["loaded_until"] = now
+        _denylist["checked_at"] = time.monotonic()
+
+
+def is_revoked(token):
+    refresh_denylist()
+    if token.get(jwt_settings.JTI_CLAIM) in _denylist["jtis"]:
+        return True
+    revoked_at = _denylist["users"].get(str(token.get(jwt_settings.USER_ID_CLAIM)))
+    return revoked_at is not None and token.get("iat", 0) < revoked_at.timestamp()
+
+
+def ensure_not_revoked(token):
+    """Raise InvalidToken for a revoked token; shared by every JWT authentication path."""
+    if is_revoked(token):
+        raise InvalidToken({"detail": "Token is revoked", "code": "token_not_valid"})
+
+
+def revoke_token(token):
+    """Deny a validated token (access or refresh) until it expires."""
+    jti, expires_at = token[jwt_settings.JTI_CLAIM], _token_expiry(token)
+    RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+    with _denylist_lock:
+        _remember(jti, None, timezone.now(), expires_at)
+
+
+def revoke_user_tokens(user_id):
+    """Deny every token of the user issued until now (account deactivated)."""
+    now = timezone.now()
+    RevokedToken.objects.create(user_id=user_id, revoked_at=now, expires_at=now + jwt_settings.REFRESH_TOKEN_LIFETIME)
+    with _denylist_lock:
+        _remember("", user_id, now, None)
+
+
+def purge_revoked_tokens():
+    return RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()[0]
+
+
+class ProfileJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication loading request.user with its profile and role object (load_user)."""
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        ensure_not_revoked(token)
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+
+        user = load_user(user_id)
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if jwt_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+        return user
+
+
+class StatelessJWTAuthentication(ProfileJWTAuthentication):
+    """
+    Trusts the signed claims (user id, role, hiring_manager_id, candidate_id):
+    request.user is a ClaimsUser built without a query, loaded on the first
+    read of a field outside the token. Deactivated accounts and logged out
+    tokens are refused through the denylist. Tokens issued without the role
+    claims are authenticated like ProfileJWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        if "role" not in validated_token or jwt_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+        field = ClaimsUser._meta.get_field(jwt_settings.USER_ID_FIELD)
+        user = ClaimsUser.from_db(DEFAULT_DB_ALIAS, [field.attname], [field.to_python(user_id)])
+        user.claims = {claim: validated_token.get(claim) for claim in ROLE_CLAIMS}
+        return user
+
+
+class DenylistTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    auth/refresh/ refuses revoked refresh tokens (logout, deactivated account)
+    and re-reads the role claims (one query, load_user): with rotation a client
+    may never log in again, a role change applies from its next refresh.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        ensure_not_revoked(refresh)
+        user_id = refresh.get(jwt_settings.USER_ID_CLAIM)
+        user = load_user(user_id) if user_id else None
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+        for claim, value in role_claims(user).items():
+            refresh[claim] = value
+
+        # same rotation as TokenRefreshSerializer.validate
+        data = {"access": str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # token_blacklist app not installed
+                    pass
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            try:
+                refresh.outstand()
+            except AttributeError:
+                pass
+            data["refresh"] = str(refresh)
+        return data
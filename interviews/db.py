@@ -0,0 +1,130 @@
+# read replica routing: reporting reads opt in, writes and everything else stay on the primary
+import contextvars
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA = "replica"
+_read_alias = contextvars.ContextVar("read_alias", default=None)
+
+# seconds since the last replayed transaction, 0 when the replica has replayed all it received
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+_lag_lock = threading.Lock()
+_lag = {"checked_at": float("-inf"), "value": None}
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def replica_lag():
+    """
+    Replication lag of the replica in seconds, None when it cannot be reached.
+    Measured at most once every REPLICA_LAG_CHECK_INTERVAL seconds per process.
+    """
+    interval = getattr(settings, "REPLICA_LAG_CHECK_INTERVAL", 5)
+    with _lag_lock:
+        if time.monotonic() - _lag["checked_at"] < interval:
+            return _lag["value"]
+        connection = connections[REPLICA]
+        try:
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute(LAG_SQL)
+                    value = float(cursor.fetchone()[0] or 0)
+            else:
+                # local setups (two SQLite files ...): no replication to measure
+                connection.ensure_connection()
+                value = 0.0
+        except DatabaseError:
+            logger.warning("Read replica unreachable, reads stay on the primary", exc_info=True)
+            value = None
+        _lag.update(checked_at=time.monotonic(), value=value)
+        return value
+
+
+def _sticky_key(user_id):
+    return f"replica:sticky:{user_id}"
+
+
+def pin_to_primary(user):
+    """Send this user's replica reads to the primary for REPLICA_STICKY_SECONDS (read-your-writes)."""
+    if replica_configured() and getattr(user, "is_authenticated", False):
+        cache.set(_sticky_key(user.pk), 1, getattr(settings, "REPLICA_STICKY_SECONDS", 10))
+
+
+def read_db(user=None):
+    """
+    Alias to read reporting data from: the replica unless it is not configured,
+    lags more than REPLICA_MAX_LAG_SECONDS, or the user wrote recently.
+    """
+    if not replica_configured():
+        return DEFAULT_DB_ALIAS
+    if user is not None and getattr(user, "is_authenticated", False) and cache.get(_sticky_key(user.pk)):
+        return DEFAULT_DB_ALIAS
+    lag = replica_lag()
+    if lag is None or lag > getattr(settings, "REPLICA_MAX_LAG_SECONDS", 5):
+        return DEFAULT_DB_ALIAS
+    return REPLICA
+
+
+def on_replica(queryset, user=None):
+    """Per-queryset hint: the queryset reads from read_db(user), even when evaluated later (streaming)."""
+    return queryset.using(read_db(user))
+
+
+@contextmanager
+def replica_reads(user=None):
+    """Routes the ORM reads of the block (lazy relations included) to read_db(user)."""
+    token = _read_alias.set(read_db(user))
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def use_replica(view_method):
+    """Per-view hint for APIView / ViewSet methods: reads of the method body go to the replica."""
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        with replica_reads(request.user):
+            return view_method(self, request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Reads go to the alias chosen by replica_reads() / use_replica, the primary
+    otherwise; inside a transaction on the primary, reads stay there. Writes
+    always target the primary. Migrations are not restricted: a physical replica
+    is never migrated, a local copy used for testing can be (migrate --database replica).
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA}:
+            return True
+        return None
@@ -0,0 +1,62 @@
+# ETags of polled endpoints computed from version columns (updated_at ...), never from the rendered body
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
+
+from .auth import candidate_for, hiring_manager_for, user_profile
+from .models import InterviewSession
+
+
+def _digest(*parts):
+    return hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def conditional_get(etag_func):
+    """
+    Class decorator for an APIView: GET answers 304 when If-None-Match matches
+    etag_func(request, ...), before the view body runs. It runs after DRF
+    authentication, so the ETag can depend on request.user; responses are
+    private to that user and must be revalidated.
+    """
+    return method_decorator(
+        [vary_on_headers("Authorization"), cache_control(private=True, no_cache=True), condition(etag_func=etag_func)],
+        name="get",
+    )
+
+
+def auth_me_etag(request, *args, **kwargs):
+    """User fields + profile / hiring manager / candidate versions, loaded with request.user: no query."""
+    user = request.user
+    profile = user_profile(user)
+    hiring_manager = hiring_manager_for(user)
+    candidate = candidate_for(user)
+    versions = (
+        getattr(profile, "user_type", None),
+        getattr(profile, "updated_at", None),
+        getattr(hiring_manager, "updated_at", None),
+        getattr(candidate, "last_activity", None),
+    )
+    return _digest(user.pk, user.username, user.email, user.first_name, user.last_name, versions)
+
+
+def candidate_interviews_etag(request, *args, **kwargs):
+    """
+    Number and last change of the candidate's sessions, last change of their
+    campaigns and total question count (catches added / removed questions).
+    None when the user is not a candidate: the view answers 403 unconditionally.
+    """
+    candidate = candidate_for(request.user)
+    if candidate is None:
+        return None
+    candidate_id = candidate.pk
+    state = InterviewSession.objects.filter(candidate_id=candidate_id).aggregate(
+        sessions=Count("id", distinct=True),
+        updated=Max("updated_at"),
+        campaigns=Max("campaign__updated_at"),
+        questions=Count("campaign__questions"),
+    )
+    return _digest(candidate_id, *state.values())
@@ -0,0 +1,152 @@
+# streamed export of campaign results: one flat row per evaluation (CSV, NDJSON, XLSX)
+import csv
+import io
+import tempfile
+from uuid import UUID
+
+import xlsxwriter
+
+from .db import on_replica
+from .models import Evaluation, InterviewSession
+from .renderers import dumps
+
+EXPORT_CHUNK_SIZE = 2000  # rows fetched per server-side cursor round trip
+FLUSH_ROWS = 500  # rows buffered per chunk sent to the client
+XLSX_READ_SIZE = 256 * 1024
+
+# (column, lookup from InterviewSession); a session without response / a response
+# without evaluation still produces one row (LEFT JOINs)
+COLUMNS = [
+    ("session_id", "id"),
+    ("session_status", "status"),
+    ("invited_at", "invited_at"),
+    ("started_at", "started_at"),
+    ("completed_at", "completed_at"),
+    ("candidate_email", "candidate__email"),
+    ("candidate_first_name", "candidate__first_name"),
+    ("candidate_last_name", "candidate__last_name"),
+    ("response_id", "responses__id"),
+    ("question_order", "responses__question__order"),
+    ("question_text", "responses__question__text"),
+    ("duration", "responses__duration"),
+    ("upload_status", "responses__upload_status"),
+    ("recorded_at", "responses__recorded_at"),
+    ("video_url", "responses__video_url"),
+    ("video_file", "responses__video_file"),
+    ("storage_tier", "responses__storage_tier"),
+    ("speech_rate", "responses__ai_analysis__speech_rate"),
+    ("speech_confidence", "responses__ai_analysis__speech_confidence"),
+    ("silence_ratio", "responses__ai_analysis__silence_ratio"),
+    ("evaluation_id", "responses__evaluations__id"),
+    ("evaluator_id", "responses__evaluations__hiring_manager_id"),
+    ("technical_skill", "responses__evaluations__technical_skill"),
+    ("communication", "responses__evaluations__communication"),
+    ("motivation", "responses__evaluations__motivation"),
+    ("cultural_fit", "responses__evaluations__cultural_fit"),
+    ("recommended", "responses__evaluations__recommended"),
+    ("notes", "responses__evaluations__notes"),
+    ("evaluated_at", "responses__evaluations__evaluated_at"),
+]
+HEADER = [name for name, _ in COLUMNS] + ["overall_score"]
+_RATINGS = [HEADER.index(name) for name in ("technical_skill", "communication", "motivation", "cultural_fit")]
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def iter_result_rows(campaign_id, chunk_size=EXPORT_CHUNK_SIZE, user=None):
+    """
+    Flat result rows of a campaign from a single query read through a server-side
+    cursor: memory use does not depend on the number of rows. Read from the
+    replica when available (see interviews/db.py; `user` for read-your-writes).
+    """
+    rows = (
+        on_replica(InterviewSession.objects.filter(campaign_id=campaign_id), user)
+        .order_by("invited_at", "id", "responses__question__order", "responses__id", "responses__evaluations__id")
+        .values_list(*(lookup for _, lookup in COLUMNS))
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        row = list(row)
+        row.append(Evaluation.combine_scores(*(row[i] for i in _RATINGS)))
+        yield row
+
+
+# a spreadsheet evaluates a cell starting with one of these (candidate names, notes ...)
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, UUID):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # formula injection: the leading quote makes the cell plain text
+        return "'" + value
+    return value
+
+
+def stream_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM: Excel opens UTF-8 CSV files correctly
+    buffer.write("\ufeff")
+    writer.writerow(HEADER)
+    for n, row in enumerate(rows, start=1):
+        writer.writerow([_text(v) for v in row])
+        if n % FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(dumps(dict(zip(HEADER, row))))
+        if len(chunk) == FLUSH_ROWS:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+
+def stream_xlsx(rows):
+    """
+    xlsxwriter in constant_memory mode flushes each row to a temporary file as soon
+    as the next one starts; the zipped workbook is then sent in chunks.
+    """
+    with tempfile.TemporaryFile() as output:
+        workbook = xlsxwriter.Workbook(output, {
+            "constant_memory": True,
+            "remove_timezone": True,
+            "default_date_format": "yyyy-mm-dd hh:mm",
+            "strings_to_urls": False,
+            "strings_to_formulas": False,  # "=..." typed by a candidate stays text
+        })
+        sheet = workbook.add_worksheet("Résultats")
+        sheet.write_row(0, 0, HEADER)
+        for n, row in enumerate(rows, start=1):
+            sheet.write_row(n, 0, [str(v) if isinstance(v, UUID) else v for v in row])
+        workbook.close()
+        output.seek(0)
+        while True:
+            data = output.read(XLSX_READ_SIZE)
+            if not data:
+                break
+            yield data
+
+
+STREAMS = {"csv": stream_csv, "ndjson": stream_ndjson, "xlsx": stream_xlsx}
+
+
+def export_campaign_results(campaign_id, export_format, user=None):
+    """Iterator of bytes for a StreamingHttpResponse."""
+    return STREAMS[export_format](iter_result_rows(campaign_id, user=user))
@@ -0,0 +1,32 @@
+# password hashers whose work factor comes from the settings; a stored hash made
+# with other parameters (or another hasher) is rehashed at the next successful login
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """pbkdf2_sha256 with PASSWORD_PBKDF2_ITERATIONS iterations (Django's default otherwise)."""
+
+    @property
+    def iterations(self):
+        return getattr(settings, "PASSWORD_PBKDF2_ITERATIONS", None) or PBKDF2PasswordHasher.iterations
+
+
+class TunableScryptPasswordHasher(ScryptPasswordHasher):
+    """scrypt (standard library, memory-hard) with N = PASSWORD_SCRYPT_WORK_FACTOR."""
+
+    @property
+    def work_factor(self):
+        return getattr(settings, "PASSWORD_SCRYPT_WORK_FACTOR", None) or ScryptPasswordHasher.work_factor
+
+
+class TunableArgon2PasswordHasher(Argon2PasswordHasher):
+    """argon2id (argon2-cffi) with PASSWORD_ARGON2_TIME_COST / PASSWORD_ARGON2_MEMORY_COST (KiB)."""
+
+    @property
+    def time_cost(self):
+        return getattr(settings, "PASSWORD_ARGON2_TIME_COST", None) or Argon2PasswordHasher.time_cost
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, "PASSWORD_ARGON2_MEMORY_COST", None) or Argon2PasswordHasher.memory_cost
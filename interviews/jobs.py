@@ -0,0 +1,142 @@
+# lifecycle of MediaJob rows: enqueue, start, progress, retry with backoff, finish
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.utils import timezone
+
+from .models import MediaJob
+
+ACTIVE_STATES = ("queued", "running", "retrying")
+
+
+def backoff_delay(attempt, base=None, cap=None):
+    """Exponential backoff with jitter: half of the delay is fixed, half random."""
+    base = base if base is not None else getattr(settings, "MEDIA_JOB_RETRY_BASE", 5)
+    cap = cap if cap is not None else getattr(settings, "MEDIA_JOB_RETRY_CAP", 600)
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def enqueue_job(task, kind, campaign, video_response=None, bytes_total=None, **task_kwargs):
+    """
+    Record a MediaJob and send `task` with job_id=<id> once the transaction commits
+    (the worker must be able to read the row).
+    """
+    job = MediaJob.objects.create(
+        kind=kind, campaign=campaign, video_response=video_response,
+        bytes_total=bytes_total, params=task_kwargs,
+    )
+
+    def send():
+        result = task.apply_async(kwargs={**task_kwargs, "job_id": job.pk})
+        MediaJob.objects.filter(pk=job.pk, task_id="").update(task_id=result.id or "")
+
+    transaction.on_commit(send)
+    return job
+
+
+def job_started(job_id, task_id=""):
+    """Queued/retrying -> running; returns False if the job was cancelled or already finished."""
+    if not job_id:
+        return True
+    now = timezone.now()
+    return bool(
+        MediaJob.objects.filter(pk=job_id, state__in=ACTIVE_STATES).update(
+            state="running", attempts=F("attempts") + 1, task_id=task_id or F("task_id"),
+            started_at=now, heartbeat_at=now, next_retry_at=None, bytes_done=0,
+        )
+    )
+
+
+def job_retrying(job_id, error, countdown):
+    if job_id:
+        MediaJob.objects.filter(pk=job_id, state="running").update(
+            state="retrying", error=str(error)[:2000],
+            next_retry_at=timezone.now() + timedelta(seconds=countdown),
+        )
+
+
+def job_failed(job_id, error):
+    if job_id:
+        MediaJob.objects.filter(pk=job_id).exclude(state__in=["succeeded", "cancelled"]).update(
+            state="failed", error=str(error)[:2000], finished_at=timezone.now()
+        )
+
+
+def job_succeeded(job_id, result=None, bytes_done=None):
+    if job_id:
+        fields = {"state": "succeeded", "result": result, "error": "", "finished_at": timezone.now()}
+        if bytes_done is not None:
+            fields["bytes_done"] = bytes_done
+        MediaJob.objects.filter(pk=job_id, state="running").update(**fields)
+
+
+class ProgressReporter:
+    """
+    Count processed bytes for a running job and persist them at most every
+    `min_bytes` or `min_interval` seconds, with a conditional UPDATE (no read,
+    never moves backwards, ignored once the job left the running state).
+    Safe to call from worker threads; only the creating thread writes to the DB.
+    """
+
+    def __init__(self, job_id, min_bytes=None, min_interval=None):
+        self.job_id = job_id
+        self.min_bytes = min_bytes or getattr(settings, "MEDIA_JOB_PROGRESS_BYTES", 8 * 1024 * 1024)
+        self.min_interval = min_interval or getattr(settings, "MEDIA_JOB_PROGRESS_INTERVAL", 2.0)
+        self.done = 0
+        self._saved = 0
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._owner = threading.get_ident()
+
+    def __call__(self, nbytes):
+        with self._lock:
+            self.done += nbytes
+        if threading.get_ident() == self._owner and (
+            self.done - self._saved >= self.min_bytes or time.monotonic() - self._saved_at >= self.min_interval
+        ):
+            self.flush()
+
+    def set_total(self, total):
+        if self.job_id and total:
+            MediaJob.objects.filter(pk=self.job_id).update(bytes_total=total)
+
+    def flush(self):
+        done = self.done
+        if self.job_id and done > self._saved:
+            MediaJob.objects.filter(pk=self.job_id, state="running", bytes_done__lt=done).update(
+                bytes_done=done, heartbeat_at=timezone.now()
+            )
+        self._saved = done
+        self._saved_at = time.monotonic()
+
+
+def campaign_job_status(campaign_id, stuck_after=None):
+    """Per kind/state counts, bytes and stuck jobs of a campaign, in one grouped query."""
+    stuck_after = stuck_after or getattr(settings, "MEDIA_JOB_STUCK_AFTER", 600)
+    cutoff = timezone.now() - timedelta(seconds=stuck_after)
+    rows = (
+        MediaJob.objects.filter(campaign_id=campaign_id)
+        .values("kind", "state")
+        .annotate(
+            count=Count("id"),
+            bytes_done=Sum("bytes_done"),
+            bytes_total=Sum("bytes_total"),
+            stuck=Count("id", filter=Q(state="running", heartbeat_at__lt=cutoff)),
+            last_update=Max("heartbeat_at"),
+        )
+        .order_by("kind", "state")
+    )
+    status = {}
+    for row in rows:
+        kind = status.setdefault(row["kind"], {"states": {}, "stuck": 0, "bytes_done": 0, "bytes_total": 0})
+        kind["states"][row["state"]] = row["count"]
+        kind["stuck"] += row["stuck"]
+        kind["bytes_done"] += row["bytes_done"] or 0
+        kind["bytes_total"] += row["bytes_total"] or 0
+    return status
@@ -0,0 +1,45 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from interviews.analysis import analysis_version, run_analysis
+from interviews.models import VideoCampaign
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the AI_ANALYZERS on video responses whose AIAnalysis is missing or was produced by "
+        "another AI_ANALYSIS_VERSION. Files are analyzed in a process pool whose workers load the "
+        "models once; results are written in bulk, batch by batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--campaign", default=None, help="Only this campaign (id)")
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=None, help="Worker processes, 0 = in process. Default: AI_ANALYSIS_WORKERS or one per core")
+        parser.add_argument("--max-batches", type=int, default=None)
+        parser.add_argument("--dry-run", action="store_true", help="Only count outdated responses")
+
+    def handle(self, *args, **options):
+        campaign = None
+        if options["campaign"]:
+            campaign = VideoCampaign.objects.filter(pk=options["campaign"]).first()
+            if campaign is None:
+                raise CommandError(f"Unknown campaign {options['campaign']!r}")
+        try:
+            analyzed, failed = run_analysis(
+                campaign=campaign,
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                max_batches=options["max_batches"],
+                dry_run=options["dry_run"],
+                log=lambda msg: self.stdout.write(self.style.ERROR(msg)),
+            )
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(
+                f"[DRY RUN] {analyzed} responses to analyze (version {analysis_version()})."
+            ))
+            return
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f"{analyzed} responses analyzed (version {analysis_version()}), {failed} failures."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from interviews.archive import archive_closed_campaigns, process_restore_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the videos of campaigns whose end_date is older than the retention window to cold "
+        "storage (S3 storage class / MEDIA_ARCHIVE_ROOT), then advance pending restore jobs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retention-days", type=int, default=None, help="Default: MEDIA_ARCHIVE_RETENTION_DAYS")
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--workers", type=int, default=8, help="Parallel storage-class changes")
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--restores-only", action="store_true", help="Only process restore jobs")
+
+    def handle(self, *args, **options):
+        log = lambda msg: self.stdout.write(self.style.ERROR(msg))  # noqa: E731
+        if not options["restores_only"]:
+            archived, archived_bytes, failures = archive_closed_campaigns(
+                retention_days=options["retention_days"],
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                dry_run=options["dry_run"],
+                log=log,
+            )
+            prefix = "[DRY RUN] would archive" if options["dry_run"] else "Archived"
+            style = self.style.WARNING if failures else self.style.SUCCESS
+            self.stdout.write(style(f"{prefix} {archived} files ({archived_bytes} bytes, {failures} failures)."))
+        if options["dry_run"]:
+            return
+        summary = process_restore_jobs(log=log)
+        self.stdout.write(", ".join(f"{n} restores {state}" for state, n in summary.items()))
@@ -100,7 +100,7 @@ class Command(BaseCommand):
             for session in sessions_to_cancel:
                 previous_status = session.status
                 session.status = "cancelled"
-                session.save(update_fields=["status"])  # keep timestamps unchanged
+                session.save(update_fields=["status", "updated_at"])  # keep the other timestamps unchanged
                 updated_count += 1
 
                 try:
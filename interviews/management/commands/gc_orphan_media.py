@@ -0,0 +1,147 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from itertools import islice
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.utils import timezone
+
+from interviews.media import iter_stored_files, list_stored_dir, process_pending_deletes, schedule_file_delete
+from interviews.models import MediaBlob, PendingDelete, VideoResponse
+
+# video_responses/<campaign>/<session>/... (session layout) and responses/<campaign>/<session>/... (presigned)
+SESSION_PATH = re.compile(r"^[^/]+/[0-9a-f-]{36}/([0-9a-f-]{36})/")
+
+
+def _referenced_by_url(names):
+    """Names referenced through VideoResponse.video_url (presigned uploads registered by URL)."""
+    session_ids = {m.group(1) for m in map(SESSION_PATH.match, names) if m}
+    if not session_ids:
+        return set()
+    paths = {
+        unquote(urlparse(url).path).lstrip("/")
+        for url in VideoResponse.objects.filter(session_id__in=session_ids)
+        .exclude(video_url="").values_list("video_url", flat=True)
+    }
+    return {name for name in names if any(path.endswith(name) for path in paths)}
+
+
+def _referenced(names):
+    """Anti-join of one chunk of listed names against the database."""
+    known = set(VideoResponse.objects.filter(video_file__in=names).values_list("video_file", flat=True))
+    known.update(MediaBlob.objects.filter(storage_name__in=names).values_list("storage_name", flat=True))
+    known.update(PendingDelete.objects.filter(storage_name__in=names).values_list("storage_name", flat=True))
+    return known | _referenced_by_url([n for n in names if n not in known])
+
+
+class Command(BaseCommand):
+    help = (
+        "Find stored media files that no VideoResponse / MediaBlob references (aborted submissions, "
+        "presigned uploads never registered) and queue those older than a grace period for deletion. "
+        "The storage listing is streamed and checked against the database in chunks, prefixes in parallel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prefix", action="append", dest="prefixes", default=None,
+            help="Storage prefix to scan (repeatable). Default: MEDIA_GC_PREFIXES",
+        )
+        parser.add_argument("--grace-hours", type=float, default=None, help="Default: MEDIA_GC_GRACE_HOURS")
+        parser.add_argument("--workers", type=int, default=8, help="Prefixes scanned in parallel")
+        parser.add_argument("--split-depth", type=int, default=2, help="Directory levels expanded into parallel units")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Names per anti-join query")
+        parser.add_argument("--dry-run", action="store_true", help="Only report orphans")
+        parser.add_argument("--no-purge", action="store_true", help="Queue orphans without draining the queue")
+
+    def handle(self, *args, **options):
+        prefixes = options["prefixes"] or getattr(settings, "MEDIA_GC_PREFIXES", ["video_responses/", "responses/"])
+        grace_hours = options["grace_hours"]
+        if grace_hours is None:
+            grace_hours = getattr(settings, "MEDIA_GC_GRACE_HOURS", 24)
+        self.cutoff = timezone.now() - timedelta(hours=grace_hours)
+        self.batch_size = options["batch_size"]
+        self.dry_run = options["dry_run"]
+
+        blobs, blob_bytes = self._collect_unreferenced_blobs()
+        units = []
+        for prefix in prefixes:
+            units.extend(self._split(prefix.rstrip("/") + "/", options["split_depth"]))
+
+        scanned, orphans, orphan_bytes = 0, blobs, blob_bytes
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            futures = [executor.submit(self._scan, files) for files in units]
+            for future in as_completed(futures):
+                n, found, size = future.result()
+                scanned += n
+                orphans += found
+                orphan_bytes += size
+
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING(
+                f"[DRY RUN] {orphans} orphans ({orphan_bytes} bytes) out of {scanned} files scanned."
+            ))
+            return
+        deleted = failed = 0
+        if not options["no_purge"]:
+            deleted, failed = process_pending_deletes()
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(
+            f"{scanned} files scanned, {orphans} orphans queued, {orphan_bytes} bytes reclaimed "
+            f"({deleted} files deleted, {failed} failures)."
+        ))
+
+    def _collect_unreferenced_blobs(self):
+        """Blobs registered (e.g. by fetch_and_store_video) but never attached to a VideoResponse."""
+        with transaction.atomic():
+            stale = list(
+                MediaBlob.objects.select_for_update()
+                .filter(ref_count__lte=0, created_at__lt=self.cutoff)
+                .exclude(sha256__in=VideoResponse.objects.exclude(sha256="").values("sha256"))
+                .values_list("id", "storage_name", "size")
+            )
+            if self.dry_run:
+                for _, name, size in stale:
+                    self.stdout.write(f" - {name} ({size} bytes, unreferenced blob)")
+            elif stale:
+                MediaBlob.objects.filter(id__in=[pk for pk, _, _ in stale]).delete()
+                schedule_file_delete(*[name for _, name, _ in stale])
+        return len(stale), sum(size for _, _, size in stale)
+
+    def _split(self, prefix, depth):
+        """Parallel units: files directly under each expanded directory, plus the deeper subtrees."""
+        if depth <= 0:
+            return [iter_stored_files(prefix)]
+        files, subdirs = list_stored_dir(prefix)
+        units = [iter(files)] if files else []
+        for subdir in subdirs:
+            units.extend(self._split(subdir, depth - 1))
+        return units
+
+    def _scan(self, files):
+        """Runs in a worker thread: returns (scanned, orphans, orphan_bytes)."""
+        scanned = orphans = orphan_bytes = 0
+        try:
+            while True:
+                chunk = list(islice(files, self.batch_size))
+                if not chunk:
+                    break
+                scanned += len(chunk)
+                # recent files may belong to a submission still in progress
+                old = {name: size for name, size, modified in chunk if modified < self.cutoff}
+                if not old:
+                    continue
+                known = _referenced(list(old))
+                found = [name for name in old if name not in known]
+                orphans += len(found)
+                orphan_bytes += sum(old[name] for name in found)
+                if self.dry_run:
+                    for name in found:
+                        self.stdout.write(f" - {name} ({old[name]} bytes)")
+                else:
+                    schedule_file_delete(*found)
+        finally:
+            connections.close_all()
+        return scanned, orphans, orphan_bytes
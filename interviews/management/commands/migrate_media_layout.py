@@ -0,0 +1,153 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from interviews.media import (
+    content_addressed_name, copy_stored_file, file_sha256, is_content_addressed,
+    schedule_file_delete, video_storage_layout, video_storage_name,
+)
+from interviews.models import MediaBlob, VideoResponse
+
+LAYOUTS = ["hash", "session", "flat"]
+
+
+def _in_layout(response, layout):
+    name = response.video_file.name
+    if layout == "hash":
+        return is_content_addressed(name)
+    if layout == "session":
+        session = response.session
+        return name.startswith(f"video_responses/{session.campaign_id}/{session.id}/")
+    return name.count("/") == 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Move existing VideoResponse files to a storage layout (hash prefix or campaign/session "
+        "shards): files are copied in parallel, then video_file paths are rewritten in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--layout", choices=LAYOUTS, default=None, help="Default: VIDEO_STORAGE_LAYOUT")
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--workers", type=int, default=8, help="Parallel file copies")
+        parser.add_argument("--keep-old", action="store_true", help="Do not delete the previous files")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        layout = options["layout"] or video_storage_layout()
+        if layout not in LAYOUTS:
+            raise CommandError(f"Unknown layout {layout!r}")
+        self.layout = layout
+        self.keep_old = options["keep_old"]
+        batch_size = options["batch_size"]
+
+        base_qs = (
+            VideoResponse.objects
+            .exclude(video_file="")
+            .filter(storage_tier="hot")  # archived objects cannot be read back
+            .select_related("session")
+            .only("id", "video_file", "sha256", "session__id", "session__campaign_id")
+            .order_by("id")
+        )
+        moved = failed = checked = 0
+        last_id = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            while True:
+                # keyset pagination: rows are rewritten while we iterate
+                batch = list(base_qs.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                checked += len(batch)
+                todo = [r for r in batch if not _in_layout(r, layout)]
+                if not todo:
+                    continue
+                if options["dry_run"]:
+                    for r in todo:
+                        self.stdout.write(f" - response={r.id} {r.video_file.name}")
+                    moved += len(todo)
+                    continue
+                known = dict(
+                    MediaBlob.objects.filter(sha256__in=[r.sha256 for r in todo if r.sha256])
+                    .values_list("sha256", "storage_name")
+                )
+                results = list(executor.map(lambda r: self._place(r, known), todo))
+                ok = [res for res in results if res[3] is None]
+                for response, _, _, error in results:
+                    if error is not None:
+                        failed += 1
+                        self.stdout.write(self.style.ERROR(f"response={response.id} {response.video_file.name}: {error}"))
+                moved += self._commit(ok)
+                self.stdout.write(f"... {checked} checked, {moved} moved")
+
+        prefix = "[DRY RUN] would move" if options["dry_run"] else "Moved"
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f"{prefix} {moved} files to layout '{layout}' ({failed} failures, {checked} checked)."))
+
+    def _place(self, response, known):
+        """Copy one file to its new name (runs in a worker thread, no DB access)."""
+        old_name = response.video_file.name
+        try:
+            sha256 = response.sha256
+            if self.layout == "hash" and not sha256:
+                with default_storage.open(old_name, "rb") as f:
+                    sha256 = file_sha256(f)
+            if self.layout == "hash":
+                new_name = known.get(sha256) or content_addressed_name(sha256, old_name)
+            else:
+                response.sha256 = sha256
+                new_name = video_storage_name(response, old_name, layout=self.layout)
+            if not default_storage.exists(new_name):
+                copy_stored_file(old_name, new_name)
+            return response, new_name, sha256, None
+        except Exception as e:
+            return response, None, None, e
+
+    def _commit(self, placed):
+        if not placed:
+            return 0
+        old_names = {r.video_file.name for r, _, _, _ in placed}
+        touched = {r.sha256 for r, _, _, _ in placed if r.sha256}
+        with transaction.atomic():
+            for response, new_name, sha256, _ in placed:
+                response.video_file.name = new_name
+                response.sha256 = sha256 or response.sha256
+                if self.layout == "hash":
+                    MediaBlob.objects.get_or_create(
+                        sha256=response.sha256,
+                        defaults={"storage_name": new_name, "size": default_storage.size(new_name)},
+                    )
+                    touched.add(response.sha256)
+            VideoResponse.objects.bulk_update([r for r, _, _, _ in placed], ["video_file", "sha256"])
+            orphans = self._recount(touched)
+
+            still_used = set(
+                VideoResponse.objects.filter(video_file__in=old_names).values_list("video_file", flat=True)
+            )
+            to_delete = [n for n in old_names if n not in still_used and not is_content_addressed(n)]
+            if not self.keep_old:
+                # removed in batches by process_pending_deletes
+                schedule_file_delete(*to_delete, *orphans)
+        return len(placed)
+
+    def _recount(self, shas):
+        """Recompute reference counts (bulk_update bypasses the signals); return names of unreferenced blobs."""
+        refs = {
+            (sha256, name): n
+            for sha256, name, n in VideoResponse.objects.filter(sha256__in=shas)
+            .values("sha256", "video_file").annotate(n=Count("id")).values_list("sha256", "video_file", "n")
+        }
+        orphans = []
+        for blob in MediaBlob.objects.select_for_update().filter(sha256__in=shas):
+            count = refs.get((blob.sha256, blob.storage_name), 0)
+            if count:
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=count)
+            elif blob.ref_count:
+                # was referenced before the move and no longer is
+                orphans.append(blob.storage_name)
+                blob.delete()
+        return orphans
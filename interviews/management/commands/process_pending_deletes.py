@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from interviews.media import S3_DELETE_BATCH, process_pending_deletes
+from interviews.models import PendingDelete
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the stored files queued in the pending-delete outbox, in batches "
+        "(one S3 DeleteObjects request per batch). Failed deletions are retried later."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=S3_DELETE_BATCH, help="Max 1000 on S3")
+        parser.add_argument("--max-batches", type=int, default=None)
+        parser.add_argument("--loop", action="store_true", help="Keep running as a worker")
+        parser.add_argument("--interval", type=float, default=10.0, help="Seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        batch_size = min(options["batch_size"], S3_DELETE_BATCH)
+        while True:
+            deleted, failed = process_pending_deletes(batch_size=batch_size, max_batches=options["max_batches"])
+            if deleted or failed or not options["loop"]:
+                style = self.style.WARNING if failed else self.style.SUCCESS
+                self.stdout.write(style(
+                    f"Deleted {deleted} files, {failed} failures, {PendingDelete.objects.count()} pending."
+                ))
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from interviews.quotas import reconcile_storage_usage
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-hiring-manager storage ledger from VideoResponse.file_size and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Hiring managers per transaction")
+
+    def handle(self, *args, **options):
+        drift = reconcile_storage_usage(batch_size=options["batch_size"])
+        for hm_id, old, new in drift:
+            self.stdout.write(self.style.WARNING(f"hiring_manager={hm_id}: {old} -> {new} bytes"))
+        self.stdout.write(self.style.SUCCESS(f"Reconciled storage usage ({len(drift)} rows corrected)."))
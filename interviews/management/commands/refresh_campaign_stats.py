@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from interviews.rollups import refresh_daily_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the daily per-campaign analytics (CampaignDailyStats): only the days touched by "
+        "sessions / evaluations changed since the last watermark are recomputed. Use --full after "
+        "bulk deletions or to rebuild everything."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Recompute every campaign and day")
+        parser.add_argument("--campaigns-per-batch", type=int, default=100)
+
+    def handle(self, *args, **options):
+        campaigns, rows = refresh_daily_stats(
+            full=options["full"],
+            campaigns_per_batch=options["campaigns_per_batch"],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f"{rows} daily rows written for {campaigns} campaigns."))
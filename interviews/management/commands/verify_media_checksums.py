@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from interviews.media import file_sha256
+from interviews.archive import COLD_TIERS
+from interviews.models import MediaBlob, VideoResponse
+
+
+def _verify(blob):
+    """Return (blob, actual_sha256 or None, error)."""
+    try:
+        with default_storage.open(blob.storage_name, "rb") as f:
+            return blob, file_sha256(f), None
+    except Exception as e:
+        return blob, None, str(e)
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-read stored video objects, recompute their SHA-256 in parallel and "
+        "report objects that are missing or whose content no longer matches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8, help="Parallel reads")
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=30,
+            help="Only verify objects not verified during the last N days (0 = all)",
+        )
+        parser.add_argument("--limit", type=int, default=None, help="Max objects to verify")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        # objects in cold storage cannot be read back
+        archived = VideoResponse.objects.filter(storage_tier__in=COLD_TIERS).values("video_file")
+        qs = MediaBlob.objects.exclude(storage_name__in=archived).order_by("last_verified_at", "id")
+        if options["older_than_days"]:
+            cutoff = now - timedelta(days=options["older_than_days"])
+            qs = qs.filter(Q(last_verified_at__isnull=True) | Q(last_verified_at__lt=cutoff))
+        if options["limit"]:
+            qs = qs[:options["limit"]]
+
+        checked = 0
+        mismatches = 0
+        blobs = qs.iterator(chunk_size=options["batch_size"])
+
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            while True:
+                # executor.map consumes its input eagerly: feed it one batch at a time
+                batch = list(islice(blobs, options["batch_size"]))
+                if not batch:
+                    break
+                for blob, actual, error in executor.map(_verify, batch):
+                    checked += 1
+                    blob.last_verified_at = now
+                    blob.verified_ok = actual == blob.sha256
+                    if not blob.verified_ok:
+                        mismatches += 1
+                        reason = error or f"sha256={actual}"
+                        self.stdout.write(self.style.ERROR(
+                            f"MISMATCH {blob.storage_name} expected={blob.sha256} {reason} refs={blob.ref_count}"
+                        ))
+                MediaBlob.objects.bulk_update(batch, ["last_verified_at", "verified_ok"])
+
+        style = self.style.ERROR if mismatches else self.style.SUCCESS
+        self.stdout.write(style(f"Verified {checked} objects, {mismatches} mismatches."))
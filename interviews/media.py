@@ -0,0 +1,329 @@
+# content-addressed storage of video files (SHA-256) with reference counting
+import hashlib
+import os
+import posixpath
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .models import MediaBlob, PendingDelete, VideoResponse
+
+HASH_CHUNK_SIZE = 1024 * 1024
+S3_DELETE_BATCH = 1000  # max keys per DeleteObjects request
+
+
+class Sha256UploadMixin:
+    """Hash uploaded files while the request body streams in; exposes `file.sha256`."""
+
+    def new_file(self, *args, **kwargs):
+        # before super(): MemoryFileUploadHandler.new_file raises StopFutureHandlers
+        self._sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self._sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        f = super().file_complete(file_size)
+        if f is not None:
+            f.sha256 = self._sha256.hexdigest()
+        return f
+
+
+class Sha256MemoryFileUploadHandler(Sha256UploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class Sha256TemporaryFileUploadHandler(Sha256UploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def file_sha256(fileobj):
+    """SHA-256 of a file object (read in chunks, position restored when possible)."""
+    digest = hashlib.sha256()
+    chunks = fileobj.chunks(HASH_CHUNK_SIZE) if hasattr(fileobj, "chunks") else iter(
+        lambda: fileobj.read(HASH_CHUNK_SIZE), b""
+    )
+    for chunk in chunks:
+        digest.update(chunk)
+    if hasattr(fileobj, "seek"):
+        fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def _extension(filename):
+    return filename.rsplit(".", 1)[-1].lower() if "." in (filename or "") else ""
+
+
+def content_addressed_name(sha256, filename=""):
+    """video_responses/sha256/ab/cd/abcd....webm"""
+    prefix = getattr(settings, "VIDEO_BLOB_PREFIX", "video_responses/sha256")
+    ext = _extension(filename)
+    return f"{prefix}/{sha256[:2]}/{sha256[2:4]}/{sha256}" + (f".{ext}" if ext else "")
+
+
+def is_content_addressed(name):
+    prefix = getattr(settings, "VIDEO_BLOB_PREFIX", "video_responses/sha256")
+    return bool(name) and name.startswith(prefix + "/")
+
+
+def video_storage_layout():
+    return getattr(settings, "VIDEO_STORAGE_LAYOUT", "hash")
+
+
+def video_storage_name(instance, filename, layout=None):
+    """
+    Storage name of a VideoResponse file for the configured layout:
+    - "hash": video_responses/sha256/ab/cd/<sha256>.<ext> (deduplicated)
+    - "session": video_responses/<campaign>/<session>/<random>.<ext>
+    - "flat": video_responses/<filename> (legacy)
+    """
+    layout = layout or video_storage_layout()
+    ext = _extension(filename)
+    if layout == "hash" and instance.sha256:
+        return content_addressed_name(instance.sha256, filename)
+    if layout == "flat":
+        return f"video_responses/{os.path.basename(filename)}"
+    session = instance.session
+    return f"video_responses/{session.campaign_id}/{session.id}/{uuid.uuid4().hex}" + (f".{ext}" if ext else "")
+
+
+def _s3_key(name):
+    location = getattr(default_storage, "location", "") or ""
+    return posixpath.join(location, name) if location else name
+
+
+def copy_stored_file(src, dst):
+    """
+    Copy a stored file to a new name without going through the web process memory:
+    server-side copy on S3, hard link (or copy) on the local filesystem.
+    """
+    bucket = getattr(default_storage, "bucket_name", None)
+    if bucket:
+        from .s3 import get_s3_client, get_transfer_config
+        get_s3_client().copy(
+            {"Bucket": bucket, "Key": _s3_key(src)}, bucket, _s3_key(dst), Config=get_transfer_config()
+        )
+        return dst
+    src_path, dst_path = default_storage.path(src), default_storage.path(dst)
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    try:
+        os.link(src_path, dst_path)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copy2(src_path, dst_path)
+    return dst
+
+
+def _storage_name(key):
+    location = getattr(default_storage, "location", "") or ""
+    return key[len(location.rstrip("/")) + 1:] if location else key
+
+
+def list_stored_dir(prefix):
+    """
+    One level of the storage listing under `prefix` ("a/b/"): returns
+    (files, subdirs) with files as (name, size, modified) tuples.
+    """
+    bucket = getattr(default_storage, "bucket_name", None)
+    files, subdirs = [], []
+    if bucket:
+        from .s3 import get_s3_client
+        paginator = get_s3_client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=_s3_key(prefix), Delimiter="/"):
+            files.extend(
+                (_storage_name(obj["Key"]), obj["Size"], obj["LastModified"]) for obj in page.get("Contents", [])
+            )
+            subdirs.extend(_storage_name(p["Prefix"]) for p in page.get("CommonPrefixes", []))
+        return files, subdirs
+    root = default_storage.path(prefix)
+    if not os.path.isdir(root):
+        return files, subdirs
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(f"{prefix}{entry.name}/")
+            elif entry.is_file(follow_symlinks=False):
+                st = entry.stat()
+                files.append((f"{prefix}{entry.name}", st.st_size, datetime.fromtimestamp(st.st_mtime, dt_timezone.utc)))
+    return files, subdirs
+
+
+def iter_stored_files(prefix):
+    """Stream (name, size, modified) for every stored file under `prefix`, page by page."""
+    bucket = getattr(default_storage, "bucket_name", None)
+    if bucket:
+        from .s3 import get_s3_client
+        paginator = get_s3_client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=_s3_key(prefix)):
+            for obj in page.get("Contents", []):
+                yield _storage_name(obj["Key"]), obj["Size"], obj["LastModified"]
+        return
+    files, subdirs = list_stored_dir(prefix)
+    yield from files
+    for subdir in subdirs:
+        yield from iter_stored_files(subdir)
+
+
+def register_blob(sha256, storage_name, size):
+    """Record an object stored under its content address (no reference taken yet)."""
+    blob, _ = MediaBlob.objects.get_or_create(
+        sha256=sha256, defaults={"storage_name": storage_name, "size": size}
+    )
+    return blob
+
+
+def store_video_content(content, filename, sha256):
+    """
+    Store an uploaded file under its content address unless identical bytes are
+    already stored. Returns the storage name; the reference itself is taken when
+    the VideoResponse row is saved (see interviews.signals).
+    """
+    blob = MediaBlob.objects.filter(sha256=sha256).only("storage_name").first()
+    if blob is not None:
+        from .archive import is_archived, rehydrate
+        if is_archived(blob.storage_name):
+            # identical bytes sit in cold storage: store them again in the standard tier
+            rehydrate(blob.storage_name, content)
+        return blob.storage_name
+    name = content_addressed_name(sha256, filename)
+    if not default_storage.exists(name):
+        name = default_storage.save(name, content)
+    return register_blob(sha256, name, getattr(content, "size", 0) or 0).storage_name
+
+
+def acquire_blob(sha256, storage_name="", size=0):
+    if MediaBlob.objects.filter(sha256=sha256).update(ref_count=F("ref_count") + 1):
+        return
+    blob, created = MediaBlob.objects.get_or_create(
+        sha256=sha256, defaults={"storage_name": storage_name, "size": size, "ref_count": 1}
+    )
+    if not created:
+        MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+
+
+def release_blob(sha256):
+    """Drop one reference; the object is deleted once nobody references it."""
+    release_blobs({sha256: 1})
+
+
+def release_blobs(counts):
+    """
+    release_blob for many blobs at once ({sha256: references dropped}): the
+    rows are locked in one query (pk order, like concurrent releases), then
+    one UPDATE for the blobs still referenced and one DELETE for the others.
+    """
+    if not counts:
+        return
+    with transaction.atomic():
+        blobs = list(
+            MediaBlob.objects.select_for_update().filter(sha256__in=list(counts))
+            .order_by("pk").values_list("pk", "sha256", "ref_count", "storage_name")
+        )
+        kept = {pk: counts[sha256] for pk, sha256, ref_count, _ in blobs if ref_count > counts[sha256]}
+        if kept:
+            MediaBlob.objects.filter(pk__in=list(kept)).update(
+                ref_count=F("ref_count") - Case(*(When(pk=pk, then=Value(n)) for pk, n in kept.items()))
+            )
+        released = [(pk, name) for pk, _, _, name in blobs if pk not in kept]
+        if released:
+            MediaBlob.objects.filter(pk__in=[pk for pk, _ in released]).delete()
+            schedule_file_delete(*(name for _, name in released))
+
+
+def schedule_file_delete(*names):
+    """
+    Queue stored files for deletion. Rows are written in the caller's transaction,
+    so a rollback also cancels the delete; the objects are removed later in batches
+    by process_pending_deletes (management command / celery task).
+    """
+    rows = [PendingDelete(storage_name=name) for name in names if name]
+    if rows:
+        PendingDelete.objects.bulk_create(rows)
+
+
+def delete_stored_files(names):
+    """
+    Delete stored objects in bulk: S3 DeleteObjects (up to 1000 keys per request)
+    or one by one on the local filesystem. Returns {name: error} for failures.
+    """
+    errors = {}
+    bucket = getattr(default_storage, "bucket_name", None)
+    if not bucket:
+        from .archive import archived_path
+        for name in names:
+            try:
+                default_storage.delete(name)
+                if os.path.exists(archived_path(name)):
+                    os.remove(archived_path(name))
+            except Exception as e:
+                errors[name] = str(e)
+        return errors
+
+    from .s3 import get_s3_client
+    client = get_s3_client()
+    keys = {_s3_key(name): name for name in names}
+    key_list = list(keys)
+    for i in range(0, len(key_list), S3_DELETE_BATCH):
+        chunk = key_list[i:i + S3_DELETE_BATCH]
+        try:
+            response = client.delete_objects(
+                Bucket=bucket, Delete={"Objects": [{"Key": k} for k in chunk], "Quiet": True}
+            )
+        except Exception as e:
+            errors.update((keys[k], str(e)) for k in chunk)
+            continue
+        for error in response.get("Errors", []):
+            errors[keys[error["Key"]]] = f"{error.get('Code')}: {error.get('Message')}"
+    return errors
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=min(60 * 2 ** attempts, 6 * 3600))
+
+
+def process_pending_deletes(batch_size=S3_DELETE_BATCH, max_batches=None):
+    """
+    Carry out queued deletions, one DeleteObjects batch at a time. Failed objects
+    are retried with exponential backoff. Returns (deleted, failed).
+    """
+    deleted = failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        batches += 1
+        now = timezone.now()
+        with transaction.atomic():
+            # skip_locked: several workers can drain the queue concurrently
+            rows = list(
+                PendingDelete.objects.select_for_update(skip_locked=True)
+                .filter(next_attempt_at__lte=now)
+                .order_by("next_attempt_at", "id")[:batch_size]
+            )
+            if not rows:
+                break
+            names = {row.storage_name for row in rows}
+            # a content-addressed name may have been stored again since it was queued
+            in_use = set(MediaBlob.objects.filter(storage_name__in=names).values_list("storage_name", flat=True))
+            in_use.update(VideoResponse.objects.filter(video_file__in=names).values_list("video_file", flat=True))
+            errors = delete_stored_files(sorted(names - in_use))
+
+            retry = [row for row in rows if row.storage_name in errors]
+            for row in retry:
+                row.attempts += 1
+                row.last_error = errors[row.storage_name]
+                row.next_attempt_at = now + _retry_delay(row.attempts)
+            PendingDelete.objects.bulk_update(retry, ["attempts", "last_error", "next_attempt_at"])
+            PendingDelete.objects.filter(pk__in=[row.pk for row in rows if row.storage_name not in errors]).delete()
+        deleted += len(names) - len(in_use) - len(errors)
+        failed += len(errors)
+        if len(rows) < batch_size:
+            break
+    return deleted, failed
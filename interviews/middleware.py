@@ -0,0 +1,107 @@
+# API middleware: negotiated compression (Brotli when installed and accepted, gzip otherwise),
+# read-your-writes stickiness for the read replica
+import re
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from .db import pin_to_primary, replica_configured
+
+try:
+    import brotli
+except ImportError:  # optional dependency: gzip only
+    brotli = None
+
+BROTLI_QUALITY = 4  # fast levels compress JSON about as well as gzip -6 for much less CPU
+
+COMPRESSIBLE_TYPES = re.compile(r"^(text/|application/(json|x-ndjson|javascript|xml))")
+
+
+def _accepts(request, coding):
+    """True when Accept-Encoding lists `coding` (or *) without q=0."""
+    for part in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() in (coding, "*"):
+            try:
+                return float(params.strip().lower().removeprefix("q=") or 1) > 0
+            except ValueError:
+                return True
+    return False
+
+
+def _brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for chunk in sequence:
+        # flush after each chunk so a streamed export still reaches the client progressively
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _brotli_async_sequence(sequence):
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    async for chunk in sequence:
+        data = compressor.process(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress text responses under COMPRESSION_PATH_PREFIXES once they reach
+    COMPRESSION_MIN_SIZE bytes (streamed responses always). Already encoded
+    bodies, binary media (videos, XLSX) and partial content are left untouched.
+    """
+
+    def process_response(self, request, response):
+        if (
+            not request.path.startswith(tuple(getattr(settings, "COMPRESSION_PATH_PREFIXES", ("/api/",))))
+            or response.status_code in (204, 206, 304)
+            or response.has_header("Content-Encoding")
+            or not COMPRESSIBLE_TYPES.match(response.get("Content-Type", ""))
+        ):
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, "COMPRESSION_MIN_SIZE", 1024):
+            return response
+        if brotli is None or not _accepts(request, "br"):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _brotli_async_sequence(response.streaming_content)
+            else:
+                response.streaming_content = _brotli_sequence(response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+
+class ReplicaStickinessMiddleware(MiddlewareMixin):
+    """
+    After a write request (POST, PUT, PATCH, DELETE), the user's replica reads go
+    to the primary for REPLICA_STICKY_SECONDS, so they see what they just wrote.
+    request.user is read once the view has run: it is the user authenticated by
+    DRF (JWT).
+    """
+
+    def process_response(self, request, response):
+        if request.method not in ("GET", "HEAD", "OPTIONS") and replica_configured():
+            user = getattr(request, "user", None)
+            if user is not None:
+                pin_to_primary(user)
+        return response
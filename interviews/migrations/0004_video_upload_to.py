@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:22
+
+import interviews.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0003_video_content_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='videoresponse',
+            name='video_file',
+            field=models.FileField(max_length=255, upload_to=interviews.models.video_upload_to),
+        ),
+    ]
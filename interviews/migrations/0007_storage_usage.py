@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_usage(apps, schema_editor):
+    StorageUsage = apps.get_model('interviews', 'StorageUsage')
+    VideoResponse = apps.get_model('interviews', 'VideoResponse')
+    totals = (
+        VideoResponse.objects.values('session__campaign__hiring_manager_id')
+        .annotate(size=Sum('file_size'), n=Count('id'))
+        .values_list('session__campaign__hiring_manager_id', 'size', 'n')
+    )
+    StorageUsage.objects.bulk_create([
+        StorageUsage(hiring_manager_id=hm_id, bytes_used=size or 0, file_count=n)
+        for hm_id, size, n in totals
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0006_video_storage_tier'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bytes_used', models.BigIntegerField(default=0)),
+                ('file_count', models.IntegerField(default=0)),
+                ('quota_bytes', models.BigIntegerField(blank=True, null=True)),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hiring_manager', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='storage_usage', to='interviews.hiringmanager')),
+            ],
+        ),
+        migrations.RunPython(backfill_usage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0007_storage_usage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('fetch', 'Téléchargement'), ('probe', 'Analyse du conteneur'), ('transcode', 'Transcodage'), ('thumbnail', 'Miniature'), ('analysis', 'Analyse IA')], max_length=20)),
+                ('state', models.CharField(choices=[('queued', 'En file'), ('running', 'En cours'), ('retrying', 'Nouvelle tentative prévue'), ('succeeded', 'Terminé'), ('failed', 'Échec'), ('cancelled', 'Annulé')], default='queued', max_length=20)),
+                ('task_id', models.CharField(blank=True, max_length=255)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('bytes_total', models.BigIntegerField(blank=True, null=True)),
+                ('bytes_done', models.BigIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('next_retry_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='media_jobs', to='interviews.videocampaign')),
+                ('video_response', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='media_jobs', to='interviews.videoresponse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['campaign', 'state'], name='interviews__campaig_8a9df6_idx')],
+            },
+        ),
+    ]
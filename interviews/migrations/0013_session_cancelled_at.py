@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:38
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_cancelled_at(apps, schema_editor):
+    # sessions already cancelled keep the day the rollups counted them on (last change)
+    InterviewSession = apps.get_model('interviews', 'InterviewSession')
+    InterviewSession.objects.filter(status='cancelled').update(cancelled_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interviews', '0012_revoked_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewsession',
+            name='cancelled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_cancelled_at, migrations.RunPython.noop),
+    ]
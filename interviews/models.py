@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from django_cleanup import cleanup
 import uuid
 
 # ----------------------------
@@ -19,6 +20,7 @@ class UserProfile(models.Model):
     user_type = models.CharField(max_length=20, choices=USER_TYPES, default='candidate')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # ETag de /api/auth/me/
     
     def __str__(self):
         return f"{self.user.username} - {self.get_user_type_display()}"
@@ -32,11 +34,62 @@ class HiringManager(models.Model):
     phone = models.CharField(max_length=20)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # ETag de /api/auth/me/
     
     def __str__(self):
         return f"{self.user_profile.user.username} - {self.company}"
 
 
+class StorageUsage(models.Model):
+    """Octets vidéo stockés par recruteur, tenus à jour à chaque upload / suppression (interviews/quotas.py)"""
+    hiring_manager = models.OneToOneField(HiringManager, on_delete=models.CASCADE, related_name='storage_usage')
+    bytes_used = models.BigIntegerField(default=0)
+    file_count = models.IntegerField(default=0)
+    quota_bytes = models.BigIntegerField(null=True, blank=True)  # None = STORAGE_QUOTA_DEFAULT_BYTES
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.hiring_manager} - {self.bytes_used} octets"
+
+
+class ClaimsUser(User):
+    """
+    Utilisateur reconstruit depuis les claims du JWT, sans requête (interviews/auth.py,
+    mode JWT_STATELESS) : seul l'id est connu. Le premier champ lu hors du token charge
+    l'utilisateur complet, avec profil et rôle, en une requête.
+    """
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is None or not deferred.issuperset(fields):
+            return super().refresh_from_db(using, fields, from_queryset)
+        from .auth import load_user
+        user = load_user(self.pk)
+        if user is None:
+            raise User.DoesNotExist("User not found")
+        for attname in deferred:
+            setattr(self, attname, getattr(user, attname))
+        self._state.fields_cache.update(user._state.fields_cache)
+
+
+class RevokedToken(models.Model):
+    """
+    JWT révoqué (logout) par jti, ou tous les tokens d'un utilisateur émis avant
+    revoked_at (jti vide : compte désactivé). Relu en mémoire par interviews/auth.py.
+    """
+    jti = models.CharField(max_length=255, blank=True, db_index=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='revoked_tokens')
+    revoked_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)  # supprimable une fois le token expiré
+
+    def __str__(self):
+        return self.jti or f"{self.user_id} avant {self.revoked_at}"
+
+
 # ----------------------------
 # CAMPAGNES & QUESTIONS
 # ----------------------------
@@ -58,6 +111,7 @@ class VideoCampaign(models.Model):
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)  # ETag de /api/candidate/interviews/
 
     def clean(self):
         if self.start_date >= self.end_date:
@@ -140,10 +194,20 @@ class InterviewSession(models.Model):
     expires_at = models.DateTimeField()
     access_token = models.UUIDField(default=uuid.uuid4, unique=True)  # lien unique
     is_used = models.BooleanField(default=False)  # 🔒 une seule utilisation
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # filigrane des agrégats (interviews/rollups.py)
+    cancelled_at = models.DateTimeField(null=True, blank=True)  # fixée à la première annulation (jour des agrégats)
 
     def __str__(self):
         return f"{self.candidate.email} - {self.campaign.title}"
 
+    def save(self, *args, **kwargs):
+        # Date d'annulation posée une seule fois : une nouvelle sauvegarde ne déplace pas l'annulation
+        if self.status == "cancelled" and self.cancelled_at is None:
+            self.cancelled_at = timezone.now()
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "cancelled_at"}
+        super().save(*args, **kwargs)
+
 
 # ----------------------------
 # REPONSES VIDEO
@@ -159,12 +223,47 @@ class VideoSettings(models.Model):
     default_video_formats = ["mp4", "webm"] 
 
 
+class MediaBlob(models.Model):
+    """Fichier vidéo stocké une seule fois, adressé par son SHA-256 et partagé par comptage de références"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    storage_name = models.CharField(max_length=500)  # nom dans le stockage par défaut / clé S3
+    size = models.BigIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_verified_at = models.DateTimeField(null=True, blank=True)
+    verified_ok = models.BooleanField(null=True, blank=True)  # None = jamais vérifié
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} réf.)"
+
+
+class PendingDelete(models.Model):
+    """Fichier à supprimer du stockage, enregistré dans la transaction qui le libère (outbox)"""
+    storage_name = models.CharField(max_length=500)
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.storage_name} ({self.attempts} essais)"
+
+
+def video_upload_to(instance, filename):
+    """Chemin selon settings.VIDEO_STORAGE_LAYOUT (hash / session / flat), voir interviews/media.py"""
+    from .media import video_storage_name
+    return video_storage_name(instance, filename)
+
+
+# Les fichiers partagés sont supprimés par interviews.signals (comptage de références),
+# pas par django_cleanup
+@cleanup.ignore
 class VideoResponse(models.Model):
     """Réponse vidéo à une question"""
     session = models.ForeignKey(InterviewSession, on_delete=models.CASCADE, related_name='responses')
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='responses')
     
-    video_file = models.FileField(upload_to='video_responses/')
+    video_file = models.FileField(upload_to=video_upload_to, max_length=255)
     video_url = models.URLField(blank=True)  # Cloud storage
     duration = models.IntegerField(default=0)
     
@@ -179,11 +278,100 @@ class VideoResponse(models.Model):
     )
     file_size = models.IntegerField(default=0)
     format = models.CharField(max_length=10)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)  # contenu (intégrité + dédoublonnage)
+
+    # Niveau de stockage (interviews/archive.py) : archivé après la fin de la campagne + rétention
+    STORAGE_TIER_CHOICES = [
+        ('hot', 'Standard'),
+        ('archived', 'Archivé'),
+        ('restoring', 'Restauration en cours'),
+        ('restored', 'Restauré (temporaire)'),
+    ]
+    storage_tier = models.CharField(max_length=10, choices=STORAGE_TIER_CHOICES, default='hot', db_index=True)
+    archived_at = models.DateTimeField(null=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        # Nouveau fichier : empreinte SHA-256 ; en disposition "hash", un contenu identique n'est stocké qu'une fois
+        if self.video_file and not self.video_file._committed:
+            from .media import file_sha256, store_video_content, video_storage_layout
+            content = self.video_file.file
+            self.sha256 = getattr(content, 'sha256', None) or file_sha256(content)
+            self.file_size = self.file_size or getattr(content, 'size', 0) or 0
+            if video_storage_layout() == 'hash':
+                self.video_file = store_video_content(content, self.video_file.name, self.sha256)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.session.candidate.email} - Q{self.question.order}"
 
 
+class MediaJob(models.Model):
+    """Traitement média asynchrone (tâche Celery) : état, tentatives, progression, erreurs (interviews/jobs.py)"""
+    KIND_CHOICES = [
+        ('fetch', 'Téléchargement'),
+        ('probe', 'Analyse du conteneur'),
+        ('transcode', 'Transcodage'),
+        ('thumbnail', 'Miniature'),
+        ('analysis', 'Analyse IA'),
+    ]
+    STATE_CHOICES = [
+        ('queued', 'En file'),
+        ('running', 'En cours'),
+        ('retrying', 'Nouvelle tentative prévue'),
+        ('succeeded', 'Terminé'),
+        ('failed', 'Échec'),
+        ('cancelled', 'Annulé'),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    state = models.CharField(max_length=20, choices=STATE_CHOICES, default='queued')
+    campaign = models.ForeignKey(VideoCampaign, on_delete=models.CASCADE, related_name='media_jobs')
+    video_response = models.ForeignKey(
+        'VideoResponse', on_delete=models.CASCADE, null=True, blank=True, related_name='media_jobs'
+    )
+    task_id = models.CharField(max_length=255, blank=True)
+    params = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(null=True, blank=True)
+
+    attempts = models.PositiveIntegerField(default=0)
+    bytes_total = models.BigIntegerField(null=True, blank=True)
+    bytes_done = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # dernière progression signalée
+    next_retry_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['campaign', 'state'])]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.state})"
+
+
+class MediaRestoreJob(models.Model):
+    """Demande de restauration d'un fichier vidéo archivé (stockage froid)"""
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('in_progress', 'En cours'),
+        ('completed', 'Terminée'),
+        ('expired', 'Expirée'),
+        ('failed', 'Échec'),
+    ]
+    campaign = models.ForeignKey(VideoCampaign, on_delete=models.CASCADE, related_name='restore_jobs')
+    storage_name = models.CharField(max_length=500, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)  # fin de la copie restaurée
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.storage_name} ({self.status})"
+
+
 # ----------------------------
 # EVALUATION & ANALYSE
 # ----------------------------
@@ -201,13 +389,18 @@ class Evaluation(models.Model):
     notes = models.TextField(blank=True)
     recommended = models.BooleanField(null=True, blank=True)
     evaluated_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         ordering = ['-evaluated_at']
 
     @property
     def overall_score(self):
-        scores = [self.technical_skill, self.communication, self.motivation, self.cultural_fit]
+        return self.combine_scores(self.technical_skill, self.communication, self.motivation, self.cultural_fit)
+
+    @staticmethod
+    def combine_scores(*scores):
+        """Note globale : moyenne des critères renseignés (aussi utilisée sur des lignes values_list)"""
         valid_scores = [s for s in scores if s is not None]
         return sum(valid_scores) / len(valid_scores) if valid_scores else None
 
@@ -222,6 +415,14 @@ class AIAnalysis(models.Model):
     speech_confidence = models.FloatField(null=True, blank=True)
     speech_rate = models.FloatField(null=True, blank=True)
     filler_words_count = models.IntegerField(default=0)
+
+    # Piste audio (interviews/audio.py) : silences, pauses, niveau sonore en dBFS
+    silence_ratio = models.FloatField(null=True, blank=True)
+    pause_ratio = models.FloatField(null=True, blank=True)
+    pause_count = models.IntegerField(null=True, blank=True)
+    loudness_mean_db = models.FloatField(null=True, blank=True)
+    loudness_range_db = models.FloatField(null=True, blank=True)
+    peak_db = models.FloatField(null=True, blank=True)
     
     eye_contact_score = models.FloatField(null=True, blank=True)
     posture_score = models.FloatField(null=True, blank=True)
@@ -232,6 +433,14 @@ class AIAnalysis(models.Model):
     
     analyzed_at = models.DateTimeField(auto_now_add=True)
     analysis_version = models.CharField(max_length=20, default='1.0')
+
+    # Échecs de l'analyse de la version failed_version : la réponse n'est reprise
+    # qu'après retry_after, et plus du tout après AI_ANALYSIS_MAX_ATTEMPTS échecs
+    # (analysis_version vide tant qu'aucune analyse n'a réussi)
+    failed_version = models.CharField(max_length=20, blank=True, default='')
+    failed_attempts = models.IntegerField(default=0)
+    retry_after = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
     
     def __str__(self):
         return f"Analyse IA - {self.video_response}"
@@ -266,6 +475,56 @@ class DashboardMetrics(models.Model):
         return f"Métriques pour {self.hiring_manager}"
 
 
+class CampaignDailyStats(models.Model):
+    """Agrégat quotidien d'une campagne (entonnoir, délai de passage, notes), calculé par interviews/rollups.py"""
+    campaign = models.ForeignKey(VideoCampaign, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+
+    # sessions par date de l'événement (invitation, début, fin, annulation, expiration)
+    invited = models.IntegerField(default=0)
+    started = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+    expired = models.IntegerField(default=0)
+    median_time_to_complete = models.FloatField(null=True, blank=True)  # secondes, de l'invitation à la fin
+
+    # évaluations du jour : nombre, somme des notes globales, histogramme {"1": n, ..., "5": n}
+    evaluations = models.IntegerField(default=0)
+    score_sum = models.FloatField(default=0.0)
+    rating_histogram = models.JSONField(default=dict)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['campaign', 'day']
+        ordering = ['day']
+
+    def __str__(self):
+        return f"{self.campaign} - {self.day}"
+
+
+class RollupDirtyDay(models.Model):
+    """
+    Jour d'une campagne à recalculer que les horodatages restants ne désignent plus
+    (session / évaluation supprimée, horodatage déplacé) ; vidé par interviews/rollups.py
+    """
+    campaign_id = models.UUIDField()  # sans clé étrangère : la campagne peut être en cours de suppression
+    day = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.campaign_id} - {self.day}"
+
+
+class AnalyticsWatermark(models.Model):
+    """Dernier instant traité par un calcul incrémental (ex. agrégats quotidiens)"""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
 class CampaignShare(models.Model):
     """Partage de campagnes entre recruteurs"""
     campaign = models.ForeignKey(VideoCampaign, on_delete=models.CASCADE)
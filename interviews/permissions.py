@@ -0,0 +1,22 @@
+# role permissions read from the JWT role claim (no query), from the loaded profile otherwise
+from rest_framework import permissions
+
+from .auth import token_role, user_role
+
+
+def request_role(request):
+    return token_role(request) or user_role(request.user)
+
+
+class IsHiringManager(permissions.IsAuthenticated):
+    message = "Accès réservé aux recruteurs."
+
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) and request_role(request) == "hiring_manager"
+
+
+class IsCandidate(permissions.IsAuthenticated):
+    message = "Accès réservé aux candidats."
+
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) and request_role(request) == "candidate"
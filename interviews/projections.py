@@ -0,0 +1,71 @@
+# response dicts built straight from values_list() rows: no model instances, no lazy relations
+from django.core.files.storage import default_storage
+
+
+class Projection:
+    """
+    Shape of a response dict, compiled once (module level) into the values_list()
+    lookups, the annotations and the row builder.
+
+    Each keyword maps an output key to a lookup ("campaign__title"), to an
+    expression (e.g. Count("campaign__questions"), annotated under a "p_" alias)
+    or to a nested dict of the same, which becomes a nested object of the output.
+    """
+
+    def __init__(self, **fields):
+        self.lookups = []
+        self.annotations = {}
+        self.layout = self._compile(fields, ())
+        self.flat = all(isinstance(index, int) for _, index in self.layout)
+        self.keys = tuple(key for key, _ in self.layout)
+
+    def _compile(self, fields, path):
+        layout = []
+        for key, source in fields.items():
+            if isinstance(source, dict):
+                layout.append((key, self._compile(source, path + (key,))))
+                continue
+            if not isinstance(source, str):
+                alias = "_".join(("p",) + path + (key,))
+                self.annotations[alias] = source
+                source = alias
+            layout.append((key, len(self.lookups)))
+            self.lookups.append(source)
+        return layout
+
+    @classmethod
+    def _build(cls, layout, row):
+        return {key: row[index] if isinstance(index, int) else cls._build(index, row) for key, index in layout}
+
+    def values_list(self, queryset):
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        return queryset.values_list(*self.lookups)
+
+    def all(self, queryset):
+        rows = self.values_list(queryset)
+        if self.flat:
+            keys = self.keys
+            return [dict(zip(keys, row)) for row in rows]
+        return [self._build(self.layout, row) for row in rows]
+
+    def first(self, queryset):
+        """The first row as a dict, None when the queryset is empty."""
+        for row in self.values_list(queryset)[:1]:
+            return dict(zip(self.keys, row)) if self.flat else self._build(self.layout, row)
+        return None
+
+
+def media_url_builder(request):
+    """
+    Absolute URL of a stored file name; the scheme / host prefix of relative
+    storage URLs (FileSystemStorage) is resolved once per request instead of
+    calling build_absolute_uri() for every file.
+    """
+    prefix = request.build_absolute_uri("/")[:-1]
+
+    def url(name):
+        location = default_storage.url(name)
+        return prefix + location if location.startswith("/") else location
+
+    return url
@@ -0,0 +1,153 @@
+# per-hiring-manager storage ledger: O(1) usage reads and quota checks
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import HiringManager, InterviewSession, StorageUsage, VideoCampaign, VideoResponse
+
+
+class StorageQuotaExceeded(Exception):
+    """Raised when an upload would push a hiring manager past their storage quota."""
+
+    def __init__(self, used, incoming, quota):
+        super().__init__(f"Storage quota exceeded: {used} + {incoming} bytes (quota {quota})")
+        self.used = used
+        self.incoming = incoming
+        self.quota = quota
+
+
+def hiring_manager_id_for_response(response):
+    """Owner of a response's campaign, without a query when session and campaign are loaded."""
+    if VideoResponse.session.is_cached(response):
+        session = response.session
+        if InterviewSession.campaign.is_cached(session):
+            return session.campaign.hiring_manager_id
+    return hiring_manager_id_for_session(response.session_id)
+
+
+def hiring_manager_id_for_session(session_id):
+    return (
+        VideoCampaign.objects.filter(sessions__id=session_id)
+        .values_list("hiring_manager_id", flat=True)
+        .first()
+    )
+
+
+def hiring_manager_ids_for_responses(responses):
+    """hiring_manager_id_for_response for many responses, in at most one query."""
+    owners, missing = {}, set()
+    for response in responses:
+        if VideoResponse.session.is_cached(response) and InterviewSession.campaign.is_cached(response.session):
+            owners[response.session_id] = response.session.campaign.hiring_manager_id
+        else:
+            missing.add(response.session_id)
+    if missing:
+        owners.update(
+            InterviewSession.objects.filter(id__in=missing).values_list("id", "campaign__hiring_manager_id")
+        )
+    return [owners.get(response.session_id) for response in responses]
+
+
+def record_usage(hiring_manager_id, bytes_delta, count_delta=0):
+    """Apply a delta to the ledger in the caller's transaction (single UPDATE, no read)."""
+    if not hiring_manager_id or not (bytes_delta or count_delta):
+        return
+    updated = StorageUsage.objects.filter(hiring_manager_id=hiring_manager_id).update(
+        bytes_used=F("bytes_used") + bytes_delta, file_count=F("file_count") + count_delta
+    )
+    if not updated:
+        usage, created = StorageUsage.objects.get_or_create(
+            hiring_manager_id=hiring_manager_id,
+            defaults={"bytes_used": max(bytes_delta, 0), "file_count": max(count_delta, 0)},
+        )
+        if not created:
+            record_usage(hiring_manager_id, bytes_delta, count_delta)
+
+
+def quota_for(usage):
+    if usage is not None and usage.quota_bytes is not None:
+        return usage.quota_bytes
+    return getattr(settings, "STORAGE_QUOTA_DEFAULT_BYTES", None) or None
+
+
+def _remaining(usage):
+    quota = quota_for(usage)
+    if quota is None:
+        return None
+    return max(quota - (usage.bytes_used if usage else 0), 0)
+
+
+def remaining_quota(hiring_manager_id):
+    """Bytes still available (None = unlimited); one primary-key read."""
+    return _remaining(StorageUsage.objects.filter(hiring_manager_id=hiring_manager_id).first())
+
+
+async def aremaining_quota(hiring_manager_id):
+    """remaining_quota() for async views (async ORM)."""
+    return _remaining(await StorageUsage.objects.filter(hiring_manager_id=hiring_manager_id).afirst())
+
+
+def check_storage_quota(hiring_manager_id, incoming_bytes):
+    """Raise StorageQuotaExceeded if `incoming_bytes` more would not fit."""
+    usage = StorageUsage.objects.filter(hiring_manager_id=hiring_manager_id).first()
+    quota = quota_for(usage)
+    used = usage.bytes_used if usage else 0
+    if quota is not None and used + incoming_bytes > quota:
+        raise StorageQuotaExceeded(used, incoming_bytes, quota)
+
+
+def storage_usage_summary(manager):
+    """Usage block of the recruiter dashboard (manager and company totals)."""
+    usage = StorageUsage.objects.filter(hiring_manager=manager).first()
+    quota = quota_for(usage)
+    used = usage.bytes_used if usage else 0
+    company = StorageUsage.objects.filter(hiring_manager__company=manager.company).aggregate(
+        bytes_used=Sum("bytes_used"), file_count=Sum("file_count")
+    )
+    return {
+        "bytes_used": used,
+        "file_count": usage.file_count if usage else 0,
+        "quota_bytes": quota,
+        "percent_used": round(100 * used / quota, 1) if quota else None,
+        "company_bytes_used": company["bytes_used"] or 0,
+        "company_file_count": company["file_count"] or 0,
+    }
+
+
+def reconcile_storage_usage(batch_size=500):
+    """
+    Recompute the ledger from VideoResponse.file_size in batches of hiring managers.
+    Ledger rows are locked before the sums are taken so concurrent uploads are
+    neither lost nor counted twice. Returns [(hiring_manager_id, old_bytes, new_bytes)]
+    for the rows that drifted.
+    """
+    drift = []
+    last_id = 0
+    while True:
+        ids = list(
+            HiringManager.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+        with transaction.atomic():
+            StorageUsage.objects.bulk_create(
+                [StorageUsage(hiring_manager_id=hm_id) for hm_id in ids], ignore_conflicts=True
+            )
+            rows = {u.hiring_manager_id: u for u in StorageUsage.objects.select_for_update().filter(hiring_manager_id__in=ids)}
+            totals = {
+                hm_id: (size or 0, n)
+                for hm_id, size, n in VideoResponse.objects.filter(session__campaign__hiring_manager_id__in=ids)
+                .values("session__campaign__hiring_manager_id")
+                .annotate(size=Sum("file_size"), n=Count("id"))
+                .values_list("session__campaign__hiring_manager_id", "size", "n")
+            }
+            now = timezone.now()
+            for hm_id, usage in rows.items():
+                size, n = totals.get(hm_id, (0, 0))
+                if (usage.bytes_used, usage.file_count) != (size, n):
+                    drift.append((hm_id, usage.bytes_used, size))
+                usage.bytes_used, usage.file_count, usage.reconciled_at = size, n, now
+            StorageUsage.objects.bulk_update(rows.values(), ["bytes_used", "file_count", "reconciled_at"])
+    return drift
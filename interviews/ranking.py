@@ -0,0 +1,191 @@
+# candidate ranking within a campaign: weighted criteria, percentiles, evaluator z-scores, agreement
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Evaluation, InterviewSession
+
+CRITERIA = ("technical_skill", "communication", "motivation", "cultural_fit")
+
+
+class InvalidWeights(ValueError):
+    pass
+
+
+def ranking_weights(raw=None):
+    """
+    Criterion weights from RANKING_WEIGHTS, optionally overridden by a
+    "technical_skill:2,communication:1" string. Returned in CRITERIA order.
+    """
+    weights = dict.fromkeys(CRITERIA, 1.0)
+    weights.update(getattr(settings, "RANKING_WEIGHTS", {}))
+    for part in filter(None, (raw or "").split(",")):
+        name, _, value = part.partition(":")
+        name = name.strip()
+        if name not in weights:
+            raise InvalidWeights(f"unknown criterion {name!r}")
+        try:
+            weights[name] = float(value)
+        except ValueError:
+            raise InvalidWeights(f"invalid weight for {name!r}")
+    values = np.array([weights[c] for c in CRITERIA], dtype=float)
+    # float() accepts "nan" / "inf": such weights would give NaN scores (and be cached)
+    if not np.isfinite(values).all() or (values < 0).any() or not values.any():
+        raise InvalidWeights("weights must be finite, >= 0 and not all zero")
+    return values
+
+
+def _group_mean(index, values, groups):
+    """Mean of `values` per group, NaN values ignored (NaN for empty groups)."""
+    valid = ~np.isnan(values)
+    counts = np.bincount(index[valid], minlength=groups)
+    sums = np.bincount(index[valid], weights=values[valid], minlength=groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts, counts
+
+
+def _percentiles(scores):
+    """Percentile rank (0-100, ties share the mid rank) of each score among the non-NaN ones."""
+    valid = scores[~np.isnan(scores)]
+    if not len(valid):
+        return np.full(len(scores), np.nan)
+    ordered = np.sort(valid)
+    below = np.searchsorted(ordered, scores, side="left")
+    upto = np.searchsorted(ordered, scores, side="right")
+    result = (below + upto) / 2 / len(ordered) * 100
+    result[np.isnan(scores)] = np.nan
+    return result
+
+
+def _icc1(group, scores, groups):
+    """
+    One-way random-effects intra-class correlation ICC(1) of the evaluation scores
+    grouped by candidate (unbalanced groups: adjusted mean group size k0).
+    """
+    n_i = np.bincount(group, minlength=groups).astype(float)
+    rated = n_i > 0
+    g, total = int(rated.sum()), len(scores)
+    if g < 2 or total <= g:
+        return None
+    means = np.bincount(group, weights=scores, minlength=groups)[rated] / n_i[rated]
+    grand = scores.mean()
+    msb = (n_i[rated] * (means - grand) ** 2).sum() / (g - 1)
+    full_means = np.zeros(groups)
+    full_means[rated] = means
+    msw = ((scores - full_means[group]) ** 2).sum() / (total - g)
+    k0 = (total - (n_i[rated] ** 2).sum() / total) / (g - 1)
+    denominator = msb + (k0 - 1) * msw
+    return float((msb - msw) / denominator) if denominator > 0 else None
+
+
+def compute_ranking(campaign_id, weights=None):
+    """
+    Rank the candidates of a campaign from all its evaluations, loaded with a
+    single values_list query and processed as whole arrays.
+    """
+    weights = ranking_weights() if weights is None else weights
+    rows = list(
+        Evaluation.objects.filter(video_response__session__campaign_id=campaign_id)
+        .values_list("video_response__session_id", "hiring_manager_id", "recommended", *CRITERIA)
+    )
+    sessions = {
+        str(sid): {"candidate_id": str(cid), "first_name": first, "last_name": last, "email": email, "status": st}
+        for sid, cid, first, last, email, st in InterviewSession.objects.filter(campaign_id=campaign_id)
+        .values_list("id", "candidate_id", "candidate__first_name", "candidate__last_name", "candidate__email", "status")
+    }
+    empty = {"weights": dict(zip(CRITERIA, weights.tolist())), "agreement": None,
+             "unevaluated": len(sessions), "candidates": []}
+    if not rows:
+        return empty
+
+    session_ids, session_idx = np.unique(np.array([str(r[0]) for r in rows]), return_inverse=True)
+    _, evaluator_idx = np.unique(np.array([r[1] for r in rows]), return_inverse=True)
+    recommended = np.array([np.nan if r[2] is None else float(r[2]) for r in rows])
+    ratings = np.array([r[3:] for r in rows], dtype=float)  # None -> NaN
+    n_sessions, n_evaluators = len(session_ids), int(evaluator_idx.max()) + 1
+
+    # weighted mean of the criteria each evaluation filled in
+    present = ~np.isnan(ratings)
+    weight_sum = (present * weights).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scores = np.where(present, ratings, 0.0) @ weights / weight_sum
+    scored = ~np.isnan(scores)
+
+    # standardize each evaluator's scores (strict and lenient raters become comparable)
+    ev_mean, _ = _group_mean(evaluator_idx, scores, n_evaluators)
+    ev_sq, _ = _group_mean(evaluator_idx, scores ** 2, n_evaluators)
+    ev_std = np.sqrt(np.maximum(ev_sq - ev_mean ** 2, 0.0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(ev_std[evaluator_idx] > 0, (scores - ev_mean[evaluator_idx]) / ev_std[evaluator_idx], 0.0)
+    z[~scored] = np.nan
+
+    mean_score, n_scored = _group_mean(session_idx, scores, n_sessions)
+    mean_z, _ = _group_mean(session_idx, z, n_sessions)
+    sq_score, _ = _group_mean(session_idx, scores ** 2, n_sessions)
+    spread = np.sqrt(np.maximum(sq_score - mean_score ** 2, 0.0))  # disagreement between evaluations
+    criteria_means = np.column_stack([_group_mean(session_idx, ratings[:, i], n_sessions)[0] for i in range(len(CRITERIA))])
+    recommend_rate, _ = _group_mean(session_idx, recommended, n_sessions)
+    evaluators = np.bincount(
+        np.unique(session_idx * n_evaluators + evaluator_idx) // n_evaluators, minlength=n_sessions
+    )
+    n_evaluations = np.bincount(session_idx, minlength=n_sessions)
+    percentile = _percentiles(mean_score)
+
+    # best first, unscored last
+    order = np.lexsort((-np.nan_to_num(mean_z, nan=-np.inf), -np.nan_to_num(mean_score, nan=-np.inf)))
+
+    def _num(value):
+        return None if np.isnan(value) else round(float(value), 4)
+
+    candidates = []
+    for rank, i in enumerate(order, start=1):
+        session_id = str(session_ids[i])
+        candidates.append({
+            "rank": rank if n_scored[i] else None,
+            "session_id": session_id,
+            **sessions.get(session_id, {}),
+            "score": _num(mean_score[i]),
+            "z_score": _num(mean_z[i]),
+            "percentile": _num(percentile[i]),
+            "criteria": {name: _num(criteria_means[i, c]) for c, name in enumerate(CRITERIA)},
+            "evaluations": int(n_evaluations[i]),
+            "evaluators": int(evaluators[i]),
+            "score_spread": _num(spread[i]) if n_scored[i] > 1 else None,
+            "recommended_rate": _num(recommend_rate[i]),
+        })
+    icc = _icc1(session_idx[scored], scores[scored], n_sessions)
+    return {
+        **empty,
+        "agreement": {"icc1": None if icc is None else round(icc, 4), "evaluations": int(scored.sum())},
+        "unevaluated": len(sessions) - n_sessions,
+        "candidates": candidates,
+    }
+
+
+def _version_key(campaign_id):
+    return f"campaign_ranking_version:{campaign_id}"
+
+
+def campaign_ranking(campaign_id, weights=None):
+    """compute_ranking() cached per campaign and weights until the next evaluation write."""
+    weights = ranking_weights() if weights is None else weights
+    version = cache.get(_version_key(campaign_id))
+    if version is None:
+        # time based: never reuses a version whose entries may still be cached
+        cache.add(_version_key(campaign_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(campaign_id))
+    key = f"campaign_ranking:{campaign_id}:{version}:{','.join(f'{w:g}' for w in weights)}"
+    result = cache.get(key)
+    if result is None:
+        result = compute_ranking(campaign_id, weights)
+        cache.set(key, result, getattr(settings, "RANKING_CACHE_TIMEOUT", 600))
+    return result
+
+
+def invalidate_campaign_ranking(campaign_id):
+    try:
+        cache.incr(_version_key(campaign_id))
+    except ValueError:
+        cache.set(_version_key(campaign_id), time.time_ns(), timeout=None)
@@ -0,0 +1,221 @@
+# daily per-campaign analytics (funnel, time to complete, ratings), refreshed incrementally
+import statistics
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import AnalyticsWatermark, CampaignDailyStats, Evaluation, InterviewSession, RollupDirtyDay
+
+WATERMARK = "campaign_daily_stats"
+RATING_FIELDS = ("technical_skill", "communication", "motivation", "cultural_fit")
+FUNNEL = ("invited", "started", "completed", "cancelled", "expired")
+
+# funnel step -> (session filter, timestamp giving the day of the event)
+EVENTS = {
+    "invited": ({}, "invited_at"),
+    "started": ({"started_at__isnull": False}, "started_at"),
+    "completed": ({"completed_at__isnull": False}, "completed_at"),
+    "cancelled": ({"status": "cancelled", "cancelled_at__isnull": False}, "cancelled_at"),
+    "expired": ({"status": "expired"}, "expires_at"),
+}
+EVENT_FIELDS = tuple(dict.fromkeys(field for _, field in EVENTS.values()))
+
+
+def _day(value):
+    return timezone.localdate(value) if value else None
+
+
+def event_days(timestamps):
+    return {d for d in map(_day, timestamps) if d}
+
+
+def mark_dirty_days(campaign_id, days):
+    """
+    Queue days of a campaign for the next refresh_daily_stats(), for changes the
+    updated_at watermark cannot see: deleted rows and timestamps moved off a day.
+    """
+    if campaign_id and days:
+        RollupDirtyDay.objects.bulk_create([RollupDirtyDay(campaign_id=campaign_id, day=day) for day in days])
+
+
+def _day_filter(field, days):
+    return {} if days is None else {f"{field}__date__in": days}
+
+
+def compute_daily_stats(campaign_ids, days=None):
+    """
+    CampaignDailyStats rows (unsaved) of `campaign_ids` for `days` (None: every day),
+    from one grouped query per funnel step plus the completions and evaluations of those days.
+    """
+    stats = defaultdict(lambda: {"completion_times": [], "scores": []})
+    sessions = InterviewSession.objects.filter(campaign_id__in=campaign_ids)
+
+    for step, (filters, field) in EVENTS.items():
+        rows = (
+            sessions.filter(**filters, **_day_filter(field, days))
+            .annotate(day=TruncDate(field))
+            .values("campaign_id", "day")
+            .annotate(n=Count("id"))
+            .values_list("campaign_id", "day", "n")
+        )
+        for campaign_id, day, n in rows:
+            stats[campaign_id, day][step] = n
+
+    completions = (
+        sessions.filter(completed_at__isnull=False, **_day_filter("completed_at", days))
+        .annotate(day=TruncDate("completed_at"))
+        .values_list("campaign_id", "day", "invited_at", "completed_at")
+    )
+    for campaign_id, day, invited_at, completed_at in completions.iterator(chunk_size=2000):
+        stats[campaign_id, day]["completion_times"].append((completed_at - invited_at).total_seconds())
+
+    evaluations = (
+        Evaluation.objects.filter(
+            video_response__session__campaign_id__in=campaign_ids, **_day_filter("evaluated_at", days)
+        )
+        .annotate(day=TruncDate("evaluated_at"), campaign_id=F("video_response__session__campaign_id"))
+        .values_list("campaign_id", "day", *RATING_FIELDS)
+    )
+    for campaign_id, day, *ratings in evaluations.iterator(chunk_size=2000):
+        score = Evaluation.combine_scores(*ratings)
+        if score is not None:
+            stats[campaign_id, day]["scores"].append(score)
+
+    result = []
+    for (campaign_id, day), values in stats.items():
+        times, scores = values.pop("completion_times"), values.pop("scores")
+        histogram = defaultdict(int)
+        for score in scores:
+            histogram[str(int(score + 0.5))] += 1
+        result.append(CampaignDailyStats(
+            campaign_id=campaign_id,
+            day=day,
+            median_time_to_complete=statistics.median(times) if times else None,
+            evaluations=len(scores),
+            score_sum=sum(scores),
+            rating_histogram=dict(histogram),
+            **values,
+        ))
+    return result
+
+
+def rebuild_daily_stats(campaign_ids, days=None):
+    """Replace the rows of campaign_ids x days (every day when days is None)."""
+    rows = compute_daily_stats(campaign_ids, days)
+    existing = CampaignDailyStats.objects.filter(campaign_id__in=campaign_ids)
+    if days is not None:
+        existing = existing.filter(day__in=days)
+    with transaction.atomic():
+        existing.delete()
+        CampaignDailyStats.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _changed_days(since):
+    """{campaign_id: {days}} touched by sessions / evaluations modified after `since`."""
+    changed = defaultdict(set)
+    sessions = InterviewSession.objects.filter(updated_at__gt=since).values_list("campaign_id", *EVENT_FIELDS)
+    for campaign_id, *timestamps in sessions.iterator(chunk_size=2000):
+        changed[campaign_id].update(event_days(timestamps))
+    evaluations = Evaluation.objects.filter(updated_at__gt=since).values_list(
+        "video_response__session__campaign_id", "evaluated_at"
+    )
+    for campaign_id, evaluated_at in evaluations.iterator(chunk_size=2000):
+        changed[campaign_id].add(_day(evaluated_at))
+    return changed
+
+
+def _dirty_days():
+    """({campaign_id: {days}}, row ids) queued by mark_dirty_days()."""
+    dirty, ids = defaultdict(set), []
+    for pk, campaign_id, day in RollupDirtyDay.objects.values_list("id", "campaign_id", "day").iterator(chunk_size=2000):
+        dirty[campaign_id].add(day)
+        ids.append(pk)
+    return dirty, ids
+
+
+def refresh_daily_stats(full=False, campaigns_per_batch=100, log=None):
+    """
+    Recompute the daily rows touched since the last watermark (all rows on the
+    first run or with full=True). Changes are re-read with an overlap of
+    ANALYTICS_ROLLUP_OVERLAP seconds so rows committed late are not missed;
+    the days queued by mark_dirty_days() are recomputed too, then dropped.
+    Recomputing a day is idempotent. Returns (campaigns, rows written).
+    """
+    now = timezone.now()
+    watermark = AnalyticsWatermark.objects.filter(name=WATERMARK).values_list("value", flat=True).first()
+    dirty, dirty_ids = _dirty_days()
+    if full or watermark is None:
+        campaign_ids = list(InterviewSession.objects.values_list("campaign_id", flat=True).distinct())
+        # also clears the rows of campaigns whose sessions were all deleted
+        campaign_ids += list(
+            CampaignDailyStats.objects.exclude(campaign_id__in=campaign_ids)
+            .values_list("campaign_id", flat=True).distinct()
+        )
+        changed = {campaign_id: None for campaign_id in campaign_ids}
+    else:
+        overlap = timedelta(seconds=getattr(settings, "ANALYTICS_ROLLUP_OVERLAP", 300))
+        changed = _changed_days(watermark - overlap)
+        for campaign_id, days in dirty.items():
+            changed[campaign_id] |= days
+
+    written = 0
+    campaign_ids = sorted(changed, key=str)
+    for i in range(0, len(campaign_ids), campaigns_per_batch):
+        chunk = campaign_ids[i:i + campaigns_per_batch]
+        # one recomputation per chunk over the union of its days (a superset is still exact)
+        days = None if changed[chunk[0]] is None else sorted(set().union(*(changed[c] for c in chunk)))
+        written += rebuild_daily_stats(chunk, days)
+        if log:
+            log(f"... {i + len(chunk)}/{len(campaign_ids)} campaigns")
+
+    # by id: days queued during the refresh stay for the next one
+    for i in range(0, len(dirty_ids), 1000):
+        RollupDirtyDay.objects.filter(id__in=dirty_ids[i:i + 1000]).delete()
+    AnalyticsWatermark.objects.update_or_create(name=WATERMARK, defaults={"value": now})
+    return len(campaign_ids), written
+
+
+def rollup_watermark():
+    return AnalyticsWatermark.objects.filter(name=WATERMARK).values_list("value", flat=True).first()
+
+
+def campaign_time_series(campaign, start=None, end=None):
+    """Totals, rating histogram and per-day series of a campaign, read from the rollup rows only."""
+    rows = CampaignDailyStats.objects.filter(campaign=campaign)
+    if start:
+        rows = rows.filter(day__gte=start)
+    if end:
+        rows = rows.filter(day__lte=end)
+
+    funnel = dict.fromkeys(FUNNEL, 0)
+    histogram = {str(r): 0 for r in range(1, 6)}
+    evaluations = 0
+    score_sum = 0.0
+    series = []
+    for row in rows.order_by("day"):
+        for step in FUNNEL:
+            funnel[step] += getattr(row, step)
+        for rating, n in row.rating_histogram.items():
+            histogram[rating] = histogram.get(rating, 0) + n
+        evaluations += row.evaluations
+        score_sum += row.score_sum
+        series.append({
+            "day": row.day,
+            **{step: getattr(row, step) for step in FUNNEL},
+            "median_time_to_complete": row.median_time_to_complete,
+            "evaluations": row.evaluations,
+            "average_score": row.score_sum / row.evaluations if row.evaluations else None,
+        })
+    return {
+        "funnel": funnel,
+        "average_score": score_sum / evaluations if evaluations else None,
+        "evaluations": evaluations,
+        "rating_histogram": histogram,
+        "series": series,
+    }
@@ -0,0 +1,256 @@
+# process-wide S3 client registry shared by views and celery tasks
+import os
+import queue
+import threading
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from django.conf import settings
+
+_lock = threading.Lock()
+_session = None
+_clients = {}
+_resources = {}
+_transfer_config = None
+_pid = os.getpid()
+
+
+def _reset_after_fork():
+    """
+    Drop every cached session/client in a forked child (celery prefork, gunicorn).
+    Connection pools inherited from the parent share sockets and must not be reused.
+    """
+    global _lock, _session, _transfer_config, _pid
+    _lock = threading.Lock()
+    _session = None
+    _clients.clear()
+    _resources.clear()
+    _transfer_config = None
+    _pid = os.getpid()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _region_name():
+    return getattr(settings, "AWS_S3_REGION_NAME", None) or None
+
+
+def _client_config():
+    return Config(
+        region_name=_region_name(),
+        max_pool_connections=getattr(settings, "AWS_S3_MAX_POOL_CONNECTIONS", 50),
+        retries={"max_attempts": getattr(settings, "AWS_S3_MAX_ATTEMPTS", 5), "mode": "standard"},
+    )
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        _session = boto3.session.Session(
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID or None,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY or None,
+            region_name=_region_name(),
+        )
+    return _session
+
+
+def _check_pid():
+    # Fallback for platforms without os.register_at_fork
+    if _pid != os.getpid():
+        _reset_after_fork()
+
+
+def get_s3_client():
+    """Return the shared low-level S3 client for this process (thread-safe)."""
+    _check_pid()
+    client = _clients.get("s3")
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get("s3")
+        if client is None:
+            client = _get_session().client(
+                "s3",
+                config=_client_config(),
+                endpoint_url=getattr(settings, "AWS_S3_ENDPOINT_URL", None) or None,
+            )
+            _clients["s3"] = client
+    return client
+
+
+def get_s3_resource():
+    """
+    Return the shared S3 resource for this process.
+    Resources are not thread-safe: only use it from the thread that owns it.
+    """
+    _check_pid()
+    key = ("s3", threading.get_ident())
+    resource = _resources.get(key)
+    if resource is not None:
+        return resource
+    with _lock:
+        resource = _resources.get(key)
+        if resource is None:
+            resource = _get_session().resource(
+                "s3",
+                config=_client_config(),
+                endpoint_url=getattr(settings, "AWS_S3_ENDPOINT_URL", None) or None,
+            )
+            _resources[key] = resource
+    return resource
+
+
+def get_transfer_config():
+    """Shared TransferConfig (multipart threshold, chunk size, concurrency)."""
+    global _transfer_config
+    _check_pid()
+    if _transfer_config is None:
+        _transfer_config = TransferConfig(
+            multipart_threshold=getattr(settings, "AWS_S3_MULTIPART_THRESHOLD", 16 * 1024 * 1024),
+            multipart_chunksize=getattr(settings, "AWS_S3_MULTIPART_CHUNKSIZE", 16 * 1024 * 1024),
+            max_concurrency=getattr(settings, "AWS_S3_MAX_CONCURRENCY", 10),
+            use_threads=True,
+        )
+    return _transfer_config
+
+
+def presigned_upload_post(key, max_bytes, expires_in=3600, client=None):
+    """
+    Presigned POST for a direct, private video upload of 1..max_bytes bytes.
+    Signed locally: no request is sent to S3.
+    """
+    client = client or get_s3_client()
+    return client.generate_presigned_post(
+        Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+        Key=key,
+        Fields={"acl": "private", "Content-Type": "video/mp4"},
+        Conditions=[{"acl": "private"}, ["content-length-range", 1, max_bytes]],
+        ExpiresIn=expires_in,
+    )
+
+
+def reset_s3_clients():
+    """Forget cached clients (settings change, tests, benchmarks)."""
+    with _lock:
+        _reset_after_fork()
+
+
+class SizeLimitExceeded(ValueError):
+    """Raised when a streamed upload grows past its byte limit."""
+
+    def __init__(self, size, limit):
+        super().__init__(f"File too large: {size} bytes (limit {limit})")
+        self.size = size
+        self.limit = limit
+
+
+def upload_stream(chunks, bucket, key, max_bytes=None, part_size=None, max_queued_parts=None,
+                  upload_workers=None, extra_args=None, client=None):
+    """
+    Pipe an iterable of bytes into S3 without touching the disk.
+
+    Chunks are packed into parts of `part_size` bytes and handed to `upload_workers`
+    threads through a queue of at most `max_queued_parts` parts, so reading and
+    uploading overlap while memory stays bounded to about
+    (max_queued_parts + upload_workers + 1) * part_size.
+    Payloads smaller than one part are sent with a single put_object.
+    The multipart upload is aborted on any error, including SizeLimitExceeded
+    when more than `max_bytes` bytes are read.
+    Returns the number of bytes uploaded.
+    """
+    client = client or get_s3_client()
+    part_size = part_size or getattr(settings, "AWS_S3_MULTIPART_CHUNKSIZE", 16 * 1024 * 1024)
+    max_queued_parts = max_queued_parts or getattr(settings, "AWS_S3_STREAM_QUEUE_PARTS", 4)
+    upload_workers = upload_workers or getattr(settings, "AWS_S3_STREAM_UPLOAD_WORKERS", 4)
+    extra_args = extra_args or {}
+
+    parts_queue = queue.Queue(maxsize=max_queued_parts)
+    completed = {}
+    failures = []
+    workers = []
+    upload_id = None
+
+    def worker():
+        while True:
+            item = parts_queue.get()
+            if item is None:
+                return
+            if failures:
+                continue  # drain so the producer never blocks
+            number, body = item
+            try:
+                resp = client.upload_part(
+                    Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body
+                )
+                completed[number] = resp["ETag"]
+            except Exception as e:
+                failures.append(e)
+
+    def enqueue(item):
+        while True:
+            if failures:
+                raise failures[0]
+            try:
+                parts_queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def stop_workers():
+        for _ in workers:
+            parts_queue.put(None)
+        for t in workers:
+            t.join()
+        workers.clear()
+
+    buffer = bytearray()
+    total = 0
+    part_number = 0
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            total += len(chunk)
+            if max_bytes is not None and total > max_bytes:
+                raise SizeLimitExceeded(total, max_bytes)
+            buffer += chunk
+            while len(buffer) >= part_size:
+                if upload_id is None:
+                    upload_id = client.create_multipart_upload(Bucket=bucket, Key=key, **extra_args)["UploadId"]
+                    workers.extend(threading.Thread(target=worker, daemon=True) for _ in range(upload_workers))
+                    for t in workers:
+                        t.start()
+                part_number += 1
+                enqueue((part_number, bytes(buffer[:part_size])))
+                del buffer[:part_size]
+
+        if upload_id is None:
+            client.put_object(Bucket=bucket, Key=key, Body=bytes(buffer), **extra_args)
+            return total
+
+        if buffer:
+            part_number += 1
+            enqueue((part_number, bytes(buffer)))
+            buffer = bytearray()
+        stop_workers()
+        if failures:
+            raise failures[0]
+        client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": n, "ETag": completed[n]} for n in sorted(completed)]},
+        )
+        return total
+    except BaseException:
+        if upload_id is not None:
+            failures.append(None)  # tells workers to drain and skip
+            stop_workers()
+            try:
+                client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+            except Exception:
+                pass
+        raise
@@ -6,6 +6,8 @@ from .models import (
 )
 from django.contrib.auth.models import User
 
+from .auth import hiring_manager_for
+
 
 # ----------------------------
 # UTILISATEURS
@@ -142,7 +144,9 @@ class EvaluationSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        hiring_manager = self.context['request'].user.profile.hiring_manager
+        hiring_manager = hiring_manager_for(self.context['request'].user)
+        if hiring_manager is None:
+            raise serializers.ValidationError("L'utilisateur connecté n'est pas un recruteur.")
         validated_data['hiring_manager'] = hiring_manager
         return super().create(validated_data)
 
@@ -168,12 +172,14 @@ class VideoResponseSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'question', 'video_file', 'video_url', 'duration',
             'recorded_at', 'preparation_time_used', 'response_time_used',
-            'upload_status', 'file_size', 'format', 'evaluations'
+            'upload_status', 'file_size', 'format', 'sha256',
+            'storage_tier', 'archived_at', 'evaluations'
         ]
         read_only_fields = [
             'id', 'question', 'duration', 'recorded_at',
             'preparation_time_used', 'response_time_used',
-            'upload_status', 'file_size', 'format', 'evaluations'
+            'upload_status', 'file_size', 'format', 'sha256',
+            'storage_tier', 'archived_at', 'evaluations'
         ]
     
     def get_video_url(self, obj):
@@ -206,6 +212,8 @@ class AIAnalysisSerializer(serializers.ModelSerializer):
         model = AIAnalysis
         fields = [
             'id', 'speech_confidence', 'speech_rate', 'filler_words_count',
+            'silence_ratio', 'pause_ratio', 'pause_count',
+            'loudness_mean_db', 'loudness_range_db', 'peak_db',
             'eye_contact_score', 'posture_score', 'gesture_score',
             'sentiment_score', 'confidence_score', 'analyzed_at', 'analysis_version'
         ]
@@ -249,12 +257,9 @@ class CreateCampaignSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
 
         # Vérification que l'utilisateur est un recruteur
-        user_profile = self.context['request'].user.profile
-
-        if not hasattr(user_profile, 'hiring_manager'):
+        hiring_manager = hiring_manager_for(user)
+        if hiring_manager is None:
             raise serializers.ValidationError("L'utilisateur connecté n'est pas un recruteur.")
-
-        hiring_manager = user_profile.hiring_manager
         campaign = VideoCampaign.objects.create(hiring_manager=hiring_manager, **validated_data)
 
         # Créer les questions et les lier à la campagne
@@ -359,6 +364,7 @@ class StartInterviewSerializer(serializers.Serializer):
 
 from rest_framework import serializers
 from .models import VideoResponse, Question, InterviewSession
+from .quotas import StorageQuotaExceeded, check_storage_quota
 
 class SubmitVideoResponseSerializer(serializers.ModelSerializer):
     # optional metadata that client can provide when using external URL upload
@@ -445,6 +451,14 @@ class SubmitVideoResponseSerializer(serializers.ModelSerializer):
             if provided_size:
                 data['file_size'] = provided_size
 
+        # Quota de stockage du recruteur
+        incoming = data.get('file_size') or 0
+        if incoming:
+            try:
+                check_storage_quota(session.campaign.hiring_manager_id, incoming)
+            except StorageQuotaExceeded:
+                raise serializers.ValidationError("Quota de stockage du recruteur atteint.")
+
         return data
 
     def create(self, validated_data):
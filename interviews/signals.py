@@ -0,0 +1,191 @@
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from .auth import invalidate_user, revoke_user_tokens
+from .media import acquire_blob, is_content_addressed, release_blob, release_blobs, schedule_file_delete
+from .models import Candidate, Evaluation, HiringManager, InterviewSession, UserProfile, VideoResponse
+from .quotas import hiring_manager_id_for_response, hiring_manager_ids_for_responses, record_usage
+from .ranking import invalidate_campaign_ranking
+from .rollups import EVENT_FIELDS, event_days, mark_dirty_days
+
+
+def _file_name(value):
+    return getattr(value, "name", value) or ""
+
+
+def _blob_key(sha256, file_name):
+    # only content-addressed files are shared; other layouts own their file
+    return sha256 if sha256 and is_content_addressed(file_name) else ""
+
+
+@receiver(post_init, sender=VideoResponse)
+def remember_stored_video(sender, instance, **kwargs):
+    # __dict__ avoids loading deferred fields
+    instance._stored_file_name = _file_name(instance.__dict__.get("video_file"))
+    instance._stored_sha256 = _blob_key(instance.__dict__.get("sha256"), instance._stored_file_name)
+    instance._stored_file_size = instance.__dict__.get("file_size") or 0
+
+
+@receiver(post_save, sender=VideoResponse)
+def track_video_references(sender, instance, created, **kwargs):
+    file_name = _file_name(instance.video_file)
+    sha256 = _blob_key(instance.sha256, file_name)
+    old_sha256 = "" if created else instance._stored_sha256
+    old_file_name = "" if created else instance._stored_file_name
+
+    if sha256 != old_sha256:
+        if sha256:
+            acquire_blob(sha256, file_name, instance.file_size)
+        if old_sha256:
+            release_blob(old_sha256)
+    if not old_sha256 and old_file_name and old_file_name != file_name:
+        # ancien fichier non dédoublonné remplacé
+        schedule_file_delete(old_file_name)
+
+    # ledger of stored bytes per hiring manager (same transaction as the row)
+    size_delta = (instance.file_size or 0) - (0 if created else instance._stored_file_size)
+    if created or size_delta:
+        record_usage(hiring_manager_id_for_response(instance), size_delta, 1 if created else 0)
+
+    instance._stored_sha256 = sha256
+    instance._stored_file_name = file_name
+    instance._stored_file_size = instance.file_size or 0
+
+
+# responses collected by the delete in progress (per thread), released as one batch
+_deleting = threading.local()
+
+
+@receiver(pre_delete, sender=VideoResponse)
+def collect_deleted_response(sender, instance, origin=None, **kwargs):
+    # the collector sends every pre_delete of a cascade before the first post_delete
+    batches = _deleting.__dict__.setdefault("batches", {})
+    batches.setdefault(id(origin), (origin, []))[1].append(instance)
+
+
+def _release_responses(responses):
+    """Blob references, orphan files and ledger of deleted responses: a few queries per batch."""
+    blobs, files, usage = defaultdict(int), [], defaultdict(lambda: [0, 0])
+    for response, owner in zip(responses, hiring_manager_ids_for_responses(responses)):
+        name = _file_name(response.video_file)
+        sha256 = _blob_key(response.sha256, name)
+        if sha256:
+            blobs[sha256] += 1
+        else:
+            files.append(name)
+        usage[owner][0] -= response.file_size or 0
+        usage[owner][1] -= 1
+        response._delete_released = True
+    release_blobs(blobs)
+    schedule_file_delete(*files)
+    for hiring_manager_id, (bytes_delta, count_delta) in usage.items():
+        record_usage(hiring_manager_id, bytes_delta, count_delta)
+
+
+@receiver(post_delete, sender=VideoResponse)
+def release_video_file(sender, instance, origin=None, **kwargs):
+    if getattr(instance, "_delete_released", False):
+        return
+    batches = _deleting.__dict__.setdefault("batches", {})
+    _, responses = batches.pop(id(origin), (None, []))
+    # other batches belong to deletes that failed before their post_delete
+    batches.clear()
+    if instance not in responses:
+        responses.append(instance)
+    _release_responses(responses)
+
+
+@receiver(post_save, sender=Evaluation)
+@receiver(post_delete, sender=Evaluation)
+def invalidate_ranking(sender, instance, **kwargs):
+    campaign_id = (
+        VideoResponse.objects.filter(pk=instance.video_response_id)
+        .values_list("session__campaign_id", flat=True).first()
+    )
+    if campaign_id:
+        # after commit: a ranking recomputed meanwhile would still read the old rows
+        transaction.on_commit(lambda: invalidate_campaign_ranking(campaign_id))
+
+
+def _session_events(instance):
+    # __dict__ avoids loading deferred fields
+    return instance.__dict__.get("campaign_id"), tuple(instance.__dict__.get(f) for f in EVENT_FIELDS)
+
+
+@receiver(post_init, sender=InterviewSession)
+def remember_session_events(sender, instance, **kwargs):
+    instance._stored_events = _session_events(instance)
+
+
+@receiver(post_save, sender=InterviewSession)
+def mark_moved_session_days(sender, instance, created, **kwargs):
+    # days left by a moved timestamp: the session's updated_at only points at the new ones
+    events = _session_events(instance)
+    if not created and events != instance._stored_events:
+        old_campaign_id, old_timestamps = instance._stored_events
+        days = event_days(old_timestamps)
+        if old_campaign_id == events[0]:
+            days -= event_days(events[1])
+        mark_dirty_days(old_campaign_id, days)
+    instance._stored_events = events
+
+
+@receiver(post_delete, sender=InterviewSession)
+def mark_deleted_session_days(sender, instance, **kwargs):
+    campaign_id, timestamps = _session_events(instance)
+    mark_dirty_days(campaign_id, event_days(timestamps))
+
+
+@receiver(post_delete, sender=Evaluation)
+def mark_deleted_evaluation_day(sender, instance, **kwargs):
+    # runs before the cascade deletes the response / session (dependents go first)
+    campaign_id = (
+        VideoResponse.objects.filter(pk=instance.video_response_id)
+        .values_list("session__campaign_id", flat=True).first()
+    )
+    mark_dirty_days(campaign_id, event_days([instance.evaluated_at]))
+
+
+def _profile_user_id(profile_id):
+    return UserProfile.objects.filter(pk=profile_id).values_list("user_id", flat=True).first()
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=HiringManager)
+@receiver(post_delete, sender=HiringManager)
+@receiver(post_save, sender=Candidate)
+@receiver(post_delete, sender=Candidate)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # only needed when load_user() keeps users in the process
+    if not getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 0):
+        return
+    if isinstance(instance, UserProfile):
+        user_id = instance.user_id
+    elif isinstance(instance, (HiringManager, Candidate)):
+        user_id = _profile_user_id(instance.user_profile_id)
+    else:
+        user_id = instance.pk
+    if user_id:
+        transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+@receiver(post_init, sender=get_user_model())
+def remember_user_active(sender, instance, **kwargs):
+    instance._was_active = instance.__dict__.get("is_active")
+
+
+@receiver(post_save, sender=get_user_model())
+def revoke_deactivated_user_tokens(sender, instance, created, **kwargs):
+    # the stateless JWT mode never reads the User row: deny the tokens of a deactivated account
+    if not created and instance._was_active and not instance.is_active:
+        transaction.on_commit(lambda: revoke_user_tokens(instance.pk))
+    instance._was_active = instance.is_active
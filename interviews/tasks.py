@@ -1,44 +1,222 @@
 from django.conf import settings
 from celery import shared_task
-from .utils import get_remote_content_length, download_with_limit
-import boto3
+from .utils import probe_remote, download_with_limit, discard_partial_download, get_http_session, DOWNLOAD_CHUNK_SIZE
+from .s3 import get_s3_client, get_transfer_config, upload_stream, SizeLimitExceeded
+from .media import content_addressed_name, file_sha256, process_pending_deletes, register_blob
+from .models import MediaBlob
+from .archive import is_archived, mark_hot
+from .jobs import ProgressReporter, backoff_delay, job_failed, job_retrying, job_started, job_succeeded
+from celery.exceptions import Retry
+import hashlib
 import os
+import requests
 import tempfile
 
-@shared_task(bind=True)
-def fetch_and_store_video(self, video_url, bucket_key, max_mb=200):
+
+def _partial_path(bucket_key, task_id=None):
+    # stable path per task (celery retries keep the task id) so a retried task resumes
+    # the same partial file, and two tasks fetching the same key never share one
+    digest = hashlib.sha1(f"{task_id}:{bucket_key}".encode("utf-8")).hexdigest()
+    return os.path.join(tempfile.gettempdir(), f"fetch-{digest}.part")
+
+
+def _stream_to_s3(video_url, bucket_key, max_bytes, progress=None):
+    """
+    Pipe the HTTP body into an S3 multipart upload: download and upload overlap.
+    Returns (size, sha256); the digest is computed on the fly.
+    """
+    digest = hashlib.sha256()
+
+    with get_http_session().get(video_url, stream=True, timeout=10) as r:
+        r.raise_for_status()
+
+        def chunks():
+            for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                if progress:
+                    progress(len(chunk))
+                yield chunk
+
+        size = upload_stream(chunks(), settings.AWS_STORAGE_BUCKET_NAME, bucket_key, max_bytes=max_bytes)
+    return size, digest.hexdigest()
+
+
+def _promote_staged_object(s3, bucket, staging_key, sha256, size):
+    """Move a streamed object to its content address, or drop it if the bytes are already stored."""
+    blob = MediaBlob.objects.filter(sha256=sha256).first()
+    if blob is None:
+        key = content_addressed_name(sha256, staging_key)
+        s3.copy({"Bucket": bucket, "Key": staging_key}, bucket, key, Config=get_transfer_config())
+        blob = register_blob(sha256, key, size)
+    elif is_archived(blob.storage_name):
+        # the stored copy is in cold storage: replace it with the fresh standard-tier one
+        s3.copy({"Bucket": bucket, "Key": staging_key}, bucket, blob.storage_name, Config=get_transfer_config())
+        mark_hot(blob.storage_name)
+    s3.delete_object(Bucket=bucket, Key=staging_key)
+    return blob.storage_name
+
+
+@shared_task(bind=True, max_retries=3)
+def fetch_and_store_video(self, video_url, bucket_key, max_mb=200, streaming=None, content_addressed=True,
+                          job_id=None):
+    """
+    Fetch a remote video into the bucket. With content_addressed=True (default) the
+    object ends up under its SHA-256 key and identical bytes are stored only once;
+    `bucket_key` is then only a staging name. The returned key/sha256 are meant to be
+    saved on the VideoResponse (which takes the reference on the stored object).
+    With `job_id` (see interviews.jobs.enqueue_job) state, attempts and downloaded
+    bytes are tracked on the MediaJob row.
+    """
+    if not job_started(job_id, self.request.id):
+        return {"status": "cancelled"}
+    progress = ProgressReporter(job_id) if job_id else None
+    try:
+        result = _fetch_and_store(self, video_url, bucket_key, max_mb, streaming, content_addressed, progress)
+    except Retry as e:
+        job_retrying(job_id, e.exc or e, e.when or 0)
+        raise
+    except Exception as e:
+        job_failed(job_id, e)
+        raise
+    if result["status"] == "ok":
+        job_succeeded(job_id, result, bytes_done=result["size"])
+    else:
+        job_failed(job_id, result.get("reason", result["status"]))
+    return result
+
+
+def _fetch_and_store(task, video_url, bucket_key, max_mb, streaming, content_addressed, progress=None):
     max_bytes = max_mb * 1024 * 1024
-    # try HEAD first
-    cl = get_remote_content_length(video_url)
+    # try HEAD first (also tells us whether ranged download is possible)
+    probe = probe_remote(video_url)
+    cl = probe[0]
     if cl is not None and cl > max_bytes:
         return {"status": "rejected", "reason": "too_large_head", "size": cl}
+    if progress:
+        progress.set_total(cl)
 
-    # download to temp and abort if exceeds max
-    fd, tmp_path = tempfile.mkstemp(suffix=".tmp")
-    os.close(fd)
+    if streaming is None:
+        streaming = getattr(settings, "VIDEO_FETCH_STREAMING", False)
+    if streaming:
+        # no temp file: the multipart upload is aborted if the limit is exceeded
+        try:
+            size, sha256 = _stream_to_s3(video_url, bucket_key, max_bytes, progress=progress)
+        except SizeLimitExceeded as e:
+            return {"status": "rejected", "reason": "too_large_stream", "size": e.size}
+        except requests.exceptions.RequestException as e:
+            if task.request.retries < task.max_retries:
+                raise task.retry(exc=e, countdown=backoff_delay(task.request.retries))
+            return {"status": "failed", "reason": str(e)}
+        except Exception as e:
+            return {"status": "failed", "reason": str(e)}
+        key = bucket_key
+        if content_addressed:
+            key = _promote_staged_object(get_s3_client(), settings.AWS_STORAGE_BUCKET_NAME, bucket_key, sha256, size)
+        return {"status": "ok", "size": size, "key": key, "sha256": sha256}
+
+    # download to temp and abort if exceeds max; resume partial data from a previous attempt
+    tmp_path = _partial_path(bucket_key, task.request.id)
     try:
-        size = download_with_limit(video_url, max_bytes, tmp_path)
+        size = download_with_limit(video_url, max_bytes, tmp_path, resume=True, probe=probe, progress=progress)
+    except requests.exceptions.RequestException as e:
+        if task.request.retries < task.max_retries:
+            # keep the partial file: the retry picks up where this attempt stopped
+            raise task.retry(exc=e, countdown=backoff_delay(task.request.retries))
+        discard_partial_download(tmp_path)
+        return {"status": "failed", "reason": str(e)}
     except Exception as e:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+        discard_partial_download(tmp_path)
         return {"status": "failed", "reason": str(e)}
 
-    # upload to S3
-    s3 = boto3.client(
-        "s3",
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=getattr(settings, "AWS_REGION", None)
-    )
+    # upload to S3 (shared client + multipart settings), skipped when the bytes are already stored
+    s3 = get_s3_client()
     bucket = settings.AWS_STORAGE_BUCKET_NAME
     try:
-        s3.upload_file(tmp_path, bucket, bucket_key)
+        with open(tmp_path, "rb") as f:
+            sha256 = file_sha256(f)
+        key = bucket_key
+        blob = MediaBlob.objects.filter(sha256=sha256).first() if content_addressed else None
+        if blob is not None:
+            key = blob.storage_name
+            if is_archived(key):
+                # stored copy is in cold storage: upload the fresh bytes in the standard tier
+                s3.upload_file(tmp_path, bucket, key, Config=get_transfer_config())
+                mark_hot(key)
+        else:
+            if content_addressed:
+                key = content_addressed_name(sha256, bucket_key)
+            s3.upload_file(tmp_path, bucket, key, Config=get_transfer_config())
+            if content_addressed:
+                key = register_blob(sha256, key, size).storage_name
     finally:
-        try:
-            os.remove(tmp_path)
-        except Exception:
-            pass
+        discard_partial_download(tmp_path)
+
+    return {"status": "ok", "size": size, "key": key, "sha256": sha256}
+
+
+@shared_task
+def delete_pending_files(batch_size=1000, max_batches=None):
+    """Drain the pending-delete outbox (S3 DeleteObjects batches); meant to run periodically."""
+    deleted, failed = process_pending_deletes(batch_size=batch_size, max_batches=max_batches)
+    return {"deleted": deleted, "failed": failed}
+
+
+@shared_task
+def archive_closed_campaign_media(retention_days=None):
+    """Move the videos of campaigns closed for longer than the retention window to cold storage."""
+    from .archive import archive_closed_campaigns
+    archived, archived_bytes, failures = archive_closed_campaigns(retention_days=retention_days)
+    return {"archived": archived, "bytes": archived_bytes, "failed": failures}
+
+
+@shared_task
+def process_media_restores():
+    """Submit pending restore requests, detect finished restores and expire restored copies."""
+    from .archive import process_restore_jobs
+    return process_restore_jobs()
+
+
+@shared_task
+def reconcile_storage_ledger(batch_size=500):
+    """Recompute per-hiring-manager storage usage (drift from bulk operations, crashes)."""
+    from .quotas import reconcile_storage_usage
+    return {"corrected": len(reconcile_storage_usage(batch_size=batch_size))}
+
+
+@shared_task(bind=True)
+def analyze_responses(self, campaign_id=None, batch_size=50, max_batches=None, job_id=None):
+    """
+    Analyze responses without an AIAnalysis of the current AI_ANALYSIS_VERSION.
+    Runs inside the analysis worker process (its analyzers stay loaded between tasks).
+    """
+    from .analysis import analyzer_paths, run_analysis
+    if not analyzer_paths():
+        return {"status": "disabled"}
+    if not job_started(job_id, self.request.id):
+        return {"status": "cancelled"}
+    progress = ProgressReporter(job_id) if job_id else None
+    try:
+        analyzed, failed = run_analysis(
+            campaign=campaign_id, batch_size=batch_size, workers=0, max_batches=max_batches, progress=progress
+        )
+    except Exception as e:
+        job_failed(job_id, e)
+        raise
+    result = {"status": "ok", "analyzed": analyzed, "failed": failed}
+    job_succeeded(job_id, result, bytes_done=progress.done if progress else None)
+    return result
+
+
+@shared_task
+def refresh_campaign_rollups(full=False):
+    """Recompute the CampaignDailyStats rows touched since the last watermark."""
+    from .rollups import refresh_daily_stats
+    campaigns, rows = refresh_daily_stats(full=full)
+    return {"campaigns": campaigns, "rows": rows}
+
 
-    return {"status": "ok", "size": size, "key": bucket_key}
\ No newline at end of file
+@shared_task
+def purge_revoked_tokens():
+    """Delete the revocations of tokens that have expired anyway."""
+    from .auth import purge_revoked_tokens as purge
+    return {"deleted": purge()}
@@ -1,3 +1,184 @@
-from django.test import TestCase
+import os
+import re
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import requests
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from .db import pin_to_primary, replica_configured, use_replica
+from .models import VideoCampaign
+from .utils import download_with_limit
+
+
+class _VideoHandler(BaseHTTPRequestHandler):
+    """Serves server.body; honours Range unless server.ignore_ranges, and can cut a range short once."""
+
+    def log_message(self, *args):
+        pass
+
+    def _headers(self, status, length, extra=()):
+        self.send_response(status)
+        if not self.server.hide_length:
+            self.send_header("Content-Length", str(length))
+        if self.server.accept_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        for name, value in extra:
+            self.send_header(name, value)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._headers(200, len(self.server.body))
+
+    def do_GET(self):
+        body = self.server.body
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        with self.server.lock:
+            self.server.requests.append(self.headers.get("Range"))
+        if match is None or self.server.ignore_ranges:
+            self._headers(200, len(body))
+            self.wfile.write(body)
+            return
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else len(body) - 1
+        part = body[start:end + 1]
+        self._headers(206, len(part), [("Content-Range", f"bytes {start}-{end}/{len(body)}")])
+        with self.server.lock:
+            cut = self.server.fail_range == start
+            if cut:
+                self.server.fail_range = None
+        # injected failure: half the announced bytes, then the connection is closed
+        self.wfile.write(part[:len(part) // 2] if cut else part)
+        if cut:
+            self.close_connection = True
+
+
+class DownloadWithLimitTests(SimpleTestCase):
+    """download_with_limit against a local HTTP server."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _VideoHandler)
+        self.server.body = os.urandom(100_000)
+        self.server.accept_ranges = True
+        self.server.ignore_ranges = False
+        self.server.hide_length = False
+        self.server.fail_range = None
+        self.server.requests = []
+        self.server.lock = threading.Lock()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/video.webm"
+        self.session = requests.Session()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dest = os.path.join(tmp.name, "video.part")
+
+    def tearDown(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def download(self, max_bytes=1_000_000, **kwargs):
+        kwargs.setdefault("workers", 4)
+        kwargs.setdefault("part_size", 16_384)
+        return download_with_limit(self.url, max_bytes, self.dest, session=self.session, **kwargs)
+
+    def assertDownloaded(self, size):
+        self.assertEqual(size, len(self.server.body))
+        with open(self.dest, "rb") as f:
+            self.assertEqual(f.read(), self.server.body)
+
+    def test_ranged_download(self):
+        self.assertDownloaded(self.download())
+        self.assertEqual(len(self.server.requests), 7)
+        self.assertTrue(all(r and r.startswith("bytes=") for r in self.server.requests))
+
+    def test_stream_without_accept_ranges(self):
+        self.server.accept_ranges = False
+        self.assertDownloaded(self.download())
+        self.assertEqual(self.server.requests, [None])
+
+    def test_stream_when_ranges_are_ignored(self):
+        self.server.ignore_ranges = True
+        self.assertDownloaded(self.download())
+        self.assertIn(None, self.server.requests)
+
+    def test_rejects_announced_size_over_limit(self):
+        with self.assertRaises(ValueError):
+            self.download(max_bytes=50_000)
+        self.assertEqual(self.server.requests, [])
+        self.assertFalse(os.path.exists(self.dest))
+
+    def test_rejects_streamed_size_over_limit(self):
+        self.server.accept_ranges = False
+        self.server.hide_length = True
+        with self.assertRaises(ValueError):
+            self.download(max_bytes=50_000)
+        self.assertFalse(os.path.exists(self.dest))
+
+    def test_resume_after_failed_range(self):
+        self.server.fail_range = 32_768
+        with self.assertRaises(requests.exceptions.RequestException):
+            self.download(workers=2, resume=True)
+        fetched = set(self.server.requests)
+        self.server.requests = []
+        self.assertDownloaded(self.download(workers=2, resume=True))
+        self.assertIn("bytes=32768-49151", self.server.requests)
+        # ranges completed by the first attempt are not fetched again
+        self.assertFalse(fetched & set(self.server.requests) - {"bytes=32768-49151"})
+
+
+class _CampaignsView:
+    @use_replica
+    def get(self, request):
+        return list(VideoCampaign.objects.all())
+
+
+@skipUnless(replica_configured(), "no replica alias (DATABASE_REPLICA_URL)")
+class ReplicaRouterTests(TransactionTestCase):
+    """
+    ReplicaRouter / use_replica decisions. A TransactionTestCase: TestCase wraps each
+    test in a transaction on the primary, where the router keeps every read.
+    """
+
+    # the test runner checks the aliases of every test class, skipped ones included
+    databases = {"default", "replica"} if replica_configured() else {"default"}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User(pk=1, username="hm")
+        self.request = RequestFactory().get("/")
+        self.request.user = self.user
+
+    def read_alias(self, lag=0.0):
+        """Alias of the query run by a @use_replica view method, with replica_lag() returning `lag`."""
+        with mock.patch("interviews.db.replica_lag", return_value=lag), \
+                CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            _CampaignsView().get(self.request)
+        self.assertEqual(len(primary) + len(replica), 1)
+        return "replica" if replica else "default"
+
+    def test_use_replica_reads_from_replica(self):
+        self.assertEqual(self.read_alias(), "replica")
+
+    def test_reads_after_write_stay_on_primary(self):
+        pin_to_primary(self.user)
+        self.assertEqual(self.read_alias(), "default")
+
+    def test_reads_in_atomic_block_stay_on_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.read_alias(), "default")
+
+    def test_unreachable_replica(self):
+        self.assertEqual(self.read_alias(lag=None), "default")
+
+    def test_lagging_replica(self):
+        self.assertEqual(self.read_alias(lag=settings.REPLICA_MAX_LAG_SECONDS + 1), "default")
+        self.assertEqual(self.read_alias(lag=settings.REPLICA_MAX_LAG_SECONDS), "replica")
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
@@ -11,11 +12,18 @@ from .views import (
     VideoSettingsViewSet, DashboardMetricsViewSet, 
     AIAnalysisViewSet, QuestionViewSet, 
     CandidateViewSet, VideoResponseViewSet, 
-    SessionLogViewSet, PresignUploadView,
+    SessionLogViewSet, PresignUploadView, RemoteVideoCheckView,
     SubmitInterviewResponsesView,
     CandidateInterviewsView, CandidateInterviewDetailView,
-    AuthMeView,
+    AuthMeView, LogoutView,
 )
+from .async_views import AsyncPresignUploadView, AsyncRemoteVideoCheckView
+
+# I/O-bound upload endpoints: async views when served by the ASGI profile (uvicorn)
+if settings.ASYNC_VIEWS:
+    presign_view, remote_check_view = AsyncPresignUploadView, AsyncRemoteVideoCheckView
+else:
+    presign_view, remote_check_view = PresignUploadView, RemoteVideoCheckView
 
 router = DefaultRouter()
 router.register(r'hiring-managers', HiringManagerViewSet, basename='hiring-manager')
@@ -45,6 +53,7 @@ urlpatterns = [
     path('auth/register/', RegisterView.as_view(), name='register'),
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    path('auth/logout/', LogoutView.as_view(), name='logout'),
     # Auth profile endpoints (and compatibility aliases expected by frontend)
     path('auth/me/', AuthMeView.as_view(), name='auth-me'),
     path('users/me/', AuthMeView.as_view(), name='users-me'),
@@ -59,5 +68,7 @@ urlpatterns = [
     path('candidate/interviews/<uuid:session_id>/', CandidateInterviewDetailView.as_view(), name='candidate-interview-detail'),
 
     # Presigned URL for uploads
-    path('uploads/presign/', PresignUploadView.as_view(), name='presign-upload'),
+    path('uploads/presign/', presign_view.as_view(), name='presign-upload'),
+    # Remote video URL check (HEAD: size, range support) before fetch_and_store_video
+    path('uploads/check-url/', remote_check_view.as_view(), name='check-remote-video'),
 ]
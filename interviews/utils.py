@@ -1,36 +1,479 @@
 # helper functions for remote url validation/download
-import requests
-import tempfile
+import asyncio
+import ipaddress
+import json
 import os
+import socket
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+MAX_PROBE_REDIRECTS = 5
+
+_session_lock = threading.Lock()
+_http_sessions = {}  # public_only -> (pid, session)
+
+
+class NonPublicAddress(Exception):
+    """A remote request would reach a loopback, private, link-local or reserved address."""
+
+
+def _require_public_ip(address):
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    if not ip.is_global or ip.is_multicast:
+        raise NonPublicAddress(address)
+
+
+class _PublicPeerMixin:
+    # the peer of each new connection is checked before anything is sent on it:
+    # the address checked is the one connected to, a DNS rebinding cannot swap it
+    def _new_conn(self):
+        sock = super()._new_conn()
+        try:
+            _require_public_ip(sock.getpeername()[0])
+        except NonPublicAddress:
+            sock.close()
+            raise
+        return sock
+
+
+class _PublicHTTPConnection(_PublicPeerMixin, HTTPConnection):
+    pass
+
+
+class _PublicHTTPSConnection(_PublicPeerMixin, HTTPSConnection):
+    pass
+
+
+class _PublicHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _PublicHTTPConnection
+
+
+class _PublicHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _PublicHTTPSConnection
+
+
+class PublicAddressAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections fail with NonPublicAddress on a non-public peer."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _PublicHTTPConnectionPool,
+            "https": _PublicHTTPSConnectionPool,
+        }
+
+
+def get_http_session(public_only=False):
+    """
+    Process-wide pooled requests.Session (keep-alive between HEAD and GET, and
+    between the parallel range requests). Recreated after a fork. With
+    public_only, connections to non-public addresses fail (NonPublicAddress)
+    and proxies from the environment are ignored.
+    """
+    entry = _http_sessions.get(public_only)
+    if entry is not None and entry[0] == os.getpid():
+        return entry[1]
+    with _session_lock:
+        entry = _http_sessions.get(public_only)
+        if entry is None or entry[0] != os.getpid():
+            pool_size = getattr(settings, "REMOTE_DOWNLOAD_POOL_SIZE", 16)
+            session = requests.Session()
+            session.trust_env = not public_only
+            adapter = (PublicAddressAdapter if public_only else HTTPAdapter)(
+                pool_connections=pool_size, pool_maxsize=pool_size
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            entry = _http_sessions[public_only] = (os.getpid(), session)
+    return entry[1]
+
+
+def _probe_result(response):
+    cl = response.headers.get("Content-Length")
+    accepts_ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+    return (int(cl) if cl is not None else None), accepts_ranges
 
-def get_remote_content_length(url, timeout=5):
+
+def probe_remote(url, timeout=5, session=None):
+    """
+    Single HEAD request. Returns (content_length, accepts_ranges);
+    content_length is None when unknown or when the request fails.
+    """
+    session = session or get_http_session()
     try:
-        r = requests.head(url, allow_redirects=True, timeout=timeout)
-        cl = r.headers.get("Content-Length")
-        return int(cl) if cl is not None else None
+        return _probe_result(session.head(url, allow_redirects=True, timeout=timeout))
     except Exception:
-        return None
+        return None, False
+
+
+def get_remote_content_length(url, timeout=5, session=None):
+    return probe_remote(url, timeout=timeout, session=session)[0]
+
+
+validate_remote_url = URLValidator(schemes=["http", "https"])
 
-def download_with_limit(url, max_bytes, dest_path, timeout=10):
+
+def _check_public_addresses(addrinfo):
+    # every address the host resolves to must be public: a probe must not reach
+    # loopback, private networks, link-local (cloud metadata) or reserved ranges
+    if not addrinfo:
+        raise ValidationError("unresolvable host")
+    for *_, sockaddr in addrinfo:
+        try:
+            _require_public_ip(sockaddr[0])
+        except NonPublicAddress:
+            raise ValidationError("non-public address")
+
+
+def validate_public_url(url):
     """
-    Stream-download url to dest_path, abort if size exceeds max_bytes.
-    Raises ValueError if too large or requests.exceptions on HTTP errors.
+    validate_remote_url, plus: the host only resolves to public addresses.
+    Early 400 for the views; the connection itself is checked again (get_http_session).
     """
-    with requests.get(url, stream=True, timeout=timeout) as r:
-        r.raise_for_status()
-        total = 0
+    validate_remote_url(url)
+    try:
+        addrinfo = socket.getaddrinfo(urlsplit(url).hostname, None, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError):
+        raise ValidationError("unresolvable host")
+    _check_public_addresses(addrinfo)
+
+
+async def avalidate_public_url(url):
+    """validate_public_url for async views (resolution through the event loop)."""
+    validate_remote_url(url)
+    try:
+        addrinfo = await asyncio.get_running_loop().getaddrinfo(
+            urlsplit(url).hostname, None, type=socket.SOCK_STREAM
+        )
+    except (OSError, UnicodeError):
+        raise ValidationError("unresolvable host")
+    _check_public_addresses(addrinfo)
+
+
+def remote_video_check(probe, max_bytes, reason=None):
+    """
+    Verdict on a remote video from its probe result (same size rule as
+    fetch_and_store_video); probe is None when the probe failed or was refused.
+    """
+    if probe is None:
+        return {
+            "valid": False,
+            "reason": reason or "unreachable",
+            "content_length": None,
+            "accepts_ranges": False,
+            "max_bytes": max_bytes,
+        }
+    length, accepts_ranges = probe
+    too_large = length is not None and length > max_bytes
+    return {
+        "valid": not too_large,
+        "reason": "too_large" if too_large else None,
+        "content_length": length,
+        "accepts_ranges": accepts_ranges,
+        "max_bytes": max_bytes,
+    }
+
+
+class _TooManyRedirects(Exception):
+    pass
+
+
+def _probe_failure(exc):
+    if isinstance(exc, NonPublicAddress):
+        return "non_public_address"
+    if isinstance(exc, ValidationError):
+        return "invalid_redirect"
+    if isinstance(exc, _TooManyRedirects):
+        return "too_many_redirects"
+    return "unreachable"
+
+
+def _checked_probe(response):
+    if response.status_code >= 400:
+        return None, f"http_{response.status_code}"
+    return _probe_result(response), None
+
+
+def check_remote_video(url, max_bytes, timeout=5):
+    """
+    remote_video_check of a URL probed with HEAD through the public-only session:
+    at most MAX_PROBE_REDIRECTS redirects, each target validated, and every
+    connection refused unless its peer is a public address. A probe that fails
+    or is refused gives valid=False with the reason.
+    """
+    session = get_http_session(public_only=True)
+    try:
+        for _ in range(MAX_PROBE_REDIRECTS + 1):
+            response = session.head(url, allow_redirects=False, timeout=timeout)
+            if not response.is_redirect:
+                break
+            url = urljoin(url, response.headers["Location"])
+            validate_remote_url(url)
+        else:
+            raise _TooManyRedirects(url)
+    except Exception as exc:
+        return remote_video_check(None, max_bytes, reason=_probe_failure(exc))
+    probe, reason = _checked_probe(response)
+    return remote_video_check(probe, max_bytes, reason=reason)
+
+
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> {public_only: client}
+
+
+def _public_async_transport(limits):
+    """httpx transport refusing (NonPublicAddress) connections whose peer is not public."""
+    import httpcore
+    import httpx
+
+    class PublicNetworkBackend(httpcore.AsyncNetworkBackend):
+        def __init__(self):
+            self._backend = httpcore.AnyIOBackend()
+
+        async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+            stream = await self._backend.connect_tcp(
+                host, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+            )
+            try:
+                _require_public_ip(stream.get_extra_info("server_addr")[0])
+            except NonPublicAddress:
+                await stream.aclose()
+                raise
+            return stream
+
+        async def connect_unix_socket(self, *args, **kwargs):
+            raise NonPublicAddress("unix socket")
+
+        async def sleep(self, seconds):
+            await self._backend.sleep(seconds)
+
+    transport = httpx.AsyncHTTPTransport(limits=limits, trust_env=False)
+    # httpx has no option for the network backend: same pool, with the checking backend
+    transport._pool = httpcore.AsyncConnectionPool(
+        ssl_context=transport._pool._ssl_context,
+        max_connections=limits.max_connections,
+        max_keepalive_connections=limits.max_keepalive_connections,
+        keepalive_expiry=limits.keepalive_expiry,
+        network_backend=PublicNetworkBackend(),
+    )
+    return transport
+
+
+def get_async_http_client(public_only=False):
+    """
+    Pooled httpx.AsyncClient of the running event loop (an AsyncClient cannot be
+    shared between loops). Under uvicorn each worker runs one loop, so connections
+    are kept alive across requests. public_only: see get_http_session.
+    """
+    import httpx  # only needed by the async views
+
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(public_only)
+    if client is None:
+        pool_size = getattr(settings, "REMOTE_DOWNLOAD_POOL_SIZE", 16)
+        limits = httpx.Limits(max_connections=pool_size * 4, max_keepalive_connections=pool_size)
+        if public_only:
+            client = httpx.AsyncClient(transport=_public_async_transport(limits), trust_env=False)
+        else:
+            client = httpx.AsyncClient(follow_redirects=True, limits=limits)
+        clients[public_only] = client
+    return client
+
+
+async def aprobe_remote(url, timeout=5, client=None):
+    """probe_remote() for async views: the same HEAD request, awaited on httpx."""
+    client = client or get_async_http_client()
+    try:
+        return _probe_result(await client.head(url, timeout=timeout))
+    except Exception:
+        return None, False
+
+
+async def acheck_remote_video(url, max_bytes, timeout=5, client=None):
+    """check_remote_video for async views, on the public-only httpx client."""
+    client = client or get_async_http_client(public_only=True)
+    try:
+        for _ in range(MAX_PROBE_REDIRECTS + 1):
+            response = await client.head(url, timeout=timeout, follow_redirects=False)
+            if not response.is_redirect:
+                break
+            url = urljoin(url, response.headers["Location"])
+            validate_remote_url(url)
+        else:
+            raise _TooManyRedirects(url)
+    except Exception as exc:
+        return remote_video_check(None, max_bytes, reason=_probe_failure(exc))
+    probe, reason = _checked_probe(response)
+    return remote_video_check(probe, max_bytes, reason=reason)
+
+
+def _ranges_state_path(dest_path):
+    return dest_path + ".ranges"
+
+
+def discard_partial_download(dest_path):
+    """Remove a partial download and its resume state."""
+    for path in (dest_path, _ranges_state_path(dest_path)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _split_ranges(length, part_size):
+    return [(start, min(start + part_size, length) - 1) for start in range(0, length, part_size)]
+
+
+class _RangesIgnored(Exception):
+    """The server announced Accept-Ranges but answered a range request with the whole body."""
+
+
+def _download_ranges(session, url, dest_path, length, part_size, workers, timeout, resume, progress=None):
+    state_path = _ranges_state_path(dest_path)
+    done = set()
+    if resume and os.path.exists(state_path) and os.path.exists(dest_path) \
+            and os.path.getsize(dest_path) == length:
+        try:
+            with open(state_path) as f:
+                state = json.load(f)
+            if state.get("length") == length and state.get("part_size") == part_size:
+                done = {tuple(r) for r in state.get("done", [])}
+        except (ValueError, OSError):
+            done = set()
+    if not done:
+        # preallocate so every worker can write its range in place
         with open(dest_path, "wb") as f:
-            for chunk in r.iter_content(chunk_size=8192):
+            f.truncate(length)
+
+    state_lock = threading.Lock()
+
+    def save_state():
+        with open(state_path, "w") as f:
+            json.dump({"length": length, "part_size": part_size, "done": sorted(done)}, f)
+
+    def fetch(start, end):
+        headers = {"Range": f"bytes={start}-{end}"}
+        with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+            r.raise_for_status()
+            if r.status_code != 206:
+                raise _RangesIgnored(r.status_code)
+            offset = start
+            with open(dest_path, "r+b") as f:
+                f.seek(start)
+                for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    offset += len(chunk)
+                    if offset > end + 1:
+                        raise ValueError(f"Range {start}-{end} overran: server sent more than announced")
+                    f.write(chunk)
+                    if progress:
+                        progress(len(chunk))
+            if offset != end + 1:
+                raise requests.exceptions.ChunkedEncodingError(
+                    f"Range {start}-{end} truncated at {offset} bytes"
+                )
+        with state_lock:
+            done.add((start, end))
+            save_state()
+
+    pending = [r for r in _split_ranges(length, part_size) if r not in done]
+    if progress:
+        progress(sum(end - start + 1 for start, end in done))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(fetch, start, end) for start, end in pending]
+        try:
+            for future in as_completed(futures):
+                future.result()
+                if progress:
+                    # report from the calling thread (ranges only accumulate)
+                    progress(0)
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+    try:
+        os.remove(state_path)
+    except FileNotFoundError:
+        pass
+    return length
+
+
+def _download_stream(session, url, dest_path, max_bytes, timeout, resume, progress=None):
+    offset = 0
+    headers = {}
+    if resume and os.path.exists(dest_path):
+        offset = os.path.getsize(dest_path)
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+
+    with session.get(url, stream=True, timeout=timeout, headers=headers) as r:
+        r.raise_for_status()
+        if offset and r.status_code != 206:
+            # server ignored the Range header: start over
+            offset = 0
+        total = offset
+        if progress and offset:
+            progress(offset)
+        with open(dest_path, "ab" if offset else "wb") as f:
+            for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
                 if not chunk:
                     continue
                 total += len(chunk)
                 if total > max_bytes:
                     # cleanup and abort
                     f.close()
-                    try:
-                        os.remove(dest_path)
-                    except Exception:
-                        pass
+                    discard_partial_download(dest_path)
                     raise ValueError(f"File too large: {total} bytes (limit {max_bytes})")
                 f.write(chunk)
-    return total
\ No newline at end of file
+                if progress:
+                    progress(len(chunk))
+    return total
+
+
+def download_with_limit(url, max_bytes, dest_path, timeout=10, workers=None, part_size=None,
+                        resume=False, session=None, probe=None, progress=None):
+    """
+    Download url to dest_path, abort if size exceeds max_bytes.
+
+    When the server announces Content-Length and Accept-Ranges: bytes, the file is
+    fetched as `workers` concurrent byte ranges written into a preallocated file;
+    otherwise it is streamed over a single connection.
+    With resume=True, a previous partial download of dest_path is continued
+    (completed ranges are tracked in `<dest_path>.ranges`).
+    `probe` is an optional (content_length, accepts_ranges) tuple from probe_remote,
+    to avoid a second HEAD request.
+    `progress`, if given, is called with the number of bytes written by each chunk.
+
+    Raises ValueError if too large or requests.exceptions on HTTP errors.
+    """
+    session = session or get_http_session()
+    workers = workers or getattr(settings, "REMOTE_DOWNLOAD_WORKERS", 4)
+    part_size = part_size or getattr(settings, "REMOTE_DOWNLOAD_PART_SIZE", 8 * 1024 * 1024)
+
+    length, accepts_ranges = probe if probe is not None else probe_remote(url, timeout=timeout, session=session)
+    if length is not None and length > max_bytes:
+        discard_partial_download(dest_path)
+        raise ValueError(f"File too large: {length} bytes (limit {max_bytes})")
+
+    if accepts_ranges and length and workers > 1 and length > part_size:
+        try:
+            return _download_ranges(session, url, dest_path, length, part_size, workers, timeout, resume, progress)
+        except _RangesIgnored:
+            # Accept-Ranges announced but not honoured: a retry would fail the same way
+            discard_partial_download(dest_path)
+            accepts_ranges = resume = False
+    return _download_stream(session, url, dest_path, max_bytes, timeout, resume and accepts_ranges, progress)
@@ -2,13 +2,17 @@ from rest_framework import viewsets, permissions, status, filters, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404
-from django.db.models import Avg
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Min, Value
+from django.db.models.functions import Coalesce
+from django.http import Http404
 from django.utils import timezone
 from rest_framework.permissions import AllowAny
-from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.db.models import Q
 from rest_framework.exceptions import PermissionDenied
@@ -19,6 +23,15 @@ from .models import (
     InterviewSession, VideoResponse, SessionLog, AIAnalysis,
     VideoSettings, DashboardMetrics, Evaluation, CampaignShare
 )
+from .auth import (
+    LoginBusy, RoleRefreshToken, candidate_for, check_login_password, find_login_user, hiring_manager_for,
+    revoke_token, user_role,
+)
+from .db import use_replica
+from .permissions import IsCandidate, IsHiringManager
+from .etags import auth_me_etag, candidate_interviews_etag, conditional_get
+from .projections import Projection, media_url_builder
+from .quotas import StorageQuotaExceeded, check_storage_quota, remaining_quota, storage_usage_summary
 from .serializers import (
     UserSerializer, HiringManagerSerializer, VideoCampaignSerializer,
     QuestionSerializer, CandidateSerializer, InterviewSessionSerializer,
@@ -124,7 +137,7 @@ class RegisterView(generics.CreateAPIView):
             else:
                 if getattr(profile, 'user_type', None) != 'candidate':
                     profile.user_type = 'candidate'
-                    profile.save(update_fields=["user_type"])
+                    profile.save(update_fields=["user_type", "updated_at"])
 
             # Compléter/mettre à jour les infos candidat
             first_name = request.data.get('first_name') or ''
@@ -225,25 +238,23 @@ class UnifiedLoginView(APIView):
         if not identifier or not password:
             return Response({"error": "Identifiant et mot de passe requis"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Trouver l'utilisateur par email OU username
-        user = None
-        # D'abord tenter par email exact
-        user = User.objects.filter(email=identifier).first()
-        if not user:
-            # Sinon tenter par username
-            user = User.objects.filter(username=identifier).first()
+        # Utilisateur par email OU username, avec profil et rôle : une seule requête
+        user = find_login_user(identifier)
         if not user:
             return Response({"error": "Utilisateur non trouvé"}, status=status.HTTP_404_NOT_FOUND)
 
-        # Authentification via username (Django auth attend le username)
-        user = authenticate(username=user.username, password=password)
-        if not user:
-            return Response({"error": "Mot de passe incorrect"}, status=status.HTTP_401_UNAUTHORIZED)
+        # Vérification du mot de passe (nombre de hachages simultanés borné, rehachage transparent)
+        try:
+            if not check_login_password(user, password):
+                return Response({"error": "Mot de passe incorrect"}, status=status.HTTP_401_UNAUTHORIZED)
+        except LoginBusy:
+            return Response({"error": "Trop de connexions simultanées, réessayez dans quelques secondes"},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "5"})
 
         profile = user.profile  # OneToOneField avec related_name='profile'
 
         # Génération des tokens JWT
-        refresh = RefreshToken.for_user(user)
+        refresh = RoleRefreshToken.for_user(user)
         access_token = str(refresh.access_token)
         refresh_token = str(refresh)
 
@@ -276,39 +287,56 @@ class UnifiedLoginView(APIView):
         return Response(data, status=status.HTTP_200_OK)
 
 
+class LogoutView(APIView):
+    """
+    POST /api/auth/logout/  body (optionnel): { refresh }
+    Révoque le token d'accès de la requête et le refresh token fourni (liste de
+    révocation relue en mémoire par chaque processus, interviews/auth.py).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        raw_refresh = request.data.get("refresh") or request.data.get("refresh_token")
+        if raw_refresh:
+            try:
+                refresh = RefreshToken(raw_refresh)
+            except TokenError:
+                return Response({"error": "Refresh token invalide"}, status=status.HTTP_400_BAD_REQUEST)
+            revoke_token(refresh)
+        revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 # -------------------------------
 # VIEWSETS PRINCIPAUX
 # -------------------------------
 
+@conditional_get(auth_me_etag)
 class AuthMeView(APIView):
     """
     GET /api/auth/me/
     Returns a normalized profile for the authenticated user with a stable 'role'.
     Also used for compatibility aliases like /api/users/me/, /api/auth/user/, /api/profile/.
+    Sends an ETag: polling with If-None-Match gets a 304 without rebuilding the profile.
     """
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
+        # profil et rôle chargés avec request.user (ProfileJWTAuthentication) : aucune requête
         user = request.user
-        role = 'admin'
+        role = user_role(user)
         first_name = getattr(user, 'first_name', '')
         last_name = getattr(user, 'last_name', '')
         company = ''
-        if hasattr(user, 'profile'):
-            ut = getattr(user.profile, 'user_type', '')
-            if ut in ['candidate', 'hiring_manager']:
-                role = ut
-            # enrich fields depending on role
-            try:
-                if ut == 'hiring_manager' and hasattr(user.profile, 'hiring_manager'):
-                    company = getattr(user.profile.hiring_manager, 'company', '')
-                if ut == 'candidate' and hasattr(user.profile, 'candidate'):
-                    # candidate name can be on candidate record
-                    cand = user.profile.candidate
-                    first_name = first_name or getattr(cand, 'first_name', '')
-                    last_name = last_name or getattr(cand, 'last_name', '')
-            except Exception:
-                pass
+        # enrich fields depending on role
+        hm = hiring_manager_for(user) if role == 'hiring_manager' else None
+        if hm is not None:
+            company = hm.company
+        cand = candidate_for(user) if role == 'candidate' else None
+        if cand is not None:
+            # candidate name can be on candidate record
+            first_name = first_name or cand.first_name
+            last_name = last_name or cand.last_name
 
         payload = {
             "username": getattr(user, 'username', ''),
@@ -331,11 +359,10 @@ class HiringManagerViewSet(viewsets.ModelViewSet):
         # Fix: HiringManager n'a pas de champ `user`, il est relié via user_profile.user
         return HiringManager.objects.filter(user_profile__user=self.request.user)
     
-    @action(detail=False, methods=["get"], url_path="dashboard")
+    @action(detail=False, methods=["get"], url_path="dashboard", permission_classes=[IsHiringManager])
     def dashboard(self, request):
-        try:
-            manager = request.user.profile.hiring_manager
-        except Exception:
+        manager = hiring_manager_for(request.user)
+        if manager is None:
             return Response({"error": "No hiring manager profile found for user"}, status=status.HTTP_404_NOT_FOUND)
 
         campaigns = VideoCampaign.objects.filter(hiring_manager=manager)
@@ -346,6 +373,7 @@ class HiringManagerViewSet(viewsets.ModelViewSet):
             "completed_interviews": InterviewSession.objects.filter(
                 campaign__in=campaigns, status="completed"
             ).count(),
+            "storage": storage_usage_summary(manager),
         }
         return Response(metrics)
 
@@ -360,7 +388,7 @@ class VideoCampaignViewSet(viewsets.ModelViewSet):
         # Auto-deactivate expired campaigns at query time
         try:
             now = timezone.now()
-            VideoCampaign.objects.filter(end_date__lt=now, is_active=True).update(is_active=False)
+            VideoCampaign.objects.filter(end_date__lt=now, is_active=True).update(is_active=False, updated_at=now)
         except Exception:
             pass
         # Optional filter by activity
@@ -500,7 +528,7 @@ class VideoCampaignViewSet(viewsets.ModelViewSet):
                     else:
                         if getattr(profile, 'user_type', '') != 'candidate':
                             profile.user_type = 'candidate'
-                            profile.save(update_fields=["user_type"])
+                            profile.save(update_fields=["user_type", "updated_at"])
                     candidate = Candidate.objects.create(
                         user_profile=profile,
                         email=email,
@@ -539,6 +567,7 @@ class VideoCampaignViewSet(viewsets.ModelViewSet):
         return Response({"successes": successes, "errors": errors}, status=status_code)
     
     @action(detail=True, methods=["get"], url_path="sessions")
+    @use_replica
     def list_sessions(self, request, pk=None):
         campaign = self.get_object()
 
@@ -553,9 +582,8 @@ class VideoCampaignViewSet(viewsets.ModelViewSet):
         for s in sessions_qs:
             # Auto-cancel strictly per business rule
             if s.status not in ["completed", "cancelled"] and _should_cancel(s, now):
-                s.status = "cancelled"
                 try:
-                    s.save(update_fields=["status"])
+                    _cancel_on_primary(s, now)
                 except Exception:
                     pass
             candidate = s.candidate
@@ -577,7 +605,7 @@ class VideoCampaignViewSet(viewsets.ModelViewSet):
                         "overall_score": ev.overall_score
                     })
                 ai = None
-                if hasattr(r, 'ai_analysis'):
+                if hasattr(r, 'ai_analysis') and r.ai_analysis.analysis_version:
                     ai = {
                         "speech_confidence": r.ai_analysis.speech_confidence,
                         "speech_rate": r.ai_analysis.speech_rate,
@@ -594,6 +622,7 @@ class VideoCampaignViewSet(viewsets.ModelViewSet):
                     "recorded_at": r.recorded_at,
                     "file_size": r.file_size,
                     "format": r.format,
+                    "storage_tier": r.storage_tier,
                     "evaluations": evals,
                     "ai_analysis": ai
                 })
@@ -616,6 +645,87 @@ class VideoCampaignViewSet(viewsets.ModelViewSet):
 
         return Response({"sessions": data})    
 
+    @action(detail=True, methods=["get"], url_path="jobs")
+    def media_jobs(self, request, pk=None):
+        """État des traitements média (MediaJob) de la campagne, par type et par état."""
+        campaign = self.get_object()
+        from .jobs import campaign_job_status
+        return Response({"campaign_id": str(campaign.id), "jobs": campaign_job_status(campaign.id)})
+
+    @action(detail=True, methods=["get"], url_path=r"export/(?P<export_format>csv|ndjson|xlsx)")
+    def export_results(self, request, pk=None, export_format=None):
+        """
+        Export des résultats (une ligne par évaluation) en CSV, NDJSON ou XLSX,
+        envoyé au fil de l'eau : la mémoire ne dépend pas du nombre de lignes.
+        """
+        campaign = self.get_object()
+        from django.http import StreamingHttpResponse
+        from .exports import CONTENT_TYPES, export_campaign_results
+        # lu après le retour de la vue (streaming) : la base est choisie sur le queryset
+        response = StreamingHttpResponse(
+            export_campaign_results(campaign.id, export_format, user=request.user),
+            content_type=CONTENT_TYPES[export_format],
+        )
+        filename = f"campagne-{campaign.id}-resultats.{export_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response["X-Accel-Buffering"] = "no"  # nginx: ne pas mettre la réponse en tampon
+        return response
+
+    @action(detail=True, methods=["get"], url_path="ranking")
+    def ranking(self, request, pk=None):
+        """
+        Classement des candidats de la campagne : moyenne pondérée des critères
+        (?weights=technical_skill:2,communication:1), centile, z-score par évaluateur,
+        accord inter-évaluateurs (ICC). Mis en cache jusqu'à la prochaine évaluation.
+        """
+        campaign = self.get_object()
+        from .ranking import InvalidWeights, campaign_ranking, ranking_weights
+        try:
+            weights = ranking_weights(request.query_params.get("weights"))
+        except InvalidWeights as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"campaign_id": str(campaign.id), **campaign_ranking(campaign.id, weights)})
+
+    @action(detail=True, methods=["post"], url_path="analyze")
+    def analyze(self, request, pk=None):
+        """Lancer l'analyse IA des réponses de la campagne non analysées (ou d'une ancienne version)."""
+        campaign = self.get_object()
+        from .analysis import analyzer_paths, outdated_responses
+        from .jobs import enqueue_job
+        from .tasks import analyze_responses
+        if not analyzer_paths():
+            return Response({"error": "ai_analysis_disabled"}, status=status.HTTP_409_CONFLICT)
+        pending = outdated_responses(campaign=campaign).count()
+        if not pending:
+            return Response({"pending": 0})
+        job = enqueue_job(analyze_responses, "analysis", campaign, campaign_id=str(campaign.id))
+        return Response({"pending": pending, "job_id": job.pk}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get", "post"], url_path="restore-media")
+    def restore_media(self, request, pk=None):
+        """
+        POST: demander la restauration des vidéos archivées de la campagne.
+        GET: état des restaurations (par statut) et répartition des réponses par niveau de stockage.
+        """
+        campaign = self.get_object()
+        from .archive import request_campaign_restore
+        created = 0
+        if request.method == "POST":
+            created = request_campaign_restore(campaign, user=request.user)
+
+        jobs = dict(
+            campaign.restore_jobs.values("status").annotate(n=Count("id")).values_list("status", "n")
+        )
+        tiers = dict(
+            VideoResponse.objects.filter(session__campaign=campaign)
+            .values("storage_tier").annotate(n=Count("id")).values_list("storage_tier", "n")
+        )
+        expires_at = campaign.restore_jobs.filter(status="completed").aggregate(Min("expires_at"))["expires_at__min"]
+        return Response(
+            {"created": created, "jobs": jobs, "tiers": tiers, "restored_until": expires_at},
+            status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK,
+        )
+
 
     
 class InterviewSessionViewSet(viewsets.ModelViewSet):
@@ -628,10 +738,10 @@ class InterviewSessionViewSet(viewsets.ModelViewSet):
         user = self.request.user
         queryset = InterviewSession.objects.all()
         
-        if hasattr(user, 'profile') and hasattr(user.profile, 'hiring_manager'):
-            queryset = queryset.filter(campaign__hiring_manager=user.profile.hiring_manager)
-        else:
+        hiring_manager = hiring_manager_for(user)
+        if hiring_manager is None:
             return InterviewSession.objects.none()
+        queryset = queryset.filter(campaign__hiring_manager=hiring_manager)
             
         # Optimisation du chargement des relations
         queryset = queryset.select_related('candidate', 'campaign')
@@ -655,7 +765,7 @@ class InterviewSessionViewSet(viewsets.ModelViewSet):
             for s in queryset:
                 if s.status not in ["completed", "cancelled"] and _should_cancel(s, now):
                     s.status = "cancelled"
-                    s.save(update_fields=["status"])
+                    s.save(update_fields=["status", "updated_at"])
         except Exception:
             pass
 
@@ -711,12 +821,10 @@ class EvaluationViewSet(viewsets.ModelViewSet):
         
         try:
             # Vérifier que l'utilisateur est un recruteur
-            try:
-                hiring_manager = request.user.profile.hiring_manager
-                logger.info(f"Hiring manager trouvé: {hiring_manager}")
-            except AttributeError as e:
+            hiring_manager = hiring_manager_for(request.user)
+            if hiring_manager is None:
                 error_msg = "L'utilisateur n'est pas un recruteur"
-                logger.error(f"{error_msg}: {e}")
+                logger.error(error_msg)
                 return Response(
                     {"detail": error_msg},
                     status=status.HTTP_403_FORBIDDEN
@@ -742,7 +850,7 @@ class EvaluationViewSet(viewsets.ModelViewSet):
                 )
             
             # Vérifier que le recruteur a accès à cette réponse vidéo
-            if video_response.session.campaign.hiring_manager != hiring_manager:
+            if video_response.session.campaign.hiring_manager_id != hiring_manager.pk:
                 error_msg = "Vous n'avez pas la permission d'évaluer cette réponse."
                 logger.warning(f"Accès refusé - {error_msg}")
                 return Response(
@@ -862,13 +970,13 @@ class CampaignShareViewSet(viewsets.ModelViewSet):
 # -------------------------------
 
 class RecruiterDashboardView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [IsHiringManager]
 
+    @use_replica
     def get(self, request):
         # Récupérer le HiringManager via le profil lié à l'utilisateur
-        try:
-            manager = request.user.profile.hiring_manager
-        except Exception:
+        manager = hiring_manager_for(request.user)
+        if manager is None:
             return Response({"error": "No hiring manager profile found for user"}, status=status.HTTP_404_NOT_FOUND)
 
         campaigns = VideoCampaign.objects.filter(hiring_manager=manager)
@@ -880,23 +988,41 @@ class RecruiterDashboardView(APIView):
             "completed_interviews": InterviewSession.objects.filter(
                 campaign__in=campaigns, status="completed"
             ).count(),
+            "storage": storage_usage_summary(manager),
         }
         return Response(metrics)
 
 
 class CampaignAnalyticsView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [IsHiringManager]
 
+    @use_replica
     def get(self, request, campaign_id):
-        campaign = get_object_or_404(VideoCampaign, id=campaign_id)
-        sessions = InterviewSession.objects.filter(campaign=campaign)
+        """
+        Entonnoir, notes et série quotidienne lus dans les agrégats CampaignDailyStats
+        (interviews/rollups.py), filtrables par ?from=AAAA-MM-JJ&to=AAAA-MM-JJ.
+        """
+        from django.utils.dateparse import parse_date
+        from .rollups import campaign_time_series, rollup_watermark
+
+        # Uniquement les campagnes du recruteur connecté
+        campaign = get_object_or_404(VideoCampaign, id=campaign_id, hiring_manager=hiring_manager_for(request.user))
+        bounds = {}
+        for param in ("from", "to"):
+            raw = request.query_params.get(param)
+            try:
+                bounds[param] = parse_date(raw) if raw else None
+            except ValueError:
+                bounds[param] = None
+            if raw and bounds[param] is None:
+                return Response({"error": f"'{param}' must be a YYYY-MM-DD date"}, status=status.HTTP_400_BAD_REQUEST)
 
+        data = campaign_time_series(campaign, bounds["from"], bounds["to"])
         stats = {
-            "total_candidates": sessions.count(),
-            "completed": sessions.filter(status="completed").count(),
-            "average_score": Evaluation.objects.filter(
-                video_response__session__campaign=campaign
-            ).aggregate(Avg("overall_score"))["overall_score__avg"]
+            "total_candidates": data["funnel"]["invited"],
+            "completed": data["funnel"]["completed"],
+            **data,
+            "computed_until": rollup_watermark(),
         }
         return Response(stats)
 
@@ -904,42 +1030,84 @@ class CampaignAnalyticsView(APIView):
 # -------------------------------
 # CANDIDATE SELF-SERVICE ENDPOINTS
 # -------------------------------
+# Projections values() : une requête par liste, sans instances de modèles
+CANDIDATE_INTERVIEW = Projection(
+    id="id",
+    campaign_id="campaign_id",
+    campaign_title="campaign__title",
+    status="status",
+    invited_at="invited_at",
+    started_at="started_at",
+    completed_at="completed_at",
+    questions_count=Count("campaign__questions"),
+)
+CANDIDATE_INTERVIEW_DETAIL = Projection(
+    id="id",
+    status="status",
+    invited_at="invited_at",
+    started_at="started_at",
+    completed_at="completed_at",
+    campaign={
+        "id": "campaign_id",
+        "title": "campaign__title",
+        "description": "campaign__description",
+        "start_date": "campaign__start_date",
+        "end_date": "campaign__end_date",
+    },
+)
+CANDIDATE_QUESTION = Projection(
+    id="id",
+    order="order",
+    text="text",
+    preparation_time="preparation_time",
+    response_time_limit="response_time_limit",
+)
+CANDIDATE_RESPONSE = Projection(
+    id="id",
+    question_id="question_id",
+    question_order="question__order",
+    video_url="video_url",
+    video_file="video_file",
+    duration="duration",
+    recorded_at="recorded_at",
+)
+CANDIDATE_EVALUATION = Projection(
+    id="id",
+    response_id="video_response_id",
+    technical_skill="technical_skill",
+    communication="communication",
+    motivation="motivation",
+    cultural_fit="cultural_fit",
+    notes="notes",
+    evaluated_at="evaluated_at",
+)
+
+
+def _candidate_id(user):
+    """Id of the user's Candidate record (None if the user is not a candidate), loaded with request.user."""
+    candidate = candidate_for(user)
+    return candidate.pk if candidate is not None else None
+
+
+@conditional_get(candidate_interviews_etag)
 class CandidateInterviewsView(APIView):
     """
     GET /api/candidate/interviews/
     Returns the list of interview sessions for the authenticated candidate only.
+    Sends an ETag: polling with If-None-Match gets a 304 while no session changed.
     """
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [IsCandidate]
 
     def get(self, request):
-        user = request.user
         # Ensure user is a candidate
-        try:
-            candidate = user.profile.candidate
-        except Exception:
+        candidate_id = _candidate_id(request.user)
+        if candidate_id is None:
             return Response({"detail": "Accès réservé aux candidats."}, status=status.HTTP_403_FORBIDDEN)
 
-        qs = (
-            InterviewSession.objects
-            .filter(candidate=candidate)
-            .select_related('campaign')
-            .order_by('-invited_at')
+        items = CANDIDATE_INTERVIEW.all(
+            InterviewSession.objects.filter(candidate_id=candidate_id).order_by('-invited_at')
         )
 
-        items = []
-        for s in qs:
-            campaign = s.campaign
-            items.append({
-                "id": str(s.id),
-                "campaign_id": str(campaign.id),
-                "campaign_title": campaign.title,
-                "status": s.status,
-                "invited_at": s.invited_at,
-                "started_at": s.started_at,
-                "completed_at": s.completed_at,
-                "questions_count": getattr(campaign, 'questions', []).count() if hasattr(campaign, 'questions') else 0,
-            })
-
         return Response({"interviews": items})
 
 
@@ -948,92 +1116,48 @@ class CandidateInterviewDetailView(APIView):
     GET /api/candidate/interviews/{session_id}/
     Returns full details of a candidate interview including questions, responses videos and evaluations.
     """
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [IsCandidate]
 
     def get(self, request, session_id):
-        user = request.user
         # Ensure user is a candidate
-        try:
-            candidate = user.profile.candidate
-        except Exception:
+        candidate_id = _candidate_id(request.user)
+        if candidate_id is None:
             return Response({"detail": "Accès réservé aux candidats."}, status=status.HTTP_403_FORBIDDEN)
 
-        session = get_object_or_404(
-            InterviewSession.objects.select_related('campaign').prefetch_related(
-                'responses__question', 'responses__evaluations'
-            ),
-            id=session_id,
-            candidate=candidate,
+        payload = CANDIDATE_INTERVIEW_DETAIL.first(
+            InterviewSession.objects.filter(id=session_id, candidate_id=candidate_id)
         )
+        if payload is None:
+            raise Http404("No InterviewSession matches the given query.")
+
+        evaluations = {}
+        for ev in CANDIDATE_EVALUATION.all(Evaluation.objects.filter(video_response__session_id=session_id)):
+            response_id = str(ev.pop("response_id"))
+            overall_score = Evaluation.combine_scores(
+                ev["technical_skill"], ev["communication"], ev["motivation"], ev["cultural_fit"]
+            )
+            # same key order as the serialized Evaluation: id, overall_score, scores...
+            evaluations.setdefault(response_id, []).append(
+                {"id": ev.pop("id"), "overall_score": overall_score, **ev}
+            )
 
-        campaign = session.campaign
-        # Build questions list
-        questions = []
-        try:
-            for q in campaign.questions.all().order_by('order'):
-                questions.append({
-                    "id": q.id,
-                    "order": q.order,
-                    "text": q.text,
-                    "preparation_time": q.preparation_time,
-                    "response_time_limit": q.response_time_limit,
-                })
-        except Exception:
-            pass
-
-        # Map responses by question
-        responses = []
-        for r in session.responses.all():
-            evals = []
-            for ev in r.evaluations.all():
-                evals.append({
-                    "id": ev.id,
-                    "overall_score": ev.overall_score,
-                    "technical_skill": ev.technical_skill,
-                    "communication": ev.communication,
-                    "motivation": ev.motivation,
-                    "cultural_fit": ev.cultural_fit,
-                    "notes": ev.notes,
-                    "evaluated_at": ev.evaluated_at,
-                })
-
-            # prefer absolute media URL when available via serializer logic
-            video_url = None
+        # prefer absolute media URL when available
+        media_url = media_url_builder(request)
+        responses = CANDIDATE_RESPONSE.all(VideoResponse.objects.filter(session_id=session_id).order_by('id'))
+        for r in responses:
+            r["id"] = str(r["id"])
+            name = r.pop("video_file")
             try:
-                if r.video_file:
-                    video_url = request.build_absolute_uri(r.video_file.url)
-                else:
-                    video_url = r.video_url
+                if name:
+                    r["video_url"] = media_url(name)
             except Exception:
-                video_url = r.video_url
-
-            responses.append({
-                "id": str(r.id),
-                "question_id": r.question.id,
-                "question_order": r.question.order,
-                "video_url": video_url,
-                "duration": r.duration,
-                "recorded_at": r.recorded_at,
-                "evaluations": evals,
-            })
-
-        payload = {
-            "id": str(session.id),
-            "status": session.status,
-            "invited_at": session.invited_at,
-            "started_at": session.started_at,
-            "completed_at": session.completed_at,
-            "campaign": {
-                "id": str(campaign.id),
-                "title": campaign.title,
-                "description": campaign.description,
-                "start_date": campaign.start_date,
-                "end_date": campaign.end_date,
-            },
-            "questions": questions,
-            "responses": responses,
-        }
+                pass
+            r["evaluations"] = evaluations.get(r["id"], [])
 
+        payload["questions"] = CANDIDATE_QUESTION.all(
+            Question.objects.filter(campaign_id=payload["campaign"]["id"]).order_by('order')
+        )
+        payload["responses"] = responses
         return Response(payload)
 from rest_framework import serializers, status
 from rest_framework.views import APIView
@@ -1049,26 +1173,29 @@ from datetime import timedelta
 
 logger = logging.getLogger(__name__)
 
+def _link_expired(is_used, expires_at, campaign_end_date, campaign_is_active, now):
+    """Link validity from the raw column values (also usable on values() rows)."""
+    # Link is considered invalid once the session has been used to start the interview
+    if is_used:
+        return True
+    if expires_at and expires_at < now:
+        return True
+    if campaign_end_date and campaign_end_date < now:
+        return True
+    # if campaign explicitly inactive
+    return campaign_is_active is False
+
+
 def _is_link_invalid(session, now):
     """Return True if the candidate link is no longer valid."""
-    try:
-        # Link is considered invalid once the session has been used to start the interview
-        if getattr(session, 'is_used', False):
-            return True
-        if session.expires_at and session.expires_at < now:
-            return True
-    except Exception:
-        pass
-    try:
-        campaign = session.campaign
-        if campaign.end_date and campaign.end_date < now:
-            return True
-        # if campaign explicitly inactive
-        if hasattr(campaign, 'is_active') and campaign.is_active is False:
-            return True
-    except Exception:
-        pass
-    return False
+    campaign = getattr(session, 'campaign', None)
+    return _link_expired(
+        getattr(session, 'is_used', False),
+        getattr(session, 'expires_at', None),
+        getattr(campaign, 'end_date', None),
+        getattr(campaign, 'is_active', None),
+        now,
+    )
 
 def _is_incomplete(session):
     """Return True if the session has NOT submitted all required responses.
@@ -1101,6 +1228,19 @@ def _should_cancel(session, now):
     except Exception:
         return False
 
+def _cancel_on_primary(session, now):
+    """
+    Auto-cancel decided on rows read from the replica (possibly stale): the
+    UPDATE re-checks the status on the primary, so a session the candidate
+    completed meanwhile is left alone; the instance is then re-read from the
+    primary. cancelled_at keeps its first value (see InterviewSession.save).
+    """
+    InterviewSession.objects.filter(
+        pk=session.pk, status__in=["started", "in_progress"]
+    ).update(status="cancelled", updated_at=now, cancelled_at=Coalesce("cancelled_at", Value(now)))
+    session.refresh_from_db(using=DEFAULT_DB_ALIAS, fields=["status", "updated_at", "cancelled_at"])
+
+
 class StartInterviewView(APIView):
     """
     Marque la session comme démarrée et invalide le lien
@@ -1159,6 +1299,26 @@ class StartInterviewView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+CANDIDATE_LINK = Projection(
+    id="id",
+    status="status",
+    is_used="is_used",
+    expires_at="expires_at",
+    campaign_id="campaign_id",
+    campaign_title="campaign__title",
+    campaign_description="campaign__description",
+    campaign_end_date="campaign__end_date",
+    campaign_is_active="campaign__is_active",
+)
+LINK_QUESTION = Projection(
+    id="id",
+    text="text",
+    order="order",
+    preparation_time="preparation_time",
+    response_time_limit="response_time_limit",
+)
+
+
 class CandidateSessionAccessView(APIView):
     """
     Gère l'accès des candidats à leur session via un lien unique.
@@ -1167,9 +1327,8 @@ class CandidateSessionAccessView(APIView):
     permission_classes = []  # Pas besoin d'auth pour le candidat via lien
 
     def get(self, request, access_token):
-        try:
-            session = InterviewSession.objects.get(access_token=access_token)
-        except InterviewSession.DoesNotExist:
+        session = CANDIDATE_LINK.first(InterviewSession.objects.filter(access_token=access_token))
+        if session is None:
             return Response(
                 {"error": "Session introuvable", "code": "session_not_found"},
                 status=status.HTTP_404_NOT_FOUND
@@ -1178,21 +1337,24 @@ class CandidateSessionAccessView(APIView):
         now = timezone.now()
 
         # Vérification de la validité (expiration session/campagne ou campagne inactive)
-        if _is_link_invalid(session, now):
-            session.is_used = True
+        if _link_expired(session["is_used"], session["expires_at"], session["campaign_end_date"],
+                         session["campaign_is_active"], now):
+            # Cas rare : l'instance n'est chargée que pour appliquer la règle métier et sauvegarder
+            instance = InterviewSession.objects.select_related('campaign').get(id=session["id"])
+            instance.is_used = True
             # Cancel if incomplete per business rule
-            if _is_incomplete(session):
-                session.status = "cancelled"
+            if _is_incomplete(instance):
+                instance.status = "cancelled"
             else:
-                session.status = "expired"
-            session.save()
+                instance.status = "expired"
+            instance.save()
             return Response(
                 {"error": "Ce lien a expiré", "code": "link_expired"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         # Vérifier si la session a déjà été démarrée
-        if session.is_used or session.status != "invited":
+        if session["is_used"] or session["status"] != "invited":
             return Response(
                 {"error": "La session a déjà été démarrée. Veuillez utiliser le même onglet/navigateur.",
                  "code": "session_already_started"},
@@ -1200,29 +1362,23 @@ class CandidateSessionAccessView(APIView):
             )
 
         # Préparer les questions
-        questions = session.campaign.questions.all().order_by('order')
-        questions_data = [
-            {
-                "id": str(q.id),
-                "text": q.text,
-                "order": q.order,
-                "preparation_time": q.preparation_time,
-                "response_time_limit": q.response_time_limit,
-            }
-            for q in questions
-        ]
+        questions_data = LINK_QUESTION.all(
+            Question.objects.filter(campaign_id=session["campaign_id"]).order_by('order')
+        )
+        for q in questions_data:
+            q["id"] = str(q["id"])
 
         response_data = {
             "success": True,
-            "session_id": str(session.id),
+            "session_id": str(session["id"]),
             "campaign": {
-                "id": str(session.campaign.id),
-                "title": session.campaign.title,
-                "description": session.campaign.description or "",
+                "id": str(session["campaign_id"]),
+                "title": session["campaign_title"],
+                "description": session["campaign_description"] or "",
             },
             "questions": questions_data,
-            "status": session.status,
-            "is_used": session.is_used
+            "status": session["status"],
+            "is_used": session["is_used"]
         }
 
         return Response(response_data, status=status.HTTP_200_OK)
@@ -1323,6 +1479,19 @@ class SubmitInterviewResponsesView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            # Quota de stockage du recruteur (lecture O(1) du compteur)
+            try:
+                check_storage_quota(
+                    session.campaign.hiring_manager_id,
+                    sum(getattr(f, 'size', 0) or 0 for f in request.FILES.values())
+                )
+            except StorageQuotaExceeded as e:
+                return Response(
+                    {"error": "Quota de stockage atteint", "code": "storage_quota_exceeded",
+                     "used": e.used, "quota": e.quota},
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                )
+
             # Traiter chaque réponse
             for response_data in responses:
                 try:
@@ -1432,22 +1601,21 @@ class QuestionViewSet(viewsets.ModelViewSet):
 class CandidateViewSet(viewsets.ModelViewSet):
     queryset = Candidate.objects.all()
     serializer_class = CandidateSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [IsHiringManager]
 
     def get_queryset(self):
         user = self.request.user
         # If user is a hiring manager, restrict to candidates tied to their campaigns' sessions
-        try:
-            hm = user.profile.hiring_manager
-            return (
-                Candidate.objects
-                .filter(interviews__campaign__hiring_manager=hm)
-                .distinct()
-                .order_by('-id')
-            )
-        except Exception:
+        hm = hiring_manager_for(user)
+        if hm is None:
             # Otherwise return none to avoid leaking data
             return Candidate.objects.none()
+        return (
+            Candidate.objects
+            .filter(interviews__campaign__hiring_manager=hm)
+            .distinct()
+            .order_by('-id')
+        )
 
     def perform_create(self, serializer):
         # Si tu veux éviter les doublons email
@@ -1480,8 +1648,10 @@ class SessionLogViewSet(viewsets.ModelViewSet):
         serializer.save(session=session)
 
 import os
-import boto3
 from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from .s3 import presigned_upload_post
+from .utils import check_remote_video, validate_public_url
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -1499,39 +1669,55 @@ class PresignUploadView(APIView):
         filename = body.get("filename")
         campaign_id = body.get("campaign_id")
         session_id = body.get("session_id")
-        max_mb = int(body.get("max_mb", 200))
+        try:
+            max_mb = int(body.get("max_mb", 200))
+        except (TypeError, ValueError):
+            return Response({"detail": "invalid max_mb"}, status=status.HTTP_400_BAD_REQUEST)
 
         if not filename or not campaign_id or not session_id:
             return Response({"detail": "campaign_id, session_id and filename required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        bucket = settings.AWS_STORAGE_BUCKET_NAME
-        region = getattr(settings, "AWS_REGION", None)
-
         key = f"responses/{campaign_id}/{session_id}/{filename}"
 
-        s3 = boto3.client(
-            "s3",
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=region
-        )
-
         max_bytes = max_mb * 1024 * 1024
-        conditions = [
-            {"acl": "private"},
-            ["content-length-range", 1, max_bytes]
-        ]
-        fields = {"acl": "private", "Content-Type": "video/mp4"}
+        # the upload size range cannot exceed what is left of the recruiter's storage quota
+        try:
+            hiring_manager_id = VideoCampaign.objects.filter(id=campaign_id).values_list("hiring_manager_id", flat=True).first()
+        except DjangoValidationError:
+            return Response({"detail": "invalid campaign_id"}, status=status.HTTP_400_BAD_REQUEST)
+        remaining = remaining_quota(hiring_manager_id) if hiring_manager_id else None
+        if remaining is not None:
+            if remaining <= 0:
+                return Response({"detail": "storage_quota_exceeded"}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            max_bytes = min(max_bytes, remaining)
 
         try:
-            presigned = s3.generate_presigned_post(
-                Bucket=bucket,
-                Key=key,
-                Fields=fields,
-                Conditions=conditions,
-                ExpiresIn=3600
-            )
+            presigned = presigned_upload_post(key, max_bytes)
         except Exception as e:
             return Response({"detail": "presign_failed", "error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         return Response({"presign": presigned, "key": key})
+
+
+class RemoteVideoCheckView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """
+        Body JSON: { "video_url": "https://...", "max_mb": 200 }
+        Returns: size / range support announced by the remote server (HEAD) and
+        whether fetch_and_store_video would accept the file. valid=false with a
+        reason (non_public_address, too_many_redirects, invalid_redirect,
+        unreachable, http_<status>) when the probe fails or is refused.
+        """
+        video_url = request.data.get("video_url") or ""
+        try:
+            # public hosts only: the server must not probe its own network
+            validate_public_url(video_url)
+        except DjangoValidationError:
+            return Response({"detail": "invalid video_url"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            max_bytes = int(request.data.get("max_mb", 200)) * 1024 * 1024
+        except (TypeError, ValueError):
+            return Response({"detail": "invalid max_mb"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(check_remote_video(video_url, max_bytes))
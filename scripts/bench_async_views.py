@@ -0,0 +1,178 @@
+"""
+Load test of the I/O-bound upload endpoints in both server profiles, with the
+same number of worker processes:
+
+    wsgi  gunicorn gthread workers, sync DRF views (ASYNC_VIEWS=false)
+    asgi  uvicorn workers, interviews/async_views.py (ASYNC_VIEWS=true)
+
+uploads/check-url/ is pointed at a local server that answers HEAD after --delay
+seconds (a slow remote host); uploads/presign/ measures the async ORM + signing
+path. Reports throughput, latencies and the requests in flight per worker
+(Little's law: throughput x mean latency / workers).
+
+    python scripts/bench_async_views.py --workers 1 --concurrency 200 --requests 2000 --delay 0.2
+    python scripts/bench_async_views.py --endpoint presign --profiles asgi
+
+Uses the configured database (a "bench-async" user is created if needed).
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django
+django.setup()
+
+import httpx
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.tokens import AccessToken
+
+from interviews.models import HiringManager, UserProfile, VideoCampaign
+
+
+def slow_upstream(delay):
+    """Threaded HTTP server answering HEAD with a video-like response after `delay` seconds."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_HEAD(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Length", str(50 * 1024 * 1024))
+            self.send_header("Accept-Ranges", "bytes")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024  # default 5: connection bursts would be refused and retried
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_user():
+    user, _ = User.objects.get_or_create(username="bench-async", defaults={"email": "bench-async@example.com"})
+    profile, _ = UserProfile.objects.get_or_create(user=user, defaults={"user_type": "hiring_manager"})
+    manager, _ = HiringManager.objects.get_or_create(
+        user_profile=profile, defaults={"company": "Bench", "department": "RH", "phone": "0"}
+    )
+    campaign = VideoCampaign.objects.filter(hiring_manager=manager).first()
+    if campaign is None:
+        from django.utils import timezone
+        from datetime import timedelta
+        campaign = VideoCampaign.objects.create(
+            title="Bench async", hiring_manager=manager,
+            start_date=timezone.now(), end_date=timezone.now() + timedelta(days=365),
+        )
+    return user, campaign
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(profile, port, workers, threads):
+    env = {**os.environ, "ASYNC_VIEWS": "true" if profile == "asgi" else "false",
+           "ALLOWED_HOSTS": "127.0.0.1,localhost", "PYTHONPATH": os.pathsep.join([ROOT, os.environ.get("PYTHONPATH", "")])}
+    if profile == "asgi":
+        cmd = [sys.executable, "-m", "uvicorn", "backend.asgi:application", "--host", "127.0.0.1",
+               "--port", str(port), "--workers", str(workers), "--no-access-log", "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-m", "gunicorn", "backend.wsgi:application", "--bind", f"127.0.0.1:{port}",
+               "--workers", str(workers), "--worker-class", "gthread", "--threads", str(threads),
+               "--log-level", "warning"]
+    process = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{profile} server did not start")
+
+
+async def load(url, payload, token, concurrency, requests):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async with httpx.AsyncClient(limits=limits, timeout=120,
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(url, json=payload)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    return elapsed, sorted(latencies), errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoint", choices=["check-url", "presign"], default="check-url")
+    parser.add_argument("--profiles", default="wsgi,asgi")
+    parser.add_argument("--workers", type=int, default=1, help="Server processes in both profiles")
+    parser.add_argument("--threads", type=int, default=4, help="gthread threads per wsgi worker (Dockerfile: 4)")
+    parser.add_argument("--concurrency", type=int, default=200, help="Requests kept in flight by the client")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--delay", type=float, default=0.2, help="Latency of the remote HEAD (check-url)")
+    args = parser.parse_args()
+
+    user, campaign = bench_user()
+    token = str(AccessToken.for_user(user))
+    upstream = slow_upstream(args.delay)
+    if args.endpoint == "check-url":
+        payload = {"video_url": f"http://127.0.0.1:{upstream.server_port}/video.mp4"}
+    else:
+        payload = {"campaign_id": str(campaign.id), "session_id": "bench", "filename": "bench.mp4"}
+
+    print(f"{args.endpoint}: {args.requests} requests, {args.concurrency} in flight, "
+          f"{args.workers} worker(s)" + (f", upstream delay {args.delay * 1000:.0f} ms" if args.endpoint == "check-url" else ""))
+    for profile in args.profiles.split(","):
+        port = free_port()
+        process = start_server(profile, port, args.workers, args.threads)
+        try:
+            url = f"http://127.0.0.1:{port}/api/uploads/{args.endpoint}/"
+            asyncio.run(load(url, payload, token, min(args.concurrency, 20), 50))  # warm-up
+            elapsed, latencies, errors = asyncio.run(load(url, payload, token, args.concurrency, args.requests))
+        finally:
+            process.terminate()
+            process.wait()
+        rps = args.requests / elapsed
+        mean = statistics.mean(latencies)
+        print(f"  {profile}: {rps:8.1f} req/s  p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.1f} ms  "
+              f"in flight per worker {rps * mean / args.workers:6.1f}  errors {errors}")
+    upstream.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Throughput of the audio feature extraction (interviews/audio.py) in audio-seconds
+per CPU-second, on a synthetic speech-like track (syllable bursts separated by
+pauses) streamed in fixed-size blocks, or on a real file decoded by ffmpeg.
+
+    python scripts/bench_audio_features.py --seconds 600 --repeat 5
+    python scripts/bench_audio_features.py --file answer.webm
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django
+django.setup()
+
+import numpy as np
+
+from interviews.audio import SAMPLE_RATE, decoded_pcm, extract_features
+
+
+def synthetic_speech(seconds, syllables_per_second=4.0, seed=0):
+    """int16 PCM: 150 ms tone bursts at the given rate, one 600 ms pause every 2 s, background noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    phase = (t * syllables_per_second) % 1.0
+    envelope = np.where(phase < 0.6, np.sin(np.pi * np.clip(phase / 0.6, 0, 1)) ** 2, 0.0)
+    envelope[(t % 2.0) > 1.4] = 0.0
+    voice = envelope * np.sin(2 * np.pi * 180 * t) * 0.3
+    noise = rng.normal(0, 0.003, len(t))
+    return ((voice + noise) * 32767).astype(np.int16).tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=600, help="Synthetic track length")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--file", default=None, help="Decode this media file with ffmpeg instead")
+    args = parser.parse_args()
+
+    pcm = None if args.file else synthetic_speech(args.seconds)
+    cpu_times, peaks = [], []
+    features = None
+    for _ in range(args.repeat):
+        tracemalloc.start()
+        start = time.process_time()
+        if args.file:
+            with decoded_pcm(args.file) as stream:
+                features = extract_features(stream)
+        else:
+            features = extract_features(io.BytesIO(pcm))
+        result = features.result()
+        cpu_times.append(time.process_time() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    audio_seconds = features.samples / SAMPLE_RATE
+    best = min(cpu_times)
+    print(f"audio: {audio_seconds:.0f} s, runs: {args.repeat}")
+    print(f"CPU time: best {best * 1000:.1f} ms, median {statistics.median(cpu_times) * 1000:.1f} ms")
+    print(f"throughput: {audio_seconds / best:.0f} audio-seconds per CPU-second")
+    print(f"peak traced memory (excluding the input): {max(peaks) / 1024:.0f} KiB")
+    if args.file:
+        print("(CPU time of this process only: ffmpeg decoding runs in a child process)")
+    for name, value in sorted(result.items()):
+        print(f"  {name}: {value:.3f}" if isinstance(value, float) else f"  {name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
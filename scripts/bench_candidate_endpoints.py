@@ -0,0 +1,144 @@
+"""
+Requests per second and queries per request of the candidate endpoints
+(session-access link, interview list, interview detail), measured in-process
+with the DRF test client on a throwaway test database filled with a synthetic
+candidate: --interviews sessions, --questions questions each, every question
+answered and evaluated twice.
+
+    python scripts/bench_candidate_endpoints.py --interviews 20 --questions 8 --requests 500
+    python scripts/bench_candidate_endpoints.py --json >> bench_history.ndjson
+
+The test database is created with the configured DATABASES engine (PostgreSQL
+needs the CREATEDB privilege) and destroyed at the end.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from interviews.models import (
+    Candidate, Evaluation, HiringManager, InterviewSession, Question, UserProfile, VideoCampaign, VideoResponse,
+)
+
+
+def make_candidate(interviews, questions):
+    manager_user = User.objects.create_user("bench-hm", "bench-hm@example.com", "bench")
+    manager = HiringManager.objects.create(
+        user_profile=UserProfile.objects.create(user=manager_user, user_type="hiring_manager"),
+        company="Bench", department="RH", phone="0",
+    )
+    user = User.objects.create_user("bench-candidate", "bench-candidate@example.com", "bench")
+    candidate = Candidate.objects.create(
+        user_profile=UserProfile.objects.create(user=user, user_type="candidate"),
+        email=user.email, first_name="Bench", last_name="Candidate",
+    )
+    now = timezone.now()
+    sessions = []
+    for i in range(interviews):
+        campaign = VideoCampaign.objects.create(
+            title=f"Campagne {i}", description="Entretien vidéo différé", hiring_manager=manager,
+            start_date=now, end_date=now + timedelta(days=30),
+        )
+        Question.objects.bulk_create(
+            Question(campaign=campaign, text=f"Question {q}", order=q) for q in range(questions)
+        )
+        sessions.append(InterviewSession.objects.create(
+            campaign=campaign, candidate=candidate, expires_at=campaign.end_date,
+            status="completed", started_at=now, completed_at=now,
+        ))
+    detail = sessions[0]
+    responses = VideoResponse.objects.bulk_create(
+        VideoResponse(session=detail, question=q, video_file=f"bench/{q.pk}.webm", duration=60, format="webm")
+        for q in Question.objects.filter(campaign=detail.campaign)
+    )
+    Evaluation.objects.bulk_create(
+        Evaluation(video_response=r, hiring_manager=manager, technical_skill=4, communication=3,
+                   motivation=5, cultural_fit=4, notes="RAS")
+        for r in responses for _ in range(2)
+    )
+    # the session-access link only answers 200 for a fresh invitation
+    link = InterviewSession.objects.create(
+        campaign=detail.campaign, candidate=candidate, expires_at=now + timedelta(days=30),
+    )
+    return user, detail, link
+
+
+def measure(client, url, requests, warmup=20):
+    for _ in range(warmup):
+        response = client.get(url)
+        assert response.status_code == 200, (url, response.status_code, response.content[:200])
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        client.get(url)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        t = time.perf_counter()
+        client.get(url)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "queries": len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--interviews", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="One JSON line per run (for tracking over time)")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        user, detail, link = make_candidate(args.interviews, args.questions)
+        candidate_client = APIClient()
+        candidate_client.force_authenticate(user)
+        endpoints = {
+            "session_access": (APIClient(), f"/api/session-access/{link.access_token}/"),
+            "candidate_interviews": (candidate_client, "/api/candidate/interviews/"),
+            "candidate_interview_detail": (candidate_client, f"/api/candidate/interviews/{detail.id}/"),
+        }
+        results = {name: measure(client, url, args.requests) for name, (client, url) in endpoints.items()}
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    if args.json:
+        print(json.dumps({"at": timezone.now().isoformat(), "vendor": connection.vendor,
+                          "interviews": args.interviews, "questions": args.questions, **results}))
+        return
+    print(f"{connection.vendor}, {args.interviews} interviews x {args.questions} questions, {args.requests} requests")
+    for name, r in results.items():
+        print(f"  {name:28} {r['rps']:8.0f} req/s  p50 {r['p50_ms']:6.2f} ms  "
+              f"p99 {r['p99_ms']:6.2f} ms  {r['queries']} queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Request latency with and without database connection reuse: the same gunicorn
+server (gthread) is started once per configuration and GET /api/auth/me/ (JWT
+user lookup + profile query) is measured with --concurrency clients.
+
+    new        DB_CONN_MAX_AGE=0      one connection opened per request
+    persistent DB_CONN_MAX_AGE=600    connection kept per thread, health-checked
+    pool       DB_POOL=true           psycopg 3 pool per process (psycopg[pool])
+
+    python scripts/bench_db_connections.py --requests 2000 --concurrency 8
+    python scripts/bench_db_connections.py --configs new,pool --workers 2
+
+Uses the configured DATABASE_URL (a "bench-db" user is created if needed).
+Connection setup is cheap on a local socket: run it against the real database
+host to see the cost of the TCP / TLS / auth handshake.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django
+django.setup()
+
+import httpx
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.tokens import AccessToken
+
+from interviews.models import UserProfile
+
+CONFIGS = {
+    "new": {"DB_CONN_MAX_AGE": "0", "DB_POOL": "false"},
+    "persistent": {"DB_CONN_MAX_AGE": "600", "DB_POOL": "false"},
+    "pool": {"DB_POOL": "true"},
+}
+
+
+def bench_user():
+    user, _ = User.objects.get_or_create(username="bench-db", defaults={"email": "bench-db@example.com"})
+    UserProfile.objects.get_or_create(user=user, defaults={"user_type": "hiring_manager"})
+    return user
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(config, port, workers, threads):
+    env = {**os.environ, **CONFIGS[config], "ASYNC_VIEWS": "false", "ALLOWED_HOSTS": "127.0.0.1,localhost",
+           "PYTHONPATH": os.pathsep.join([ROOT, os.environ.get("PYTHONPATH", "")])}
+    cmd = [sys.executable, "-m", "gunicorn", "backend.wsgi:application", "--bind", f"127.0.0.1:{port}",
+           "--workers", str(workers), "--worker-class", "gthread", "--threads", str(threads),
+           "--log-level", "warning"]
+    process = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/", timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"server ({config}) did not start")
+
+
+async def load(url, token, concurrency, requests):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=concurrency), timeout=60,
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    ok = (await client.get(url)).status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    return elapsed, sorted(latencies), errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=4, help="gthread threads per worker (Dockerfile: 4)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requests kept in flight by the client")
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    token = str(AccessToken.for_user(bench_user()))
+    print(f"GET /api/auth/me/: {args.requests} requests, {args.concurrency} in flight, "
+          f"{args.workers} worker(s) x {args.threads} threads")
+    for config in args.configs.split(","):
+        port = free_port()
+        process = start_server(config, port, args.workers, args.threads)
+        try:
+            url = f"http://127.0.0.1:{port}/api/auth/me/"
+            asyncio.run(load(url, token, args.concurrency, 50))  # warm-up (fills the pool / persistent connections)
+            elapsed, latencies, errors = asyncio.run(load(url, token, args.concurrency, args.requests))
+        finally:
+            process.terminate()
+            process.wait()
+        print(f"  {config:10} {args.requests / elapsed:8.1f} req/s  p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:7.2f} ms  errors {errors}")
+
+
+if __name__ == "__main__":
+    main()
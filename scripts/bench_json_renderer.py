@@ -0,0 +1,142 @@
+"""
+Serialization time of DRF's JSONRenderer vs interviews.renderers.ORJSONRenderer on
+payloads shaped like the heaviest endpoints: campaigns/{id}/sessions/ (plain dicts
+with raw UUID / datetime values) and InterviewSessionSerializer output (nested
+ReturnList / OrderedDict of strings). Also checks both outputs decode to the same data.
+
+    python scripts/bench_json_renderer.py --sessions 200 --questions 8 --repeat 20
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from datetime import timedelta
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django
+django.setup()
+
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from interviews.renderers import ORJSONRenderer
+
+
+def list_sessions_payload(sessions, questions):
+    """Same keys as the list_sessions action, raw model values (UUID, datetime, float)."""
+    now = timezone.now()
+    data = []
+    for s in range(sessions):
+        responses = []
+        for q in range(questions):
+            responses.append({
+                "id": uuid.uuid4(),
+                "question_id": uuid.uuid4(),
+                "question_text": f"Question {q + 1} : présentez un projet dont vous êtes fier.",
+                "video_url": f"https://bucket.s3.amazonaws.com/videos/{uuid.uuid4()}.webm",
+                "duration": 90 + q,
+                "recorded_at": now - timedelta(minutes=q),
+                "upload_status": "completed",
+                "ai_analysis": {"speech_confidence": 0.82, "speech_rate": 2.4, "analyzed_at": now},
+                "evaluations": [{
+                    "id": uuid.uuid4(),
+                    "hiring_manager_id": uuid.uuid4(),
+                    "technical_skill": 4, "communication": 3, "motivation": 5, "cultural_fit": 4,
+                    "notes": "Réponse claire, exemples concrets.",
+                    "recommended": True,
+                    "evaluated_at": now,
+                    "overall_score": 4.0,
+                }],
+            })
+        data.append({
+            "id": uuid.uuid4(),
+            "status": "completed",
+            "invited_at": now - timedelta(days=3),
+            "started_at": now - timedelta(days=2),
+            "completed_at": now - timedelta(days=1),
+            "expires_at": now + timedelta(days=4),
+            "candidate": {"id": uuid.uuid4(), "email": f"candidat{s}@example.com",
+                          "first_name": "Émilie", "last_name": "Durand"},
+            "score": Decimal("3.75"),
+            "responses": responses,
+        })
+    return data
+
+
+def serializer_payload(sessions, questions):
+    """Serializer output: ReturnList of OrderedDicts, values already converted to strings."""
+    raw = list_sessions_payload(sessions, questions)
+
+    def convert(value):
+        if isinstance(value, dict):
+            return OrderedDict((k, convert(v)) for k, v in value.items())
+        if isinstance(value, list):
+            return [convert(v) for v in value]
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        if hasattr(value, "isoformat"):
+            return value.isoformat().replace("+00:00", "Z")
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    return ReturnList([convert(s) for s in raw], serializer=None)
+
+
+def timed(render, data, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = render(data)
+        times.append(time.perf_counter() - start)
+    return output, times
+
+
+def normalize(value):
+    """Decoded data with datetime strings cut to milliseconds (DRF truncates, orjson keeps microseconds)."""
+    if isinstance(value, dict):
+        return {k: normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [normalize(v) for v in value]
+    if isinstance(value, str) and len(value) == 27 and value[10:11] == "T" and value.endswith("Z"):
+        return value[:23] + "Z"
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    payloads = {
+        "list_sessions": list_sessions_payload(args.sessions, args.questions),
+        "InterviewSessionSerializer": serializer_payload(args.sessions, args.questions),
+    }
+    renderers = {"JSONRenderer": JSONRenderer().render, "ORJSONRenderer": ORJSONRenderer().render}
+
+    for name, data in payloads.items():
+        print(f"{name} ({args.sessions} sessions x {args.questions} responses)")
+        outputs, medians = {}, {}
+        for label, render in renderers.items():
+            outputs[label], times = timed(render, data, args.repeat)
+            medians[label] = statistics.median(times)
+            print(f"  {label:15} median {medians[label] * 1000:8.2f} ms  "
+                  f"best {min(times) * 1000:8.2f} ms  {len(outputs[label]) / 1024:.0f} KiB")
+        print(f"  speedup: x{medians['JSONRenderer'] / medians['ORJSONRenderer']:.1f}")
+        same = normalize(json.loads(outputs["JSONRenderer"])) == normalize(json.loads(outputs["ORJSONRenderer"]))
+        print(f"  same decoded data: {same}")
+
+
+if __name__ == "__main__":
+    main()
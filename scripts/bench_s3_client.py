@@ -0,0 +1,84 @@
+"""
+Per-call overhead of building a boto3 S3 client vs the shared registry (interviews/s3.py).
+
+Runs entirely against moto (no AWS account needed):
+    pip install -r dev-requirements.txt
+    python scripts/bench_s3_client.py --iterations 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+import django
+django.setup()
+
+import boto3
+from django.conf import settings
+from moto import mock_aws
+
+from interviews.s3 import get_s3_client, reset_s3_clients
+
+BUCKET = "bench-videos"
+
+
+def fresh_client():
+    # what fetch_and_store_video / PresignUploadView did before the registry
+    return boto3.client(
+        "s3",
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_S3_REGION_NAME,
+    )
+
+
+def one_call(client, i):
+    client.generate_presigned_post(
+        Bucket=BUCKET,
+        Key=f"responses/bench/{i}.mp4",
+        Fields={"acl": "private"},
+        Conditions=[{"acl": "private"}, ["content-length-range", 1, 1024]],
+        ExpiresIn=3600,
+    )
+    client.head_bucket(Bucket=BUCKET)
+
+
+def run(label, factory, iterations):
+    timings = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        one_call(factory(), i)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p50 = statistics.median(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label:<10} n={iterations:<5} mean={statistics.mean(timings):7.2f}ms p50={p50:7.2f}ms p99={p99:7.2f}ms")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    settings.AWS_STORAGE_BUCKET_NAME = BUCKET
+    with mock_aws():
+        reset_s3_clients()
+        get_s3_client().create_bucket(
+            Bucket=BUCKET,
+            CreateBucketConfiguration={"LocationConstraint": settings.AWS_S3_REGION_NAME},
+        )
+        fresh = run("fresh", fresh_client, args.iterations)
+        pooled = run("registry", get_s3_client, args.iterations)
+    print(f"speedup p50: x{fresh / pooled:.1f}")
+
+
+if __name__ == "__main__":
+    main()
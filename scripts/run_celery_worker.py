@@ -0,0 +1,42 @@
+"""
+Start a Celery worker for one queue with its profile from settings.MEDIA_WORKER_PROFILES.
+
+    python scripts/run_celery_worker.py ingest
+    python scripts/run_celery_worker.py transcode --loglevel debug   # extra args go to celery
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+
+def worker_argv(queue, profile, extra=()):
+    argv = [
+        "worker",
+        "--queues", queue,
+        "--hostname", f"{queue}@%h",
+        "--concurrency", str(profile["concurrency"]),
+        "--pool", profile.get("pool", "prefork"),
+        "--prefetch-multiplier", str(profile.get("prefetch_multiplier", 1)),
+    ]
+    if profile.get("max_tasks_per_child"):
+        argv += ["--max-tasks-per-child", str(profile["max_tasks_per_child"])]
+    return argv + list(extra)
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    from django.conf import settings
+    from backend.celery import app
+
+    queue = sys.argv[1]
+    profiles = settings.MEDIA_WORKER_PROFILES
+    if queue not in profiles:
+        sys.exit(f"Unknown queue {queue!r}; expected one of {', '.join(profiles)}")
+    app.worker_main(worker_argv(queue, profiles[queue], sys.argv[2:]))
+
+
+if __name__ == "__main__":
+    main()